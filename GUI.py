@@ -1,24 +1,409 @@
 # gui.py
 
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, filedialog
+import itertools
 import logging
+import queue
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date # Needed for date handling in GUI
+from typing import TYPE_CHECKING
 
-from commands import ToDoListApp
-# Database is imported here for type hinting, though the ToDoListApp is passed the instance
-from database import Database
+if TYPE_CHECKING: # commands pulls in the storage and auth stack; main.py loads it after the window is up
+    from commands import ToDoListApp
+# TaskStorage is imported here for its constants, though the ToDoListApp is passed the instance
+from snapshot import TaskSnapshotStore
+from storage import TaskQuery, TaskRecord, TaskStorage, keyset_cursor
 
 logger = logging.getLogger(__name__)
 
+
+class BackgroundDispatcher:
+    """
+    Runs ToDoListApp calls on a worker thread pool and hands the results back to the Tk
+    main thread by polling a queue with after(), so slow database calls or bcrypt hashing
+    never block the event loop.
+    """
+    def __init__(self, master: tk.Misc, max_workers: int = 4, poll_interval_ms: int = 30):
+        self.master = master
+        self.poll_interval_ms = poll_interval_ms
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="todo-worker")
+        self.on_busy_change = None # Optional callback(bool) for busy indicators
+        self._results = queue.Queue() # Completed futures waiting to be delivered on the Tk thread
+        self._calls = queue.Queue() # call_soon() callbacks from other threads
+        self._counter = itertools.count(1)
+        self._latest = {} # key -> newest request id; older responses for the same key are stale
+        self._epoch = 0 # Bumped by cancel_all() to drop every response still in flight
+        self._in_flight = 0
+        self._closed = False
+        self._after_id = self.master.after(self.poll_interval_ms, self._poll)
+
+    @property
+    def busy(self) -> bool:
+        return self._in_flight > 0
+
+    def submit(self, func, *args, on_done=None, on_finally=None, key: str = None, **kwargs) -> int:
+        """
+        Schedules func(*args, **kwargs) on a worker thread.
+        on_done(result) runs on the Tk thread unless the request was superseded (same key) or cancelled.
+        on_finally() always runs on the Tk thread, e.g. to re-enable buttons.
+        """
+        request_id = next(self._counter)
+        if key is not None:
+            self._latest[key] = request_id
+        epoch = self._epoch
+
+        self._set_in_flight(self._in_flight + 1)
+        future = self.executor.submit(func, *args, **kwargs)
+        future.add_done_callback(
+            lambda f: self._results.put((request_id, key, epoch, on_done, on_finally, f))
+        )
+        return request_id
+
+    def call_soon(self, func, *args):
+        """Runs func(*args) on the Tk thread at the next poll; safe to call from any thread."""
+        self._calls.put((func, args))
+
+    def cancel(self, key: str):
+        """Marks any in-flight request submitted under key as stale."""
+        self._latest.pop(key, None)
+
+    def cancel_all(self):
+        """Marks every in-flight request as stale (e.g. on logout)."""
+        self._epoch += 1
+        self._latest.clear()
+
+    def shutdown(self):
+        self._closed = True
+        self.cancel_all()
+        if self._after_id is not None:
+            try:
+                self.master.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _set_in_flight(self, count: int):
+        was_busy = self.busy
+        self._in_flight = count
+        if was_busy != self.busy and self.on_busy_change:
+            self.on_busy_change(self.busy)
+
+    def _poll(self):
+        while True:
+            try:
+                request_id, key, epoch, on_done, on_finally, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._set_in_flight(self._in_flight - 1)
+            self._deliver(request_id, key, epoch, on_done, future)
+            if on_finally:
+                on_finally()
+        while True:
+            try:
+                func, args = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            func(*args)
+
+        if not self._closed:
+            self._after_id = self.master.after(self.poll_interval_ms, self._poll)
+
+    def _deliver(self, request_id, key, epoch, on_done, future):
+        if epoch != self._epoch or (key is not None and self._latest.get(key) != request_id):
+            logger.debug("GUI: Dropping stale response for request %s (key: %s).", request_id, key)
+            return
+        if key is not None:
+            del self._latest[key]
+
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.critical("GUI: Background request %s failed: %s", request_id, e, exc_info=True)
+            messagebox.showerror("Error", "An unexpected application error occurred.")
+            return
+
+        if on_done:
+            on_done(result)
+
+
+class VirtualTaskList:
+    """
+    A Listbox over a user's tasks that fetches keyset pages lazily as the user scrolls.
+    At most max_pages pages of rows are kept; rows scrolled far out of view are dropped
+    and fetched again if the user scrolls back to them.
+    """
+    PREFETCH_FRACTION = 0.1 # Start loading when the view is this close to either end of the window
+
+    def __init__(self, parent: tk.Misc, fetch_page, format_row, page_size: int = 100, max_pages: int = 5):
+        self.fetch_page = fetch_page # fetch_page(after=..., before=..., on_done=...) delivers (tasks, message) on the Tk thread
+        self.format_row = format_row
+        self.page_size = page_size
+        self.max_rows = page_size * max_pages
+        self.query = TaskQuery(limit=page_size) # Filters and sort order applied by the database
+
+        # EXTENDED selection (shift/ctrl-click) enables bulk complete/delete; update still needs a single row
+        self.listbox = tk.Listbox(parent, height=10, width=50, bd=0, selectmode=tk.EXTENDED)
+        self.listbox.pack(side="left", fill="both", expand=True)
+
+        self.scrollbar = tk.Scrollbar(parent)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # Link scrollbar to listbox; scroll events also drive lazy loading
+        self.listbox.config(yscrollcommand=self._on_scroll)
+        self.scrollbar.config(command=self.listbox.yview)
+
+        self.tasks = [] # The window of TaskRecords currently shown, in display order
+        self.rows = {} # task id -> row index in tasks/listbox, for in-place patches
+        self.more_before = False # Rows exist above the window (dropped or not yet fetched)
+        self.more_after = False # Rows exist below the window
+        self.searching = False # Showing a fixed result list (search hits) instead of pages
+        self._loading = False
+        self._stale = False # Showing rows from a snapshot until the first page arrives from the database
+        self._generation = 0 # Bumped by reset() so responses for an old listing are ignored
+
+    @property
+    def sort_key(self) -> str:
+        return self.query.sort_key
+
+    @property
+    def descending(self) -> bool:
+        return self.query.descending
+
+    def set_query(self, query: TaskQuery):
+        """Switches to new filters/sort order and reloads from the first page."""
+        self.query = dataclasses.replace(query, limit=self.page_size)
+        self.reset()
+
+    def reset(self):
+        """Discards the window and loads the first page again."""
+        self._generation += 1
+        self.tasks = []
+        self.rows = {}
+        self.more_before = False
+        self.more_after = False
+        self.searching = False
+        self._stale = False
+        self.listbox.delete(0, tk.END)
+        self._load(after=None, before=None)
+
+    def show_cached(self, tasks):
+        """
+        Paints rows saved by an earlier session (the first page of the default view) at once,
+        then loads the first page from the database and repaints only if anything changed.
+        """
+        self._generation += 1
+        self.tasks = list(tasks)
+        self.more_before = False
+        self.more_after = False
+        self.searching = False
+        self._stale = True
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *[self.format_row(task) for task in self.tasks])
+        self._reindex()
+        self._load(after=None, before=None)
+
+    def first_page(self) -> list[TaskRecord] | None:
+        """The first page of the default view as shown, or None if the view holds anything else."""
+        if (self.searching or self.more_before or self._loading or self._stale or not self.tasks
+                or self.query != TaskQuery(limit=self.page_size)):
+            return None
+        return self.tasks[:self.page_size]
+
+    def show_results(self, tasks: list[TaskRecord], message: str):
+        """Replaces the window with a fixed list (search hits, best first); paging resumes on reset()."""
+        self._generation += 1 # Pages still in flight belong to the previous listing
+        self._loading = False
+        self._stale = False
+        self.searching = True
+        self.tasks = list(tasks)
+        self.more_before = False
+        self.more_after = False
+        self.listbox.delete(0, tk.END)
+        if self.tasks:
+            self.listbox.insert(tk.END, *[self.format_row(task) for task in self.tasks])
+        else:
+            self._show_placeholder(message)
+        self._reindex()
+
+    def _load(self, after: tuple, before: tuple):
+        self._loading = True
+        generation = self._generation
+
+        def on_done(result):
+            if generation != self._generation:
+                return
+            self._loading = False
+            tasks, message = result
+            if tasks is None:
+                logger.error("GUI: Failed to load a page of tasks: %s", message)
+                if not self.tasks:
+                    self._show_placeholder(message)
+                return # A snapshot stays on screen, still marked stale
+            if self._stale:
+                self._reconcile(tasks, message)
+            elif before is not None:
+                self._prepend(tasks)
+            else:
+                self._append(tasks, message)
+
+        self.fetch_page(after=after, before=before, on_done=on_done)
+
+    def _on_scroll(self, first: str, last: str):
+        self.scrollbar.set(first, last)
+        if self._loading or not self.tasks:
+            return
+        if self.more_after and float(last) >= 1 - self.PREFETCH_FRACTION:
+            self._load(after=keyset_cursor(self.tasks[-1], self.sort_key), before=None)
+        elif self.more_before and float(first) <= self.PREFETCH_FRACTION:
+            self._load(after=None, before=keyset_cursor(self.tasks[0], self.sort_key))
+
+    def _append(self, tasks: list[TaskRecord], message: str):
+        self.more_after = len(tasks) == self.page_size
+        if not tasks:
+            if not self.tasks:
+                self._show_placeholder(message) # e.g. "No tasks found"
+            return
+        if not self.tasks:
+            self.listbox.delete(0, tk.END) # Drop any placeholder
+
+        first_visible = self.listbox.nearest(0)
+        self.tasks.extend(tasks)
+        self.listbox.insert(tk.END, *[self.format_row(task) for task in tasks])
+
+        overflow = len(self.tasks) - self.max_rows
+        if overflow > 0: # Drop rows from the top, keeping the visible rows in place
+            self.listbox.delete(0, overflow - 1)
+            del self.tasks[:overflow]
+            self.more_before = True
+            self.listbox.yview(max(first_visible - overflow, 0))
+        self._reindex()
+
+    def _reconcile(self, tasks: list[TaskRecord], message: str):
+        self._stale = False
+        if list(tasks) == self.tasks:
+            self.more_after = len(tasks) == self.page_size # The snapshot was current
+            return
+        logger.debug("GUI: Snapshot was out of date; repainting the first page.")
+        first_visible = self.listbox.nearest(0)
+        self.tasks = []
+        self.listbox.delete(0, tk.END)
+        self._append(tasks, message)
+        self.listbox.yview(first_visible)
+
+    def _prepend(self, tasks: list[TaskRecord]):
+        self.more_before = len(tasks) == self.page_size
+        if not tasks:
+            return
+
+        first_visible = self.listbox.nearest(0)
+        self.tasks[:0] = tasks
+        self.listbox.insert(0, *[self.format_row(task) for task in tasks])
+
+        if len(self.tasks) > self.max_rows: # Drop rows from the bottom
+            self.listbox.delete(self.max_rows, tk.END)
+            del self.tasks[self.max_rows:]
+            self.more_after = True
+        self.listbox.yview(first_visible + len(tasks))
+        self._reindex()
+
+    def _reindex(self):
+        self.rows = {task.id: i for i, task in enumerate(self.tasks)}
+
+    def _show_placeholder(self, message: str):
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, message)
+
+    def _sort_tuple(self, task: TaskRecord) -> tuple:
+        # NULLs sort first ascending and last descending, matching MySQL
+        value = getattr(task, self.sort_key)
+        return (value is not None, value if value is not None else 0, task.id)
+
+    def _position_for(self, task: TaskRecord) -> int:
+        key = self._sort_tuple(task)
+        for i, other in enumerate(self.tasks):
+            other_key = self._sort_tuple(other)
+            if (other_key < key) if self.descending else (other_key > key):
+                return i
+        return len(self.tasks)
+
+    # --- Incremental patches (one row instead of a full re-fetch) ---
+    def insert_task(self, task: TaskRecord):
+        if self.searching or not self.query.matches(task):
+            return # Filtered out of the current view (search hits are not re-ranked locally)
+        row = self._position_for(task)
+        if (row == len(self.tasks) and self.more_after) or (row == 0 and self.more_before):
+            return # Belongs outside the loaded window; it will be fetched when scrolled to
+        if not self.tasks:
+            self.listbox.delete(0, tk.END) # Drop the "No tasks found" placeholder
+        self.tasks.insert(row, task)
+        self.listbox.insert(row, self.format_row(task))
+        self.listbox.see(row)
+        self._reindex()
+
+    def replace_task(self, task: TaskRecord):
+        row = self.rows.get(task.id)
+        if row is None:
+            return # Not in the loaded window
+        if not self.searching and not self.query.matches(task):
+            self.remove_task(task.id) # No longer matches the filters
+            return
+        if not self.searching and getattr(self.tasks[row], self.sort_key) != getattr(task, self.sort_key):
+            self.remove_task(task.id) # Its sort position changed
+            self.insert_task(task)
+            return
+        was_selected = self.listbox.selection_includes(row)
+        self.tasks[row] = task
+        self.listbox.delete(row)
+        self.listbox.insert(row, self.format_row(task))
+        if was_selected:
+            self.listbox.selection_set(row)
+
+    def remove_task(self, task_id: int):
+        row = self.rows.pop(task_id, None)
+        if row is None:
+            return
+        del self.tasks[row]
+        self.listbox.delete(row)
+        for task in self.tasks[row:]: # Rows below shift up by one
+            self.rows[task.id] -= 1
+        if not self.tasks:
+            if self.more_before or self.more_after:
+                self.reset()
+            elif self.searching:
+                self._show_placeholder("Info: No tasks match the search.")
+            else:
+                self._show_placeholder("Info: No tasks found for your account.")
+
+
 class ToDoListGUI:
-    def __init__(self, master: tk.Tk, app: ToDoListApp):
+    TASK_PAGE_SIZE = 100
+    MAX_TASK_PAGES = 5 # Bounded window: at most TASK_PAGE_SIZE * MAX_TASK_PAGES rows in memory
+    SEARCH_DEBOUNCE_MS = 250 # Pause in typing before the search box queries the database
+
+    def __init__(self, master: tk.Tk, app: 'ToDoListApp' = None):
+        """Pass the app, or None and then start_app() to build it while the login window is up."""
         self.master = master
         self.app = app
         self.current_user_id = None # Store the logged-in user's ID
+        self.snapshots = TaskSnapshotStore.from_env() # Last session's first page, for an instant first paint
 
         master.title("ToDo List Application")
-        master.geometry("600x550") # Increased size slightly for new buttons and actions
+        master.geometry("700x650") # Room for the filter/sort controls above the task list
+
+        # --- Background worker for database/bcrypt calls ---
+        self.dispatcher = BackgroundDispatcher(master)
+        self.dispatcher.on_busy_change = self._on_busy_change
+        master.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        # --- Status bar (busy indicator) ---
+        self.status_bar = tk.Frame(master)
+        self.status_bar.pack(side="bottom", fill="x", padx=5)
+        self.status_label = tk.Label(self.status_bar, text="", anchor="w", fg="gray")
+        self.status_label.pack(side="left", fill="x", expand=True)
+        self.sync_label = tk.Label(self.status_bar, text="", anchor="e", fg="gray") # Write-behind backlog
+        self.sync_label.pack(side="right")
 
         # --- Login/Registration Frame ---
         self.login_frame = tk.Frame(master, padx=20, pady=20)
@@ -43,20 +428,107 @@ class ToDoListGUI:
         self.register_button = tk.Button(self.login_frame, text="Register", command=self._register)
         self.register_button.grid(row=3, column=1, pady=5, padx=5)
 
+    def start_app(self, startup):
+        """
+        Runs startup() -> (app, message) on the worker pool; Login and Register stay disabled
+        until it returns an app, and its message is shown if it returns None instead.
+        """
+        for button in (self.login_button, self.register_button):
+            button.config(state=tk.DISABLED)
+        self.message_label.config(text="Connecting to the database...", fg="gray")
+
+        def on_done(result):
+            app, message = result
+            if app is None:
+                self.message_label.config(text=message, fg="red") # Buttons stay disabled; there is no backend
+                return
+            self.app = app
+            add_listener = getattr(app, 'add_listener', None) # Present when WRITE_BEHIND=1
+            if add_listener is not None:
+                add_listener(lambda event: self.dispatcher.call_soon(self._on_write_flushed, event))
+                self._update_sync_label()
+            self.message_label.config(text="", fg="red")
+            for button in (self.login_button, self.register_button):
+                button.config(state=tk.NORMAL)
+
+        self.dispatcher.submit(startup, on_done=on_done, key="startup")
+
+    # --- Background execution helpers ---
+    def _run_async(self, func, *args, on_done=None, disable=(), key: str = None, **kwargs):
+        """Runs an app call off the Tk thread, disabling the given widgets until it completes."""
+        for widget in disable:
+            widget.config(state=tk.DISABLED)
+
+        def restore_widgets():
+            for widget in disable:
+                if widget.winfo_exists(): # The widget may belong to a window closed meanwhile
+                    widget.config(state=tk.NORMAL)
+
+        return self.dispatcher.submit(func, *args, on_done=on_done, on_finally=restore_widgets, key=key, **kwargs)
+
+    def _on_busy_change(self, busy: bool):
+        self.status_label.config(text="Working..." if busy else "")
+        self.master.config(cursor="watch" if busy else "")
+        if not busy:
+            self._update_sync_label() # A finished call may have queued a write
+
+    def _update_sync_label(self):
+        pending = getattr(self.app, 'pending_writes', 0)
+        self.sync_label.config(text=f"{pending} changes waiting to be saved" if pending else "", fg="gray")
+
+    def _on_write_flushed(self, event):
+        """Runs on the Tk thread for each journaled write the background flush applied or dropped."""
+        self._update_sync_label()
+        if event.user_id != self.current_user_id:
+            return # Queued before a logout; nothing of it is on screen
+        if event.message.startswith("Error:"):
+            logger.error("GUI: A queued change for user ID %s failed: %s", event.user_id, event.message)
+            self.sync_label.config(text=event.message, fg="red")
+            self._refresh_tasks_display() # The list still shows the change that was dropped
+        elif event.op == 'add' and event.record is not None:
+            # Swap the row with its temporary local id for the one with the database id
+            self.task_view.remove_task(event.task_id)
+            self.task_view.insert_task(event.record)
+        self._refresh_stats() # The counts only move once a queued write reaches the database
+
+    def _refresh_stats(self):
+        """Reloads the task counts header; called after every change that can move the counts."""
+        def on_done(result):
+            stats, message = result
+            if stats is None:
+                self.stats_label.config(text=message, fg="red")
+                return
+            self.stats_label.config(
+                text=f"{stats.pending} pending | {stats.completed} completed | "
+                     f"{stats.overdue} overdue | {stats.due_today} due today",
+                fg="red" if stats.overdue else "gray",
+            )
+
+        self._run_async(self.app.get_task_stats, self.current_user_id, on_done=on_done, key="task_stats")
+
+    def _on_close(self):
+        self._save_snapshot()
+        self.dispatcher.shutdown()
+        self.master.destroy()
+
     def _login(self):
         username = self.username_entry.get()
         password = self.password_entry.get()
         self.message_label.config(text=f"Attempting login for {username}...")
 
-        user_id, message = self.app.authenticate_user(username, password)
-        if user_id:
-            self.message_label.config(text=message, fg="green")
-            logger.info(f"GUI: Login successful for user '{username}' (ID: {user_id}).")
-            self.current_user_id = user_id # Store the user ID
-            self._show_main_todo_screen(user_id)
-        else:
-            self.message_label.config(text=message, fg="red")
-            logger.warning(f"GUI: Login failed for user '{username}': {message}")
+        def on_done(result):
+            user_id, message = result
+            if user_id:
+                self.message_label.config(text=message, fg="green")
+                logger.info("GUI: Login successful for user '%s' (ID: %s).", username, user_id)
+                self.current_user_id = user_id # Store the user ID
+                self._show_main_todo_screen(user_id)
+            else:
+                self.message_label.config(text=message, fg="red")
+                logger.warning("GUI: Login failed for user '%s': %s", username, message)
+
+        self._run_async(self.app.authenticate_user, username, password, on_done=on_done,
+                        disable=(self.login_button, self.register_button), key="auth")
 
 
     def _register(self):
@@ -64,13 +536,16 @@ class ToDoListGUI:
         password = self.password_entry.get()
         self.message_label.config(text=f"Attempting registration for {username}...")
 
-        message = self.app.add_user(username, password)
-        if "Success" in message:
-            self.message_label.config(text=message, fg="green")
-            logger.info(f"GUI: Registration successful for user '{username}'.")
-        else:
-            self.message_label.config(text=message, fg="red")
-            logger.warning(f"GUI: Registration failed for user '{username}': {message}")
+        def on_done(message):
+            if "Success" in message:
+                self.message_label.config(text=message, fg="green")
+                logger.info("GUI: Registration successful for user '%s'.", username)
+            else:
+                self.message_label.config(text=message, fg="red")
+                logger.warning("GUI: Registration failed for user '%s': %s", username, message)
+
+        self._run_async(self.app.add_user, username, password, on_done=on_done,
+                        disable=(self.login_button, self.register_button), key="auth")
 
     def _show_main_todo_screen(self, user_id):
         self.login_frame.pack_forget() # Hide the login frame
@@ -81,27 +556,72 @@ class ToDoListGUI:
 
         tk.Label(self.main_todo_frame, text=f"Welcome, User ID: {user_id}!", font=("Arial", 14, "bold")).pack(pady=10)
         tk.Label(self.main_todo_frame, text="Your ToDo List:", font=("Arial", 12)).pack(pady=5)
+        self.stats_label = tk.Label(self.main_todo_frame, text="", fg="gray") # Filled in by _refresh_stats
+        self.stats_label.pack(pady=(0, 5))
+
+        # --- Search (full-text index; runs once typing pauses) ---
+        self.search_frame = tk.Frame(self.main_todo_frame)
+        self.search_frame.pack(fill="x", pady=(0, 5))
+        tk.Label(self.search_frame, text="Search:").pack(side="left")
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(self.search_frame, textvariable=self.search_var, width=40)
+        self.search_entry.pack(side="left", fill="x", expand=True, padx=2)
+        tk.Button(self.search_frame, text="Clear", command=lambda: self.search_var.set("")).pack(side="left", padx=2)
+        self._search_after_id = None
+        self.search_var.trace_add("write", self._on_search_changed)
+
+        # --- Filter/Sort Controls (applied by the database, not in Python) ---
+        self.filter_frame = tk.Frame(self.main_todo_frame)
+        self.filter_frame.pack(fill="x")
+
+        tk.Label(self.filter_frame, text="Status:").grid(row=0, column=0, sticky="w")
+        self.filter_status_var = tk.StringVar(value="all")
+        tk.OptionMenu(self.filter_frame, self.filter_status_var, "all", "pending", "completed").grid(row=0, column=1, sticky="ew", padx=2)
+
+        tk.Label(self.filter_frame, text="Due from:").grid(row=0, column=2, sticky="w")
+        self.filter_due_from_entry = tk.Entry(self.filter_frame, width=11)
+        self.filter_due_from_entry.grid(row=0, column=3, padx=2)
+        tk.Label(self.filter_frame, text="to:").grid(row=0, column=4, sticky="w")
+        self.filter_due_to_entry = tk.Entry(self.filter_frame, width=11)
+        self.filter_due_to_entry.grid(row=0, column=5, padx=2)
+
+        tk.Label(self.filter_frame, text="Priority:").grid(row=1, column=0, sticky="w")
+        self.filter_priority_min_entry = tk.Entry(self.filter_frame, width=4)
+        self.filter_priority_min_entry.grid(row=1, column=1, sticky="w", padx=2)
+        tk.Label(self.filter_frame, text="to:").grid(row=1, column=2, sticky="e")
+        self.filter_priority_max_entry = tk.Entry(self.filter_frame, width=4)
+        self.filter_priority_max_entry.grid(row=1, column=3, sticky="w", padx=2)
+
+        tk.Label(self.filter_frame, text="Sort by:").grid(row=1, column=4, sticky="w")
+        self.sort_key_var = tk.StringVar(value="id")
+        tk.OptionMenu(self.filter_frame, self.sort_key_var, *TaskStorage.SORT_KEYS).grid(row=1, column=5, sticky="ew", padx=2)
+        self.sort_descending_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.filter_frame, text="Descending", variable=self.sort_descending_var).grid(row=1, column=6, padx=2)
+
+        tk.Button(self.filter_frame, text="Apply", command=self._apply_filters).grid(row=0, column=6, padx=2)
+        tk.Button(self.filter_frame, text="Clear", command=self._clear_filters).grid(row=0, column=7, padx=2)
 
         # --- Task List Display ---
         self.task_list_frame = tk.Frame(self.main_todo_frame)
         self.task_list_frame.pack(fill="both", expand=True, pady=10)
 
-        # IMPORTANT: Added selectmode=tk.SINGLE to allow selecting items for update/delete
-        self.task_listbox = tk.Listbox(self.task_list_frame, height=10, width=50, bd=0, selectmode=tk.SINGLE)
-        self.task_listbox.pack(side="left", fill="both", expand=True)
-
-        self.task_scrollbar = tk.Scrollbar(self.task_list_frame)
-        self.task_scrollbar.pack(side="right", fill="y")
-
-        # Link scrollbar to listbox
-        self.task_listbox.config(yscrollcommand=self.task_scrollbar.set)
-        self.task_scrollbar.config(command=self.task_listbox.yview)
-
-        # Store task data for easy access (e.g., when updating/deleting)
-        self.tasks_data = [] # Will store a list of dictionaries (task details from DB)
-
-        # --- Refresh Task Display ---
-        self._refresh_tasks_display()
+        # Virtualized list: pages are fetched lazily as the user scrolls
+        self.task_view = VirtualTaskList(
+            self.task_list_frame,
+            fetch_page=self._fetch_task_page,
+            format_row=self._format_task,
+            page_size=self.TASK_PAGE_SIZE,
+            max_pages=self.MAX_TASK_PAGES,
+        )
+        self.task_listbox = self.task_view.listbox
+
+        # --- Initial Task Display: the saved snapshot at once, checked against the database in the background ---
+        cached = self.snapshots.load(user_id) if self.snapshots is not None else None
+        if cached:
+            self.task_view.show_cached(cached)
+        else:
+            self._refresh_tasks_display()
+        self._refresh_stats()
 
         # --- Task Action Buttons (Update/Delete) ---
         self.action_buttons_frame = tk.Frame(self.main_todo_frame)
@@ -110,9 +630,21 @@ class ToDoListGUI:
         self.update_button = tk.Button(self.action_buttons_frame, text="Update Selected Task", command=self._show_update_task_dialog)
         self.update_button.pack(side="left", padx=5)
 
-        self.delete_button = tk.Button(self.action_buttons_frame, text="Delete Selected Task", command=self._delete_selected_task)
+        self.complete_button = tk.Button(self.action_buttons_frame, text="Complete Selected", command=self._complete_selected_tasks)
+        self.complete_button.pack(side="left", padx=5)
+
+        self.delete_button = tk.Button(self.action_buttons_frame, text="Delete Selected", command=self._delete_selected_task)
         self.delete_button.pack(side="left", padx=5)
 
+        self.import_button = tk.Button(self.action_buttons_frame, text="Import...", command=self._import_tasks)
+        self.import_button.pack(side="left", padx=5)
+
+        self.export_button = tk.Button(self.action_buttons_frame, text="Export...", command=self._export_tasks)
+        self.export_button.pack(side="left", padx=5)
+
+        self.archive_button = tk.Button(self.action_buttons_frame, text="Show Archived", command=self._show_archived_tasks)
+        self.archive_button.pack(side="left", padx=5)
+        self.archive_window = None
 
         # --- Add New Task Section ---
         self.add_task_frame = tk.Frame(self.main_todo_frame, pady=10)
@@ -141,41 +673,97 @@ class ToDoListGUI:
         self.logout_button.pack(pady=10)
 
     def _refresh_tasks_display(self):
-        self.task_listbox.delete(0, tk.END) # Clear current listbox contents
-        
-        # Get tasks from application logic layer
-        tasks, message = self.app.get_user_tasks(self.current_user_id) # This expects a list of dicts and a message
-
-        if tasks: # If tasks list is not empty
-            self.tasks_data = tasks # Store the raw task data (list of dictionaries)
-            for i, task in enumerate(self.tasks_data):
-                # Ensure due_date is handled gracefully if None or not present
-                due_date_str = task.get('due_date')
-                if due_date_str:
-                    # If it's a datetime.date object, format it
-                    if isinstance(due_date_str, date):
-                        due_date_str = due_date_str.strftime('%Y-%m-%d')
-                    # If it's a string from the DB, use it directly (though DB should return date obj if column type is DATE)
-                else:
-                    due_date_str = "No Date"
-
-                # Ensure priority is handled gracefully if None or not present
-                priority_str = task.get('priority')
-                if priority_str is None:
-                    priority_str = "N/A"
-
-                display_text = (
-                    f"ID: {task.get('id')}, Task: {task.get('task')}, "
-                    f"Status: {task.get('task_status').capitalize() if task.get('task_status') else 'N/A'}, " # Capitalize for display, handle None
-                    f"Due: {due_date_str}, Priority: {priority_str}"
-                )
-                self.task_listbox.insert(tk.END, display_text)
-            logger.info("GUI: Task list refreshed successfully.")
-        else: # If tasks list is empty or None
-            self.tasks_data = [] # Clear stored data if no tasks
-            # Display the message returned by get_user_tasks (e.g., "No tasks found")
-            self.task_listbox.insert(tk.END, message)
-            logger.info("GUI: No tasks to display or error retrieving tasks.")
+        self.task_view.reset()
+
+    def _save_snapshot(self):
+        if self.snapshots is None or self.current_user_id is None:
+            return
+        tasks = self.task_view.first_page()
+        if tasks is not None:
+            # Queued write-behind adds (negative ids) are left out; they reappear once saved
+            self.snapshots.save(self.current_user_id, [task for task in tasks if task.id > 0])
+
+    def _fetch_task_page(self, after: tuple, before: tuple, on_done):
+        # Get a page from the application logic layer; a reset supersedes any page still in flight
+        self._run_async(self.app.get_user_tasks, self.current_user_id,
+                        query=self.task_view.query, after=after, before=before,
+                        on_done=on_done, key="task_page")
+
+    # --- Search ---
+    def _on_search_changed(self, *_):
+        # Debounce: restart the timer on every keystroke so only the final text is queried
+        if self._search_after_id is not None:
+            self.master.after_cancel(self._search_after_id)
+        self._search_after_id = self.master.after(self.SEARCH_DEBOUNCE_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_after_id = None
+        text = self.search_var.get()
+        if not text.strip():
+            self.dispatcher.cancel("task_search") # A result still in flight must not replace the list
+            if self.task_view.searching:
+                self.task_view.reset()
+            return
+
+        def on_done(result):
+            tasks, message = result
+            if tasks is None:
+                logger.error("GUI: Search failed for user ID %s: %s", self.current_user_id, message)
+            self.task_view.show_results(tasks or [], message)
+
+        # Keyed so a slower response for older text is dropped when a newer search is in flight
+        self._run_async(self.app.search_tasks, self.current_user_id, text, on_done=on_done, key="task_search")
+
+    def _apply_filters(self):
+        status = self.filter_status_var.get()
+        query, message = self.app.build_task_query(
+            status=None if status == "all" else status,
+            due_from=self.filter_due_from_entry.get(),
+            due_to=self.filter_due_to_entry.get(),
+            priority_min=self.filter_priority_min_entry.get(),
+            priority_max=self.filter_priority_max_entry.get(),
+            sort_key=self.sort_key_var.get(),
+            descending=self.sort_descending_var.get(),
+        )
+        if query is None:
+            messagebox.showerror("Filter Error", message)
+            logger.warning("GUI: Invalid filter input: %s", message)
+            return
+        logger.debug("GUI: Applying task query %s for user ID: %s.", query, self.current_user_id)
+        self.search_var.set("") # Filters apply to the paged list, not to search results
+        self.task_view.set_query(query)
+
+    def _clear_filters(self):
+        self.filter_status_var.set("all")
+        for entry in (self.filter_due_from_entry, self.filter_due_to_entry,
+                      self.filter_priority_min_entry, self.filter_priority_max_entry):
+            entry.delete(0, tk.END)
+        self.sort_key_var.set("id")
+        self.sort_descending_var.set(False)
+        self.search_var.set("")
+        self.task_view.set_query(TaskQuery())
+
+    def _format_task(self, task: TaskRecord) -> str:
+        # Ensure due_date is handled gracefully if None
+        due_date_str = task.due_date
+        if due_date_str:
+            # If it's a datetime.date object, format it
+            if isinstance(due_date_str, date):
+                due_date_str = due_date_str.strftime('%Y-%m-%d')
+            # If it's a string from the DB, use it directly (though DB should return date obj if column type is DATE)
+        else:
+            due_date_str = "No Date"
+
+        # Ensure priority is handled gracefully if None
+        priority_str = task.priority
+        if priority_str is None:
+            priority_str = "N/A"
+
+        return (
+            f"ID: {task.id}, Task: {task.task}, "
+            f"Status: {task.task_status.capitalize() if task.task_status else 'N/A'}, " # Capitalize for display, handle None
+            f"Due: {due_date_str}, Priority: {priority_str}"
+        )
 
     def _add_new_task(self):
         task_name = self.new_task_entry.get()
@@ -184,7 +772,7 @@ class ToDoListGUI:
 
         if not task_name.strip():
             messagebox.showerror("Input Error", "Task name cannot be empty.")
-            logger.warning(f"GUI: Attempted to add empty task name for user ID: {self.current_user_id}.")
+            logger.warning("GUI: Attempted to add empty task name for user ID: %s.", self.current_user_id)
             return
 
         # Convert priority to int, handle empty string
@@ -194,51 +782,178 @@ class ToDoListGUI:
                 priority = int(priority_str)
             except ValueError:
                 messagebox.showerror("Input Error", "Priority must be an integer.")
-                logger.warning(f"GUI: Invalid priority input '{priority_str}'.")
+                logger.warning("GUI: Invalid priority input '%s'.", priority_str)
                 return
 
         # Call application logic to add task
-        message = self.app.add_task(self.current_user_id, task_name, due_date, priority)
-
-        if "Success" in message:
-            messagebox.showinfo("Success", message)
-            self.new_task_entry.delete(0, tk.END) # Clear input fields
-            self.new_due_date_entry.delete(0, tk.END)
-            self.new_priority_entry.delete(0, tk.END)
-            self._refresh_tasks_display() # Refresh the list
-            logger.info(f"GUI: New task added successfully for user ID: {self.current_user_id}.")
-        else:
-            messagebox.showerror("Error", message)
-            logger.error(f"GUI: Failed to add new task for user ID: {self.current_user_id}: {message}")
+        def on_done(result):
+            new_task, message = result
+            if new_task:
+                messagebox.showinfo("Success", message)
+                self.new_task_entry.delete(0, tk.END) # Clear input fields
+                self.new_due_date_entry.delete(0, tk.END)
+                self.new_priority_entry.delete(0, tk.END)
+                self.task_view.insert_task(new_task) # Patch the list with the returned record
+                self._refresh_stats()
+                logger.debug("GUI: New task added successfully for user ID: %s.", self.current_user_id)
+            else:
+                messagebox.showerror("Error", message)
+                logger.error("GUI: Failed to add new task for user ID: %s: %s", self.current_user_id, message)
+
+        self._run_async(self.app.add_task, self.current_user_id, task_name, due_date, priority,
+                        on_done=on_done, disable=(self.add_task_button,))
 
     # --- Helper to get selected task ID ---
     def _get_selected_task_id(self):
+        selected_ids = self._get_selected_task_ids()
+        if len(selected_ids) > 1:
+            messagebox.showwarning("Selection Error", "Please select a single task.")
+            return None
+        return selected_ids[0] if selected_ids else None
+
+    def _get_selected_task_ids(self) -> list[int]:
         selected_indices = self.task_listbox.curselection()
-        if not selected_indices:
+        # Placeholder rows (e.g. "No tasks found") have no task behind them
+        selected_ids = [self.task_view.tasks[i].id for i in selected_indices if i < len(self.task_view.tasks)]
+        if not selected_ids:
             messagebox.showwarning("Selection Error", "Please select a task from the list.")
-            return None
+        return selected_ids
 
-        selected_index = selected_indices[0]
-        if selected_index < len(self.tasks_data):
-            return self.tasks_data[selected_index]['id']
-        return None # Should not happen if indices are valid and tasks_data is populated
+    # --- Bulk Actions ---
+    def _complete_selected_tasks(self):
+        task_ids = self._get_selected_task_ids()
+        if not task_ids:
+            return
+
+        def on_done(result):
+            records, message = result
+            if records:
+                for record in records.values():
+                    if record:
+                        self.task_view.replace_task(record)
+                self._refresh_stats()
+                messagebox.showinfo("Complete Tasks", message)
+                logger.debug("GUI: Bulk-completed %s tasks for user ID: %s.", len(task_ids), self.current_user_id)
+            else:
+                messagebox.showerror("Error", message)
+                logger.error("GUI: Failed to complete tasks for user ID: %s: %s", self.current_user_id, message)
+
+        self._run_async(self.app.update_tasks, self.current_user_id, task_ids, task_status="completed",
+                        on_done=on_done, disable=(self.complete_button, self.delete_button, self.update_button))
 
     # --- Delete Task Method ---
     def _delete_selected_task(self):
-        task_id_to_delete = self._get_selected_task_id()
-        if task_id_to_delete is None:
-            return # Error message already shown by _get_selected_task_id
+        task_ids = self._get_selected_task_ids()
+        if not task_ids:
+            return # Error message already shown by _get_selected_task_ids
+        if len(task_ids) > 1:
+            self._delete_selected_tasks(task_ids)
+            return
+        task_id_to_delete = task_ids[0]
 
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete Task ID: {task_id_to_delete}?"):
-            message = self.app.delete_task(self.current_user_id, task_id_to_delete)
+            def on_done(message):
+                if "Success" in message:
+                    messagebox.showinfo("Success", message)
+                    self.task_view.remove_task(task_id_to_delete) # Drop just that row
+                    self._refresh_stats()
+                    logger.debug("GUI: Task ID %s deleted successfully for user ID: %s.", task_id_to_delete, self.current_user_id)
+                else:
+                    messagebox.showerror("Error", message)
+                    logger.error("GUI: Failed to delete Task ID %s for user ID: %s: %s", task_id_to_delete, self.current_user_id, message)
 
-            if "Success" in message:
-                messagebox.showinfo("Success", message)
-                self._refresh_tasks_display() # Refresh the list after deletion
-                logger.info(f"GUI: Task ID {task_id_to_delete} deleted successfully for user ID: {self.current_user_id}.")
+            self._run_async(self.app.delete_task, self.current_user_id, task_id_to_delete,
+                            on_done=on_done, disable=(self.delete_button, self.update_button))
+
+    def _delete_selected_tasks(self, task_ids: list[int]):
+        if not messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {len(task_ids)} tasks?"):
+            return
+
+        def on_done(result):
+            deleted, message = result
+            if deleted:
+                for task_id, was_deleted in deleted.items():
+                    if was_deleted:
+                        self.task_view.remove_task(task_id)
+                self._refresh_stats()
+                messagebox.showinfo("Delete Tasks", message)
+                logger.debug("GUI: Bulk-deleted tasks %s for user ID: %s.", task_ids, self.current_user_id)
             else:
                 messagebox.showerror("Error", message)
-                logger.error(f"GUI: Failed to delete Task ID {task_id_to_delete} for user ID: {self.current_user_id}: {message}")
+                logger.error("GUI: Failed to delete tasks for user ID: %s: %s", self.current_user_id, message)
+
+        self._run_async(self.app.delete_tasks, self.current_user_id, task_ids,
+                        on_done=on_done, disable=(self.complete_button, self.delete_button, self.update_button))
+
+    # --- Import/Export ---
+    TRANSFER_FILE_TYPES = [("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl")]
+
+    def _import_tasks(self):
+        path = filedialog.askopenfilename(parent=self.master, title="Import Tasks", filetypes=self.TRANSFER_FILE_TYPES)
+        if not path:
+            return
+        fmt = "jsonl" if path.lower().endswith(".jsonl") else "csv"
+
+        def on_done(result):
+            report, message = result
+            if report['imported']:
+                self._refresh_tasks_display()
+                self._refresh_stats()
+            details = "\n".join(f"Line {line_no}: {error}" for line_no, error in report['errors'][:10])
+            if message.startswith("Error"):
+                messagebox.showerror("Import Error", f"{message}\n{details}".strip())
+            else:
+                messagebox.showinfo("Import Result", f"{message}\n{details}".strip())
+            logger.info("GUI: Import from '%s' for user ID %s: %s", path, self.current_user_id, message)
+
+        self._run_async(self.app.import_tasks, self.current_user_id, path, fmt,
+                        on_done=on_done, disable=(self.import_button, self.export_button))
+
+    def _export_tasks(self):
+        path = filedialog.asksaveasfilename(parent=self.master, title="Export Tasks", defaultextension=".csv",
+                                            filetypes=self.TRANSFER_FILE_TYPES)
+        if not path:
+            return
+        fmt = "jsonl" if path.lower().endswith(".jsonl") else "csv"
+
+        def on_done(result):
+            _, message = result
+            if message.startswith("Error"):
+                messagebox.showerror("Export Error", message)
+            else:
+                messagebox.showinfo("Export Result", message)
+            logger.info("GUI: Export to '%s' for user ID %s: %s", path, self.current_user_id, message)
+
+        self._run_async(self.app.export_tasks, self.current_user_id, path, fmt,
+                        on_done=on_done, disable=(self.import_button, self.export_button))
+
+    # --- Archived Tasks (read-only, loaded page by page from tasks_archive) ---
+    def _show_archived_tasks(self):
+        if self.archive_window is not None and self.archive_window.winfo_exists():
+            self.archive_window.lift()
+            return
+
+        window = tk.Toplevel(self.master)
+        window.title("Archived Tasks")
+        window.geometry("450x300")
+        window.transient(self.master)
+        self.archive_window = window
+        tk.Label(window, text="Completed tasks moved to the archive, newest first:").pack(anchor="w", padx=10, pady=(10, 0))
+        list_frame = tk.Frame(window, padx=10, pady=10)
+        list_frame.pack(fill="both", expand=True)
+
+        def fetch_page(after, before, on_done):
+            def deliver(result):
+                if window.winfo_exists(): # Closed while the page was loading
+                    on_done(result)
+
+            self._run_async(self.app.get_archived_tasks, self.current_user_id, query=archive_view.query,
+                            after=after, before=before, on_done=deliver, key="archive_page")
+
+        archive_view = VirtualTaskList(list_frame, fetch_page=fetch_page, format_row=self._format_task,
+                                       page_size=self.TASK_PAGE_SIZE, max_pages=self.MAX_TASK_PAGES)
+        archive_view.set_query(TaskQuery(descending=True)) # Loads the first page
+        tk.Button(window, text="Close", command=window.destroy).pack(pady=(0, 10))
 
     # --- Update Task Dialog and Logic ---
     def _show_update_task_dialog(self):
@@ -246,10 +961,11 @@ class ToDoListGUI:
         if task_id_to_update is None:
             return
 
-        selected_task = next((task for task in self.tasks_data if task['id'] == task_id_to_update), None)
+        row = self.task_view.rows.get(task_id_to_update)
+        selected_task = self.task_view.tasks[row] if row is not None else None
         if not selected_task:
             messagebox.showerror("Error", "Could not retrieve details for selected task.")
-            logger.error(f"GUI: Task ID {task_id_to_update} not found in current tasks_data for update.")
+            logger.error("GUI: Task ID %s not found in the loaded task list for update.", task_id_to_update)
             return
 
         # --- Create a new top-level window for updating ---
@@ -264,12 +980,12 @@ class ToDoListGUI:
 
         # Labels and Entry fields for updating task details
         tk.Label(update_frame, text="Task Name:").grid(row=0, column=0, sticky="w", pady=5)
-        task_name_var = tk.StringVar(value=selected_task.get('task', ''))
+        task_name_var = tk.StringVar(value=selected_task.task)
         task_name_entry = tk.Entry(update_frame, textvariable=task_name_var, width=30)
         task_name_entry.grid(row=0, column=1, sticky="ew", padx=5)
 
         tk.Label(update_frame, text="Due Date (YYYY-MM-DD):").grid(row=1, column=0, sticky="w", pady=5)
-        current_due_date = selected_task.get('due_date')
+        current_due_date = selected_task.due_date
         if current_due_date and isinstance(current_due_date, date):
             current_due_date = current_due_date.strftime('%Y-%m-%d')
         else:
@@ -279,12 +995,12 @@ class ToDoListGUI:
         due_date_entry.grid(row=1, column=1, sticky="ew", padx=5)
 
         tk.Label(update_frame, text="Priority (0-10):").grid(row=2, column=0, sticky="w", pady=5)
-        priority_var = tk.StringVar(value=str(selected_task.get('priority', ''))) # Convert int to str for entry
+        priority_var = tk.StringVar(value='' if selected_task.priority is None else str(selected_task.priority)) # Convert int to str for entry
         priority_entry = tk.Entry(update_frame, textvariable=priority_var, width=30)
         priority_entry.grid(row=2, column=1, sticky="ew", padx=5)
 
         tk.Label(update_frame, text="Status (pending/completed):").grid(row=3, column=0, sticky="w", pady=5)
-        status_var = tk.StringVar(value=selected_task.get('task_status', 'pending'))
+        status_var = tk.StringVar(value=selected_task.task_status or 'pending')
         status_option_menu = tk.OptionMenu(update_frame, status_var, "pending", "completed")
         status_option_menu.grid(row=3, column=1, sticky="ew", padx=5)
 
@@ -302,7 +1018,7 @@ class ToDoListGUI:
                     updated_priority = int(updated_priority_str)
                 except ValueError:
                     messagebox.showerror("Input Error", "Priority must be an integer.")
-                    logger.warning(f"GUI: Invalid priority input '{updated_priority_str}' during update.")
+                    logger.warning("GUI: Invalid priority input '%s' during update.", updated_priority_str)
                     return
             
             # If task name is empty, treat as None for update
@@ -314,25 +1030,35 @@ class ToDoListGUI:
                 updated_due_date = None
 
 
+            def on_done(result):
+                updated_task, message = result
+                if "Success" in message or "Info" in message: # Info for no changes needed
+                    messagebox.showinfo("Update Result", message)
+                    if update_window.winfo_exists():
+                        update_window.destroy() # Close the update window
+                    if updated_task:
+                        self.task_view.replace_task(updated_task) # Patch just the edited row
+                    else:
+                        self.task_view.remove_task(task_id_to_update) # Deleted elsewhere meanwhile
+                    self._refresh_stats()
+                    logger.debug("GUI: Task ID %s updated for user ID: %s.", task_id_to_update, self.current_user_id)
+                else:
+                    messagebox.showerror("Update Error", message)
+                    logger.error("GUI: Failed to update Task ID %s for user ID: %s: %s", task_id_to_update, self.current_user_id, message)
+
             # Call the update_task method from ToDoListApp
-            message = self.app.update_task(
+            self._run_async(
+                self.app.update_task,
                 user_id=self.current_user_id,
                 task_id=task_id_to_update,
                 task_name=updated_task_name,
                 due_date=updated_due_date,
                 priority=updated_priority,
-                task_status=updated_status # Pass the status
+                task_status=updated_status, # Pass the status
+                on_done=on_done,
+                disable=(update_button,),
             )
 
-            if "Success" in message or "Info" in message: # Info for no changes needed
-                messagebox.showinfo("Update Result", message)
-                update_window.destroy() # Close the update window
-                self._refresh_tasks_display() # Refresh the main list
-                logger.info(f"GUI: Task ID {task_id_to_update} updated for user ID: {self.current_user_id}.")
-            else:
-                messagebox.showerror("Update Error", message)
-                logger.error(f"GUI: Failed to update Task ID {task_id_to_update} for user ID: {self.current_user_id}: {message}")
-
         update_button = tk.Button(update_frame, text="Apply Update", command=perform_update)
         update_button.grid(row=4, column=0, columnspan=2, pady=10)
 
@@ -341,8 +1067,15 @@ class ToDoListGUI:
         update_window.protocol("WM_DELETE_WINDOW", update_window.destroy) # Handle window close
 
     def _logout(self):
-        logger.info(f"GUI: User ID {self.current_user_id} logged out.")
+        logger.info("GUI: User ID %s logged out.", self.current_user_id)
+        self._save_snapshot()
+        self.dispatcher.cancel_all() # Responses for the old session must not reach the login screen
+        if self._search_after_id is not None:
+            self.master.after_cancel(self._search_after_id)
+            self._search_after_id = None
         self.current_user_id = None
+        if self.archive_window is not None and self.archive_window.winfo_exists():
+            self.archive_window.destroy()
         self.main_todo_frame.pack_forget() # Hide main todo frame
         self.login_frame.pack(pady=20) # Show login frame again
         self.username_entry.delete(0, tk.END) # Clear fields
@@ -0,0 +1,57 @@
+# archive.py
+
+import argparse
+import os
+from dotenv import load_dotenv
+
+from periodic import PeriodicJob, run_command_once
+
+
+class TaskArchiver(PeriodicJob):
+    """
+    Periodically moves long-completed tasks from tasks into tasks_archive
+    (see ToDoListApp.archive_completed_tasks), keeping the live table small.
+    """
+
+    def __init__(self, app, older_than_days: float, interval: float = 3600.0, batch_size: int = 500):
+        super().__init__(
+            "task-archiver",
+            lambda: app.archive_completed_tasks(older_than_days, batch_size=batch_size),
+            interval,
+        )
+        self.older_than_days = older_than_days
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_env(cls, app):
+        """Returns an archiver if ARCHIVE_AFTER_DAYS is set, otherwise None."""
+        load_dotenv()
+        days = os.getenv('ARCHIVE_AFTER_DAYS')
+        if not days:
+            return None
+        return cls(
+            app,
+            float(days),
+            interval=float(os.getenv('ARCHIVE_INTERVAL_SECONDS', '3600')),
+            batch_size=int(os.getenv('ARCHIVE_BATCH_SIZE', '500')),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move long-completed tasks into tasks_archive.")
+    parser.add_argument("user_ids", nargs="*", type=int, help="Users to archive for (default: all users).")
+    parser.add_argument("--older-than-days", type=float,
+                        help="Archive tasks completed more than this many days ago (default ARCHIVE_AFTER_DAYS or 30).")
+    parser.add_argument("--batch-size", type=int, default=500, help="Tasks moved per transaction.")
+    args = parser.parse_args()
+
+    load_dotenv()
+    days = args.older_than_days
+    if days is None and os.getenv('ARCHIVE_AFTER_DAYS'):
+        days = float(os.getenv('ARCHIVE_AFTER_DAYS'))
+
+    run_command_once(lambda app: app.archive_completed_tasks(days, args.user_ids or None, batch_size=args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# async_commands.py
+
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from commands import ToDoListApp
+from storage import TaskQuery
+logger = logging.getLogger(__name__)
+
+_MESSAGE_ONLY = object() # The command returns a bare message string rather than (value, message)
+
+
+class AsyncToDoListApp:
+    """
+    asyncio front end for ToDoListApp. Every command runs the synchronous command on a
+    bounded worker pool and is awaited, so validation, caching, metrics and error messages
+    are exactly those of ToDoListApp, and return values are the same (value, message) tuples.
+
+    An in-flight request waiting here is a suspended coroutine, not a thread: thousands can
+    be pending per process while only max_workers threads (sized to the connection pool) ever
+    touch the database. max_pending bounds the requests queued behind them; beyond it a
+    command fails fast with an "Error: ... busy" message instead of queueing without limit.
+    """
+    def __init__(self, app: ToDoListApp, max_workers: int = 8, max_pending: int = 10_000):
+        self.app = app
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="todo-async")
+        self._pending = 0 # Requests submitted and not yet finished; only touched on the event loop thread
+
+    @classmethod
+    def from_env(cls, app: ToDoListApp):
+        return cls(
+            app,
+            # More workers than pooled connections would only wait inside the pool
+            max_workers=max(1, int(os.getenv('ASYNC_WORKERS') or os.getenv('DB_POOL_SIZE') or '5')),
+            max_pending=int(os.getenv('ASYNC_MAX_PENDING', '10000')),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def _call(self, func, *args, busy_value=_MESSAGE_ONLY, **kwargs):
+        """Awaits func(*args, **kwargs) on the worker pool; busy_value is the value half of the busy reply."""
+        if self._pending >= self.max_pending:
+            logger.warning("Async: Rejecting %s; %s requests already pending.", func.__name__, self._pending)
+            message = "Error: The server is busy; please retry."
+            return message if busy_value is _MESSAGE_ONLY else (busy_value, message)
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self._pending -= 1
+
+    # --- Setup ---
+    async def setup_database(self):
+        return await self._call(self.app.setup_database)
+
+    # --- Users ---
+    async def add_user(self, username: str, password: str) -> str:
+        return await self._call(self.app.add_user, username, password)
+
+    async def authenticate_user(self, username: str, password: str) -> tuple:
+        return await self._call(self.app.authenticate_user, username, password, busy_value=None)
+
+    # --- Tasks ---
+    async def add_task(self, user_id: int, task_name: str, due_date: str = None, priority: int = None) -> tuple:
+        return await self._call(self.app.add_task, user_id, task_name, due_date, priority, busy_value=None)
+
+    async def update_task(self, user_id: int, task_id: int, task_name: str = None, due_date: str = None,
+                          priority: int = None, task_status: str = None) -> tuple:
+        return await self._call(self.app.update_task, user_id, task_id, task_name=task_name, due_date=due_date,
+                                priority=priority, task_status=task_status, busy_value=None)
+
+    async def delete_task(self, user_id: int, task_id: int) -> str:
+        return await self._call(self.app.delete_task, user_id, task_id)
+
+    async def add_tasks(self, user_id: int, tasks: list[dict]) -> tuple:
+        return await self._call(self.app.add_tasks, user_id, tasks, busy_value=[])
+
+    async def update_tasks(self, user_id: int, task_ids: list[int], task_name: str = None, due_date: str = None,
+                           priority: int = None, task_status: str = None) -> tuple:
+        return await self._call(self.app.update_tasks, user_id, task_ids, task_name=task_name, due_date=due_date,
+                                priority=priority, task_status=task_status, busy_value={})
+
+    async def delete_tasks(self, user_id: int, task_ids: list[int]) -> tuple:
+        return await self._call(self.app.delete_tasks, user_id, task_ids, busy_value={})
+
+    async def get_user_tasks(self, user_id: int, query: TaskQuery = None, after: tuple = None,
+                             before: tuple = None, columnar: bool = False) -> tuple:
+        return await self._call(self.app.get_user_tasks, user_id, query, after=after, before=before,
+                                columnar=columnar, busy_value=None)
+
+    async def search_tasks(self, user_id: int, text: str, limit: int = None, prefix: bool = True) -> tuple:
+        return await self._call(self.app.search_tasks, user_id, text, limit=limit, prefix=prefix, busy_value=None)
+
+    def build_task_query(self, *args, **kwargs) -> tuple:
+        """Pure validation with no I/O, so it runs inline rather than on the worker pool."""
+        return self.app.build_task_query(*args, **kwargs)
+
+    # --- Streaming import/export ---
+    async def export_tasks(self, user_id: int, path: str, fmt: str = 'csv') -> tuple:
+        return await self._call(self.app.export_tasks, user_id, path, fmt, busy_value=0)
+
+    async def import_tasks(self, user_id: int, path: str, fmt: str = 'csv', batch_size: int = 1000,
+                           max_reported_errors: int = 1000) -> tuple:
+        return await self._call(self.app.import_tasks, user_id, path, fmt, batch_size=batch_size,
+                                max_reported_errors=max_reported_errors, busy_value={})
+
+    def get_metrics(self) -> dict:
+        return self.app.get_metrics()
@@ -0,0 +1,175 @@
+# auth.py
+
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class HasherBusyError(Exception):
+    """Raised when the password hashing queue is full; callers should ask the user to retry."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool with a bounded queue, so hashing load is
+    capped no matter how many logins arrive (bcrypt releases the GIL while it works).
+    The work factor is configurable; hashes made with a different cost are flagged by
+    needs_rehash() so they can be upgraded transparently on the next successful login.
+    """
+    def __init__(self, rounds: int = 12, max_workers: int = 2, max_pending: int = 32):
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending) # Running + queued jobs
+        # Made up front on the pool, so the first unknown-username login costs one verify like any other
+        self._dummy_hash = self._executor.submit(self._hash, "dummy-password-for-timing", rounds)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            rounds=int(os.getenv('BCRYPT_ROUNDS', '12')),
+            max_workers=int(os.getenv('BCRYPT_WORKERS', '2')),
+            max_pending=int(os.getenv('BCRYPT_MAX_PENDING', '32')),
+        )
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusyError("Password hashing queue is full.")
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password: str) -> str:
+        return self._run(self._hash, password, self.rounds)
+
+    def verify(self, password: str, stored_hash: str) -> bool:
+        return self._run(self._verify, password, stored_hash)
+
+    def verify_dummy(self, password: str):
+        """Spends the same time as a real verify, so unknown usernames cannot be told apart by timing."""
+        self.verify(password, self._dummy_hash.result())
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        # bcrypt hashes look like $2b$12$<salt+hash>; the second field is the cost
+        try:
+            return int(stored_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # bcrypt is imported on first use, on the hashing pool, so it stays off the startup path
+    @staticmethod
+    def _hash(password: str, rounds: int) -> str:
+        import bcrypt
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+    @staticmethod
+    def _verify(password: str, stored_hash: str) -> bool:
+        import bcrypt
+        return bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8'))
+
+
+class LoginThrottle:
+    """
+    Per-username failed-attempt limiter. After max_failures failures inside window_seconds,
+    further attempts for that username are refused without doing any bcrypt work.
+    """
+    def __init__(self, max_failures: int = 5, window_seconds: float = 60.0, max_tracked: int = 10_000):
+        self.max_failures = max_failures
+        self.window_seconds = window_seconds
+        self.max_tracked = max_tracked # Bounds memory when attackers spray many usernames
+        self._failures = OrderedDict() # username -> deque of failure timestamps, oldest user first
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_failures=int(os.getenv('LOGIN_MAX_FAILURES', '5')),
+            window_seconds=float(os.getenv('LOGIN_FAILURE_WINDOW_SECONDS', '60')),
+        )
+
+    def retry_after(self, username: str) -> float:
+        """Returns how many seconds the username must wait before trying again (0 if allowed now)."""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.get(username)
+            if not failures:
+                return 0.0
+            while failures and now - failures[0] > self.window_seconds:
+                failures.popleft()
+            if len(failures) < self.max_failures:
+                return 0.0
+            return self.window_seconds - (now - failures[0])
+
+    def record_failure(self, username: str):
+        with self._lock:
+            failures = self._failures.pop(username, None) or deque(maxlen=self.max_failures)
+            failures.append(time.monotonic())
+            self._failures[username] = failures
+            while len(self._failures) > self.max_tracked:
+                self._failures.popitem(last=False)
+
+    def record_success(self, username: str):
+        with self._lock:
+            self._failures.pop(username, None)
+
+
+class SessionStore:
+    """
+    Bearer tokens for the HTTP server, issued after authenticate_user succeeds so bcrypt runs
+    once per login rather than once per request. Tokens are random and kept only in memory;
+    each use slides its expiry forward, and the oldest sessions are dropped beyond max_sessions.
+    """
+    def __init__(self, ttl_seconds: float = 3600.0, max_sessions: int = 100_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict() # token -> (user_id, expires at), least recently used first
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            ttl_seconds=float(os.getenv('SESSION_TTL_SECONDS', '3600')),
+            max_sessions=int(os.getenv('SESSION_MAX', '100000')),
+        )
+
+    def create(self, user_id: int) -> str:
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[token] = (user_id, time.monotonic() + self.ttl_seconds)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return token
+
+    def user_for(self, token: str) -> int | None:
+        """Returns the token's user_id and extends its expiry, or None if it is unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            user_id, expires_at = session
+            if expires_at <= now:
+                del self._sessions[token]
+                return None
+            self._sessions[token] = (user_id, now + self.ttl_seconds)
+            self._sessions.move_to_end(token)
+            return user_id
+
+    def revoke(self, token: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(token, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
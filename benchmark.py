@@ -0,0 +1,646 @@
+# benchmark.py
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from async_commands import AsyncToDoListApp
+from auth import LoginThrottle, PasswordHasher
+from commands import ToDoListApp
+from log_config import LOG_FORMAT, configure_logging
+from storage import TaskBatch, TaskQuery, open_storage
+from task_cache import TaskCache
+
+logger = logging.getLogger(__name__)
+
+OPERATIONS = ('authenticate_user', 'add_task', 'update_task', 'delete_task', 'get_user_tasks', 'get_user_tasks_page', 'search_tasks')
+BENCH_PASSWORD = "bench-password"
+SEED_BATCH_SIZE = 5000
+
+
+def parse_scale(value: str) -> int:
+    """Parses a task count such as 1000, 1k, 100k or 1m."""
+    value = value.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    if multiplier != 1:
+        value = value[:-1]
+    try:
+        count = int(float(value) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid scale '{value}'; use e.g. 1k, 100k or 1m.")
+    if count <= 0:
+        raise argparse.ArgumentTypeError("Scale must be positive.")
+    return count
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values) + 0.5))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_rss_kb() -> int | None:
+    """Peak resident set size of this process in KiB, or None where the platform cannot report it."""
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak # macOS reports bytes, Linux KiB
+
+
+class Workload:
+    """Synthetic users and tasks, seeded straight through the storage layer so setup stays fast."""
+    def __init__(self, storage, hasher: PasswordHasher, tasks: int, users: int, seed: int = 42):
+        self.storage = storage
+        self.hasher = hasher
+        self.total_tasks = tasks
+        self.users = users
+        self.rng = random.Random(seed)
+        self.user_names = []
+        self.task_ranges = {} # user_id -> (first task id, last task id) of its seeded tasks
+        self.created = deque() # Tasks made by the add_task phase, consumed by delete_task
+
+    def seed(self):
+        started = time.perf_counter()
+        password_hash = self.hasher.hash(BENCH_PASSWORD) # One hash shared by every user keeps seeding cheap
+        run_tag = f"{os.getpid()}_{int(time.time())}" # Unique names, so reruns against one MySQL database do not collide
+        per_user, extra = divmod(self.total_tasks, self.users)
+        today = date.today()
+
+        with self.storage as conn:
+            for index in range(self.users):
+                name = f"bench_{run_tag}_{index}"
+                user_id = conn.add_user(name, password_hash)
+                self.user_names.append((user_id, name))
+                count = per_user + (1 if index < extra else 0)
+                for start in range(0, count, SEED_BATCH_SIZE):
+                    rows = [
+                        (f"Benchmark task {start + i}",
+                         today + timedelta(days=self.rng.randint(-30, 335)) if self.rng.random() < 0.8 else None,
+                         self.rng.randint(0, 10) if self.rng.random() < 0.8 else None,
+                         'completed' if self.rng.random() < 0.3 else 'pending')
+                        for i in range(min(SEED_BATCH_SIZE, count - start))
+                    ]
+                    conn.add_tasks(user_id, rows, return_records=False)
+                    conn.commit()
+                # Seeded ids are contiguous per user, so (count, max id) gives the whole range
+                row_count, max_id = conn.get_tasks_fingerprint(user_id)
+                if row_count:
+                    self.task_ranges[user_id] = (max_id - row_count + 1, max_id)
+
+        logger.info("Benchmark: Seeded %s users and %s tasks in %.1fs.", self.users, self.total_tasks, time.perf_counter() - started)
+
+    def random_user(self, rng: random.Random) -> tuple[int, str]:
+        return rng.choice(self.user_names)
+
+    def random_task(self, rng: random.Random) -> tuple[int, int]:
+        user_id = rng.choice(list(self.task_ranges)) if self.task_ranges else self.user_names[0][0]
+        first, last = self.task_ranges.get(user_id, (1, 1))
+        return user_id, rng.randint(first, last)
+
+
+def make_operation(name: str, app: ToDoListApp, workload: Workload):
+    """Returns a callable(rng) -> bool (True on success) that performs one call of the named command."""
+    page_query = TaskQuery(sort_key='due_date', limit=100)
+
+    def authenticate_user(rng):
+        _, username = workload.random_user(rng)
+        user_id, _ = app.authenticate_user(username, BENCH_PASSWORD)
+        return user_id is not None
+
+    def add_task(rng):
+        user_id, _ = workload.random_user(rng)
+        task, message = app.add_task(user_id, "Benchmark add", (date.today() + timedelta(days=rng.randint(0, 60))).isoformat(), rng.randint(0, 10))
+        if task is not None:
+            workload.created.append((user_id, task.id))
+        return task is not None
+
+    def update_task(rng):
+        user_id, task_id = workload.random_task(rng)
+        task, message = app.update_task(user_id, task_id, priority=rng.randint(0, 10))
+        return not message.startswith("Error")
+
+    def delete_task(rng):
+        try:
+            user_id, task_id = workload.created.popleft()
+        except IndexError:
+            return False # Ran out of tasks from the add phase
+        return app.delete_task(user_id, task_id).startswith("Success")
+
+    def get_user_tasks(rng):
+        user_id, _ = workload.random_user(rng)
+        tasks, message = app.get_user_tasks(user_id)
+        return not message.startswith("Error")
+
+    def get_user_tasks_page(rng):
+        user_id, _ = workload.random_user(rng)
+        tasks, message = app.get_user_tasks(user_id, page_query)
+        return not message.startswith("Error")
+
+    def search_tasks(rng):
+        # Seeded tasks are "Benchmark task <n>": a one to three digit prefix, as typed into the search box
+        user_id, _ = workload.random_user(rng)
+        tasks, message = app.search_tasks(user_id, f"task {rng.randint(1, 999)}")
+        return not message.startswith("Error")
+
+    return {
+        'authenticate_user': authenticate_user,
+        'add_task': add_task,
+        'update_task': update_task,
+        'delete_task': delete_task,
+        'get_user_tasks': get_user_tasks,
+        'get_user_tasks_page': get_user_tasks_page,
+        'search_tasks': search_tasks,
+    }[name]
+
+
+def run_operation(operation, count: int, concurrency: int, seed: int) -> dict:
+    """Runs count calls split across concurrency threads and summarizes their latencies."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    counter = itertools.count()
+
+    def worker(worker_index):
+        nonlocal errors
+        rng = random.Random(seed + worker_index)
+        local_latencies, local_errors = [], 0
+        while next(counter) < count:
+            started = time.perf_counter()
+            try:
+                ok = operation(rng)
+            except Exception:
+                logger.exception("Benchmark: Operation raised.")
+                ok = False
+            local_latencies.append(time.perf_counter() - started)
+            local_errors += not ok
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    wall = time.perf_counter() - started
+    return summarize_latencies(latencies, errors, wall)
+
+
+def summarize_latencies(latencies: list[float], errors: int, wall: float) -> dict:
+    latencies.sort()
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        'throughput_ops_s': round(len(latencies) / wall, 1) if wall else 0.0,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+ASYNC_OPERATIONS = ('add_task', 'get_user_tasks_page', 'search_tasks')
+
+
+def make_async_operation(name: str, app: AsyncToDoListApp, workload: Workload):
+    """Async counterpart of make_operation: returns a coroutine function(rng) -> bool."""
+    page_query = TaskQuery(sort_key='due_date', limit=100)
+
+    async def add_task(rng):
+        user_id, _ = workload.random_user(rng)
+        task, message = await app.add_task(user_id, "Benchmark add", (date.today() + timedelta(days=rng.randint(0, 60))).isoformat(), rng.randint(0, 10))
+        return task is not None
+
+    async def get_user_tasks_page(rng):
+        user_id, _ = workload.random_user(rng)
+        tasks, message = await app.get_user_tasks(user_id, page_query)
+        return not message.startswith("Error")
+
+    async def search_tasks(rng):
+        user_id, _ = workload.random_user(rng)
+        tasks, message = await app.search_tasks(user_id, f"task {rng.randint(1, 999)}")
+        return not message.startswith("Error")
+
+    return {
+        'add_task': add_task,
+        'get_user_tasks_page': get_user_tasks_page,
+        'search_tasks': search_tasks,
+    }[name]
+
+
+async def run_async_operation(operation, count: int, concurrency: int, seed: int) -> dict:
+    """Runs count calls split across concurrency coroutines on one event loop thread."""
+    latencies = []
+    errors = 0
+    counter = itertools.count()
+
+    async def worker(worker_index):
+        nonlocal errors
+        rng = random.Random(seed + worker_index)
+        while next(counter) < count:
+            started = time.perf_counter()
+            try:
+                ok = await operation(rng)
+            except Exception:
+                logger.exception("Benchmark: Operation raised.")
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize_latencies(latencies, errors, time.perf_counter() - started)
+
+
+def run_async_benchmark(args) -> dict:
+    """
+    Serves the same calls at each concurrency level two ways: the synchronous ToDoListApp with
+    one thread per in-flight request, and AsyncToDoListApp with one coroutine per request
+    over a fixed worker pool. Reports latency, throughput and the threads each needed.
+    """
+    workdir = tempfile.mkdtemp(prefix="todo-bench-")
+    os.environ['SQLITE_PATH'] = os.path.join(workdir, "bench.db")
+    storage = open_storage('sqlite')
+    hasher = PasswordHasher(rounds=4)
+    app = ToDoListApp(storage, task_cache=TaskCache(max_rows=0), hasher=hasher)
+    async_app = AsyncToDoListApp(app, max_workers=args.workers, max_pending=max(args.concurrency))
+    try:
+        app.setup_database()
+        workload = Workload(storage, hasher, args.scale, args.users, args.seed)
+        workload.seed()
+
+        results = {}
+        for name in ASYNC_OPERATIONS:
+            results[name] = {}
+            for concurrency in args.concurrency:
+                sync_summary = run_operation(make_operation(name, app, workload), args.ops, concurrency, args.seed)
+                async_summary = asyncio.run(run_async_operation(
+                    make_async_operation(name, async_app, workload), args.ops, concurrency, args.seed))
+                results[name][f"c{concurrency}"] = {
+                    'sync': {**sync_summary, 'threads': concurrency},
+                    'async': {**async_summary, 'threads': args.workers},
+                }
+                logger.info("Benchmark: %s x%s: sync p95 %sms %s ops/s, async p95 %sms %s ops/s", name, concurrency,
+                            sync_summary['p95_ms'], sync_summary['throughput_ops_s'],
+                            async_summary['p95_ms'], async_summary['throughput_ops_s'])
+        return {
+            'meta': {'tasks': args.scale, 'users': args.users, 'ops': args.ops, 'workers': args.workers,
+                     'concurrency': args.concurrency, 'python': platform.python_version()},
+            'results': results,
+            'peak_rss_kb': peak_rss_kb(),
+        }
+    finally:
+        async_app.close()
+        hasher.shutdown()
+        storage.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_benchmark(args) -> dict:
+    workdir = None
+    if args.backend == 'sqlite':
+        sqlite_path = args.sqlite_path
+        if sqlite_path is None:
+            workdir = tempfile.mkdtemp(prefix="todo-bench-")
+            sqlite_path = os.path.join(workdir, "bench.db")
+        os.environ['SQLITE_PATH'] = sqlite_path
+    storage = open_storage(args.backend)
+
+    hasher = PasswordHasher(rounds=args.bcrypt_rounds, max_workers=max(2, min(args.concurrency)), max_pending=1024)
+    cache = TaskCache(max_rows=0) if args.no_cache else TaskCache.from_env()
+    # The throttle is effectively off: every benchmark login succeeds, but it must never block one
+    app = ToDoListApp(storage, task_cache=cache, hasher=hasher, login_throttle=LoginThrottle(max_failures=10**9))
+    try:
+        app.setup_database()
+        workload = Workload(storage, hasher, args.scale, args.users, args.seed)
+        workload.seed()
+
+        results = {}
+        for name in args.operations:
+            operation = make_operation(name, app, workload)
+            count = min(args.ops, args.auth_ops) if name == 'authenticate_user' else args.ops
+            results[name] = {}
+            for concurrency in args.concurrency:
+                app.task_cache.clear() # Every run starts cold, so runs are comparable
+                summary = run_operation(operation, count, concurrency, args.seed)
+                results[name][f"c{concurrency}"] = summary
+                logger.info("Benchmark: %s x%s: p50 %sms, p95 %sms, %s ops/s", name, concurrency, summary['p50_ms'], summary['p95_ms'], summary['throughput_ops_s'])
+
+        return {
+            'meta': {
+                'backend': args.backend,
+                'tasks': args.scale,
+                'users': args.users,
+                'ops': args.ops,
+                'auth_ops': args.auth_ops,
+                'concurrency': args.concurrency,
+                'bcrypt_rounds': args.bcrypt_rounds,
+                'cache': not args.no_cache,
+                'seed': args.seed,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            },
+            'results': results,
+            'peak_rss_kb': peak_rss_kb(),
+            'metrics': app.get_metrics(), # Per-statement and per-command histograms across the whole run
+            'statement_cache': storage.statement_cache_stats(), # Misses are server-side parses (MySQL)
+        }
+    finally:
+        hasher.shutdown()
+        storage.close()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+LOGGING_SETUPS = ('sync_debug', 'queue_debug', 'queue_warning')
+LOGGED_OPERATIONS = ('add_task', 'update_task', 'delete_task', 'get_user_tasks_page')
+
+
+def measure_log_call_cost(iterations: int) -> dict:
+    """Nanoseconds per call of a typical hot-path message: eager f-string vs lazy %-style, level off and on."""
+    probe = logging.getLogger("benchmark.probe")
+    probe.propagate = False
+    probe.addHandler(logging.NullHandler())
+    user_id, task_id = 42, 1234
+
+    def eager():
+        probe.info(f"Database: Task ID {task_id} deleted successfully for user_id {user_id}.")
+
+    def lazy():
+        probe.info("Database: Task ID %s deleted successfully for user_id %s.", task_id, user_id)
+
+    costs = {}
+    for level_name, level in (('disabled', logging.WARNING), ('enabled', logging.INFO)):
+        probe.setLevel(level)
+        for style, call in (('eager_fstring', eager), ('lazy_percent', lazy)):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                call()
+            costs[f"{style}_{level_name}_ns"] = round((time.perf_counter() - started) / iterations * 1e9, 1)
+    return costs
+
+
+def run_logging_benchmark(args) -> dict:
+    """
+    Times the write and read commands under three logging setups: every hot-path message
+    written synchronously by the calling thread (how the app behaved before), the same
+    messages through the QueueHandler pipeline, and the default WARNING level with the queue.
+    """
+    workdir = tempfile.mkdtemp(prefix="todo-bench-")
+    os.environ['SQLITE_PATH'] = os.path.join(workdir, "bench.db")
+    log_path = os.path.join(workdir, "bench.log")
+    storage = open_storage('sqlite')
+    hasher = PasswordHasher(rounds=4)
+    app = ToDoListApp(storage, task_cache=TaskCache(max_rows=0), hasher=hasher)
+    root = logging.getLogger()
+    try:
+        app.setup_database()
+        workload = Workload(storage, hasher, args.scale, args.users, args.seed)
+        workload.seed()
+
+        results = {}
+        for setup in LOGGING_SETUPS:
+            listener = None
+            if setup == 'sync_debug':
+                handler = logging.FileHandler(log_path, encoding='utf-8')
+                handler.setFormatter(logging.Formatter(LOG_FORMAT))
+                for old in list(root.handlers):
+                    root.removeHandler(old)
+                root.addHandler(handler)
+                root.setLevel(logging.DEBUG)
+            else:
+                listener = configure_logging('DEBUG' if setup == 'queue_debug' else 'WARNING', log_path, console=False)
+            try:
+                results[setup] = {
+                    name: run_operation(make_operation(name, app, workload), args.ops, 1, args.seed)
+                    for name in LOGGED_OPERATIONS
+                }
+            finally:
+                if listener is not None:
+                    listener.stop()
+                for handler in list(root.handlers):
+                    root.removeHandler(handler)
+                    handler.close()
+
+        baseline = results['sync_debug']
+        overhead = {
+            setup: {name: round(results[setup][name]['mean_ms'] - baseline[name]['mean_ms'], 4) for name in LOGGED_OPERATIONS}
+            for setup in LOGGING_SETUPS
+        }
+        return {
+            'meta': {'tasks': args.scale, 'users': args.users, 'ops': args.ops, 'python': platform.python_version()},
+            'log_call_cost': measure_log_call_cost(args.iterations),
+            'results': results,
+            'mean_ms_change_vs_sync_debug': overhead,
+        }
+    finally:
+        hasher.shutdown()
+        storage.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+ROW_FORMS = ('dict_rows', 'task_records', 'task_batch')
+
+
+def measure_allocation(load) -> tuple:
+    """Runs load() under tracemalloc; returns (result, bytes still held by it, peak bytes during the load)."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = load()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, current - before, peak - before
+
+
+def run_memory_benchmark(args) -> dict:
+    """
+    Loads one user's task list in each row form and reports the memory it holds and the peak
+    while loading, scaled to 100k tasks: per-row dicts (what a dictionary cursor builds, as
+    the backends did before), TaskRecords from a tuple cursor, and a columnar TaskBatch.
+    """
+    workdir = tempfile.mkdtemp(prefix="todo-bench-")
+    os.environ['SQLITE_PATH'] = os.path.join(workdir, "bench.db")
+    storage = open_storage('sqlite')
+    hasher = PasswordHasher(rounds=4)
+    try:
+        ToDoListApp(storage, task_cache=TaskCache(max_rows=0), hasher=hasher).setup_database()
+        workload = Workload(storage, hasher, args.scale, 1, args.seed)
+        workload.seed()
+        user_id = workload.user_names[0][0]
+
+        def dict_rows(conn):
+            cursor = conn.con.cursor() # The connection's row factory builds one dict per row
+            try:
+                cursor.execute(f"SELECT {storage.TASK_COLUMNS} FROM tasks WHERE user_id = ? ORDER BY id ASC", (user_id,))
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+        loaders = {
+            'dict_rows': dict_rows,
+            'task_records': lambda conn: conn.get_tasks(user_id),
+            'task_batch': lambda conn: TaskBatch(conn.iter_tasks(user_id)),
+        }
+        results = {}
+        with storage as conn:
+            for form in ROW_FORMS:
+                tasks, held, peak = measure_allocation(lambda: loaders[form](conn))
+                scale = 100_000 / len(tasks)
+                results[form] = {
+                    'rows': len(tasks),
+                    'bytes_per_row': round(held / len(tasks), 1),
+                    'held_mb_per_100k': round(held * scale / 2**20, 2),
+                    'peak_mb_per_100k': round(peak * scale / 2**20, 2),
+                }
+                del tasks
+        return {
+            'meta': {'tasks': args.scale, 'python': platform.python_version()},
+            'results': results,
+        }
+    finally:
+        hasher.shutdown()
+        storage.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    """
+    Compares two benchmark reports. A regression is a p95 latency that grew, or a throughput
+    that fell, by more than threshold (a fraction, e.g. 0.1 for 10%).
+    """
+    rows = []
+    for name, runs in current.get('results', {}).items():
+        for run, summary in runs.items():
+            base = baseline.get('results', {}).get(name, {}).get(run)
+            if base is None:
+                continue
+            p95_change = (summary['p95_ms'] - base['p95_ms']) / base['p95_ms'] if base['p95_ms'] else 0.0
+            throughput_change = ((summary['throughput_ops_s'] - base['throughput_ops_s']) / base['throughput_ops_s']
+                                 if base['throughput_ops_s'] else 0.0)
+            rows.append({
+                'operation': name,
+                'run': run,
+                'baseline_p95_ms': base['p95_ms'],
+                'p95_ms': summary['p95_ms'],
+                'p95_change': round(p95_change, 4),
+                'baseline_throughput_ops_s': base['throughput_ops_s'],
+                'throughput_ops_s': summary['throughput_ops_s'],
+                'throughput_change': round(throughput_change, 4),
+                'regression': p95_change > threshold or throughput_change < -threshold,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ToDoListApp command layer.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Seed a synthetic dataset and time the commands.")
+    run.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite",
+                     help="sqlite uses a throwaway file; mysql uses the .env database, so point DB_NAME at a scratch schema.")
+    run.add_argument("--sqlite-path", help="Keep the SQLite dataset at this path instead of a temporary file.")
+    run.add_argument("--scale", type=parse_scale, default=parse_scale("1k"), help="Total seeded tasks: 1k, 100k, 1m, ...")
+    run.add_argument("--users", type=int, default=100)
+    run.add_argument("--ops", type=int, default=1000, help="Calls per operation and concurrency level.")
+    run.add_argument("--auth-ops", type=int, default=100, help="Calls for authenticate_user, which is dominated by bcrypt.")
+    run.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 8],
+                     help="Comma-separated caller thread counts, e.g. 1,8.")
+    run.add_argument("--operations", type=lambda v: v.split(","), default=list(OPERATIONS),
+                     help=f"Comma-separated subset of: {', '.join(OPERATIONS)}.")
+    run.add_argument("--bcrypt-rounds", type=int, default=12)
+    run.add_argument("--no-cache", action="store_true", help="Disable the task cache to time the storage path.")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--output", help="Write the JSON report here instead of stdout.")
+
+    log_bench = subparsers.add_parser("logging", help="Measure per-operation logging overhead by logging setup.")
+    log_bench.add_argument("--scale", type=parse_scale, default=parse_scale("10k"))
+    log_bench.add_argument("--users", type=int, default=10)
+    log_bench.add_argument("--ops", type=int, default=2000)
+    log_bench.add_argument("--iterations", type=int, default=200_000, help="Calls for the log-call micro-benchmark.")
+    log_bench.add_argument("--seed", type=int, default=42)
+
+    async_bench = subparsers.add_parser("async", help="Compare AsyncToDoListApp with thread-per-request ToDoListApp.")
+    async_bench.add_argument("--scale", type=parse_scale, default=parse_scale("10k"))
+    async_bench.add_argument("--users", type=int, default=100)
+    async_bench.add_argument("--ops", type=int, default=2000, help="Calls per operation and concurrency level.")
+    async_bench.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 100, 1000],
+                             help="Comma-separated in-flight request counts, e.g. 1,100,1000.")
+    async_bench.add_argument("--workers", type=int, default=8, help="AsyncToDoListApp worker threads.")
+    async_bench.add_argument("--seed", type=int, default=42)
+
+    memory = subparsers.add_parser("memory", help="Compare the memory held by task lists in each row form.")
+    memory.add_argument("--scale", type=parse_scale, default=parse_scale("100k"), help="Tasks loaded for one user.")
+    memory.add_argument("--seed", type=int, default=42)
+
+    compare = subparsers.add_parser("compare", help="Flag regressions of a report against a baseline.")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=0.10, help="Allowed relative change (default 0.10).")
+
+    args = parser.parse_args()
+    if args.command == "logging":
+        print(json.dumps(run_logging_benchmark(args), indent=2))
+        return
+    if args.command == "memory":
+        print(json.dumps(run_memory_benchmark(args), indent=2))
+        return
+
+    logging.basicConfig(level=logging.WARNING) # Keeps the timings free of log I/O
+    logger.setLevel(logging.INFO) # Progress lines from this module only
+
+    if args.command == "async":
+        print(json.dumps(run_async_benchmark(args), indent=2))
+        return
+
+    if args.command == "run":
+        unknown = set(args.operations) - set(OPERATIONS)
+        if unknown:
+            parser.error(f"Unknown operations: {', '.join(sorted(unknown))}")
+        report = run_benchmark(args)
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    rows = compare_results(baseline, current, args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row['regression'] else "ok"
+        print(f"{row['operation']:<22} {row['run']:<5} p95 {row['baseline_p95_ms']:>9.3f} -> {row['p95_ms']:>9.3f} ms "
+              f"({row['p95_change']:+.1%})  throughput {row['baseline_throughput_ops_s']:>9.1f} -> "
+              f"{row['throughput_ops_s']:>9.1f} ops/s ({row['throughput_change']:+.1%})  {flag}")
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}.")
+        raise SystemExit(1)
+    print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,190 +1,249 @@
 # commands.py
 
-from database import Database
-from datetime import datetime, date # Import date as well for type hinting if needed
+from storage import TaskBatch, TaskChanges, TaskQuery, TaskRecord, TaskStats, TaskStorage, search_terms
+from datetime import datetime, date, timedelta # Import date as well for type hinting if needed
+import csv
+import json
 import logging
-import bcrypt
-import mysql.connector as mysql
+import math
+import time
+from auth import HasherBusyError, LoginThrottle, PasswordHasher
+from metrics import REGISTRY, MetricsRegistry, timed_command
+from task_cache import TaskCache
 logger = logging.getLogger(__name__)
 
 class ToDoListApp:
-    def __init__(self, db_instance: Database):
+    def __init__(self, db_instance: TaskStorage, task_cache: TaskCache = None,
+                 hasher: PasswordHasher = None, login_throttle: LoginThrottle = None,
+                 metrics: MetricsRegistry = None):
         self.db = db_instance
+        # Per-command wall time; the storage backend records per-statement timings in the same registry
+        self.metrics = metrics if metrics is not None else REGISTRY
+        # Read-through cache for task lists; write paths below keep it current
+        self.task_cache = task_cache if task_cache is not None else TaskCache.from_env()
+        # bcrypt runs on its own bounded pool, never while a database connection is held
+        self.hasher = hasher if hasher is not None else PasswordHasher.from_env()
+        self.login_throttle = login_throttle if login_throttle is not None else LoginThrottle.from_env()
+        self._deletions_pruned_at = float('-inf') # Monotonic time of the last task_deletions cleanup
 
     def setup_database(self):
+        """Brings the schema up to date, applying only migrations that have not run yet."""
         try:
             with self.db as conn:
-                conn.create_tables()
-            logger.info("Database tables checked/created successfully.")
-        except mysql.Error as e:
-            logger.critical(f"FATAL: Database table creation failed: {e}", exc_info=True)
+                applied = conn.migrate()
+            if applied:
+                logger.info("Database schema migrated to version %s.", applied[-1])
+            else:
+                logger.info("Database schema is up to date.")
+        except self.db.Error as e:
+            logger.critical("FATAL: Database migration failed: %s", e, exc_info=True)
             raise
         except Exception as e:
-            logger.critical(f"FATAL: Unexpected error during database setup: {e}", exc_info=True)
+            logger.critical("FATAL: Unexpected error during database setup: %s", e, exc_info=True)
             raise
 
+    def close(self):
+        """Releases the storage backend's connections."""
+        self.db.close()
+
+    @timed_command
     def add_user(self, username: str, password: str) -> str:
         if not username or not password:
             logger.warning("Attempted registration with empty username or password.")
             return "Error: Username and password cannot be empty."
 
         if len(password) < 8:
-            logger.warning(f"Registration failed for '{username}': Password too short.")
+            logger.warning("Registration failed for '%s': Password too short.", username)
             return "Error: Password must be at least 8 characters long."
 
         try:
-            hashed_password_str = bcrypt.hashpw(
-                password.encode('utf-8'),
-                bcrypt.gensalt()
-            ).decode('utf-8')
+            hashed_password_str = self.hasher.hash(password)
 
             with self.db as conn:
-                conn.cursor.execute(
-                    "INSERT INTO users (name, password) VALUES (%s, %s)",
-                    (username, hashed_password_str)
-                )
-                user_id = conn.cursor.lastrowid
-                logger.info(f"User '{username}' added successfully with ID: {user_id}.")
+                user_id = conn.add_user(username, hashed_password_str)
                 return f"Success: User '{username}' registered. ID: {user_id}"
 
-        except mysql.IntegrityError as e:
-            logger.error(f"Registration failed for '{username}': User already exists. {e}", exc_info=True)
+        except ValueError as e: # Raised by the storage layer for a duplicate name
+            logger.error("Registration failed for '%s': User already exists. %s", username, e, exc_info=True)
             return f"Error: Username '{username}' already exists."
-        except mysql.Error as e:
-            logger.error(f"Database error during registration for '{username}': {e}", exc_info=True)
+        except HasherBusyError:
+            logger.warning("Registration for '%s' rejected: password hashing queue is full.", username)
+            return "Error: The server is busy. Please try again shortly."
+        except self.db.Error as e:
+            logger.error("Database error during registration for '%s': %s", username, e, exc_info=True)
             return "Error: A database problem occurred during registration."
         except Exception as e:
-            logger.critical(f"An unexpected error occurred during registration for '{username}': {e}", exc_info=True)
+            logger.critical("An unexpected error occurred during registration for '%s': %s", username, e, exc_info=True)
             return "Error: An unexpected application error occurred during registration."
 
+    @timed_command
     def authenticate_user(self, username: str, password: str) -> tuple[int | None, str]:
         if not username or not password:
             logger.warning("Authentication attempt with empty username or password.")
             return None, "Error: Username and password cannot be empty."
 
+        retry_after = self.login_throttle.retry_after(username)
+        if retry_after > 0:
+            logger.warning("Authentication for '%s' throttled for %.0fs after repeated failures.", username, retry_after)
+            return None, f"Error: Too many failed login attempts. Try again in {math.ceil(retry_after)} seconds."
+
         try:
+            # Only the lookup holds a connection; the bcrypt check runs after it is released
             with self.db as conn:
-                conn.cursor.execute("SELECT id, password FROM users WHERE name = %s", (username,))
-                result = conn.cursor.fetchone()
+                result = conn.get_user(username)
 
-                if result:
-                    user_id = result['id']
-                    stored_hashed_password = result['password']
+            if result:
+                user_id = result['id']
+                stored_hashed_password = result['password']
+                password_ok = self.hasher.verify(password, stored_hashed_password)
+            else:
+                self.hasher.verify_dummy(password) # Same cost as a real check, so timing does not reveal unknown users
+                password_ok = False
 
-                    if bcrypt.checkpw(password.encode('utf-8'), stored_hashed_password.encode('utf-8')):
-                        logger.info(f"User '{username}' (ID: {user_id}) authenticated successfully.")
-                        return user_id, "Success: Authentication successful."
-                    else:
-                        logger.warning(f"Authentication failed for user '{username}': Invalid password.")
-                        return None, "Error: Invalid username or password."
+            if not password_ok:
+                self.login_throttle.record_failure(username)
+                if result:
+                    logger.warning("Authentication failed for user '%s': Invalid password.", username)
                 else:
-                    logger.warning(f"Authentication failed: User '{username}' not found.")
-                    return None, "Error: Invalid username or password."
-
-        except mysql.Error as e:
-            logger.error(f"Database error during authentication for user '{username}': {e}", exc_info=True)
+                    logger.warning("Authentication failed: User '%s' not found.", username)
+                return None, "Error: Invalid username or password."
+
+            self.login_throttle.record_success(username)
+            if self.hasher.needs_rehash(stored_hashed_password):
+                self._rehash_password(user_id, password)
+            logger.info("User '%s' (ID: %s) authenticated successfully.", username, user_id)
+            return user_id, "Success: Authentication successful."
+
+        except HasherBusyError:
+            logger.warning("Authentication for '%s' rejected: password hashing queue is full.", username)
+            return None, "Error: The server is busy. Please try again shortly."
+        except self.db.Error as e:
+            logger.error("Database error during authentication for user '%s': %s", username, e, exc_info=True)
             return None, "Error: A database problem occurred during authentication."
         except Exception as e:
-            logger.critical(f"An unexpected application error occurred during authentication for user '{username}': {e}", exc_info=True)
+            logger.critical("An unexpected application error occurred during authentication for user '%s': %s", username, e, exc_info=True)
             return None, "Error: An unexpected application error occurred during authentication."
 
-    def add_task(self, user_id: int, task_name: str, due_date: str = None, priority: int = None) -> str:
-        if not task_name or not task_name.strip():
-            logger.warning(f"Attempted to add an empty task for user_id: {user_id}")
-            return "Error: Task description cannot be empty."
+    def _rehash_password(self, user_id: int, password: str):
+        """Upgrades a stored hash to the configured bcrypt cost; failures are logged and the login still succeeds."""
+        try:
+            new_hash = self.hasher.hash(password)
+            with self.db as conn:
+                conn.update_user_password(user_id, new_hash)
+            logger.info("Password hash for user ID %s upgraded to cost %s.", user_id, self.hasher.rounds)
+        except (HasherBusyError, self.db.Error) as e:
+            logger.warning("Could not upgrade password hash for user ID %s: %s", user_id, e)
+
+    MAX_TASK_LENGTH = 255 # tasks.task is VARCHAR(255) on MySQL
+
+    @classmethod
+    def _validate_task_fields(cls, due_date: str = None, priority: int = None, task_status: str = None,
+                              task_name: str = None) -> tuple[date | None, str | None, str | None]:
+        """
+        Applies the task field rules shared by every write path.
+        Returns (parsed due date, normalized status, error message); the error is None when all fields are valid.
+        """
+        if task_name is not None and len(task_name) > cls.MAX_TASK_LENGTH:
+            return None, None, f"Error: Task description cannot be longer than {cls.MAX_TASK_LENGTH} characters."
 
         parsed_due_date = None
         if due_date:
             try:
                 parsed_due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
             except ValueError:
-                logger.warning(f"Invalid due_date format '{due_date}' for task '{task_name}' (user_id: {user_id}).")
-                return "Error: Due date must be in YYYY-MM-DD format."
+                return None, None, "Error: Due date must be in YYYY-MM-DD format."
 
         if priority is not None:
             if not isinstance(priority, int) or not (0 <= priority <= 10): # Example range
-                logger.warning(f"Invalid priority value {priority} for task '{task_name}' (user_id: {user_id}).")
-                return "Error: Priority must be an integer between 0 and 10."
+                return None, None, "Error: Priority must be an integer between 0 and 10."
+
+        validated_task_status = None
+        if task_status is not None:
+            if task_status.lower() in ["pending", "completed"]:
+                validated_task_status = task_status.lower()
+            else:
+                return None, None, "Error: Task status must be 'pending' or 'completed'."
+
+        return parsed_due_date, validated_task_status, None
+
+    @timed_command
+    def add_task(self, user_id: int, task_name: str, due_date: str = None, priority: int = None) -> tuple[TaskRecord | None, str]:
+        """Adds a task and returns (new task record, message); the record is None on failure."""
+        if not task_name or not task_name.strip():
+            logger.warning("Attempted to add an empty task for user_id: %s", user_id)
+            return None, "Error: Task description cannot be empty."
+
+        parsed_due_date, _, error = self._validate_task_fields(due_date, priority, task_name=task_name)
+        if error:
+            logger.warning("Invalid input for task '%s' (user_id: %s): %s", task_name, user_id, error)
+            return None, error
 
         try:
             with self.db as conn:
-                conn.cursor.execute(
-                    "INSERT INTO tasks (user_id, task, due_date, priority) VALUES (%s, %s, %s, %s)",
-                    (user_id, task_name, parsed_due_date, priority) # Pass parsed date object
-                )
-                task_id = conn.cursor.lastrowid
-                logger.info(f"Task '{task_name}' (ID: {task_id}) added for user_id: {user_id}.")
-                return f"Success: Task '{task_name}' added with ID: {task_id}."
-
-        except mysql.IntegrityError as e:
-            logger.error(f"Error adding task for user_id {user_id}: Foreign key constraint failed. {e}", exc_info=True)
-            return "Error: The specified user does not exist or there was a data integrity issue."
-        except mysql.Error as e:
-            logger.error(f"Database error adding task for user_id {user_id} and task '{task_name}': {e}", exc_info=True)
-            return "Error: A database problem occurred while adding the task."
+                task_id = conn.add_task(user_id, task_name, parsed_due_date, priority)
+
+            # Every column is known after the insert (status defaults to 'pending'), so no read-back is needed
+            new_task = TaskRecord(task_id, task_name, 'pending', parsed_due_date, priority)
+            self.task_cache.task_added(user_id, new_task)
+            return new_task, f"Success: Task '{task_name}' added with ID: {task_id}."
+
+        except ValueError as e: # Raised by the storage layer when the user does not exist
+            logger.error("Error adding task for user_id %s: Foreign key constraint failed. %s", user_id, e, exc_info=True)
+            return None, "Error: The specified user does not exist or there was a data integrity issue."
+        except self.db.Error as e:
+            logger.error("Database error adding task for user_id %s and task '%s': %s", user_id, task_name, e, exc_info=True)
+            return None, "Error: A database problem occurred while adding the task."
         except Exception as e:
-            logger.critical(f"An unexpected application error occurred while adding task for user_id {user_id}: {e}", exc_info=True)
-            return "Error: An unexpected application error occurred while adding the task."
+            logger.critical("An unexpected application error occurred while adding task for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: An unexpected application error occurred while adding the task."
 
+    @timed_command
     def delete_task(self, user_id: int, task_id: int) -> str:
         if not isinstance(user_id, int) or user_id <= 0:
-            logger.warning(f"Invalid user_id {user_id} provided for task deletion.")
+            logger.warning("Invalid user_id %s provided for task deletion.", user_id)
             return "Error: Invalid user ID provided."
         if not isinstance(task_id, int) or task_id <= 0:
-            logger.warning(f"Invalid task_id {task_id} provided for deletion (user_id: {user_id}).")
+            logger.warning("Invalid task_id %s provided for deletion (user_id: %s).", task_id, user_id)
             return "Error: Invalid task ID provided."
 
         try:
             with self.db as conn:
                 deleted = conn.delete_task(user_id, task_id)
 
-                if deleted:
-                    logger.info(f"App: Task ID {task_id} deleted successfully for user_id {user_id}.")
-                    return f"Success: Task ID {task_id} deleted."
-                else:
-                    logger.info(f"App: Task ID {task_id} not found or not owned by user_id {user_id}.")
-                    return f"Info: Task ID {task_id} not found or you do not have permission to delete it."
+            # Only touch the cache once the delete has committed; a failed commit rolls it back
+            if deleted:
+                self.task_cache.task_deleted(user_id, task_id)
+                logger.debug("App: Task ID %s deleted successfully for user_id %s.", task_id, user_id)
+                return f"Success: Task ID {task_id} deleted."
+            else:
+                logger.debug("App: Task ID %s not found or not owned by user_id %s.", task_id, user_id)
+                return f"Info: Task ID {task_id} not found or you do not have permission to delete it."
 
-        except mysql.Error as e:
-            logger.error(f"App: Database error deleting task ID {task_id} for user_id {user_id}: {e}", exc_info=True)
+        except self.db.Error as e:
+            logger.error("App: Database error deleting task ID %s for user_id %s: %s", task_id, user_id, e, exc_info=True)
             return "Error: A database problem occurred while deleting the task."
         except Exception as e:
-            logger.critical(f"App: An unexpected application error occurred while deleting task ID {task_id} for user_id {user_id}: {e}", exc_info=True)
+            logger.critical("App: An unexpected application error occurred while deleting task ID %s for user_id %s: %s", task_id, user_id, e, exc_info=True)
             return "Error: An unexpected application error occurred while deleting the task."
 
     # Added task_status parameter to update_task as discussed
-    def update_task(self, user_id: int, task_id: int, task_name: str = None, due_date: str = None, priority: int = None, task_status: str = None) -> str:
+    @timed_command
+    def update_task(self, user_id: int, task_id: int, task_name: str = None, due_date: str = None, priority: int = None, task_status: str = None) -> tuple[TaskRecord | None, str]:
+        """Updates a task and returns (current task record, message); the record is None on failure or if the task is missing."""
         if not isinstance(user_id, int) or user_id <= 0:
-            logger.warning(f"Invalid user_id {user_id} provided for task update.")
-            return "Error: Invalid user ID provided."
+            logger.warning("Invalid user_id %s provided for task update.", user_id)
+            return None, "Error: Invalid user ID provided."
         if not isinstance(task_id, int) or task_id <= 0:
-            logger.warning(f"Invalid task_id {task_id} provided for update (user_id: {user_id}).")
-            return "Error: Invalid task ID provided."
+            logger.warning("Invalid task_id %s provided for update (user_id: %s).", task_id, user_id)
+            return None, "Error: Invalid task ID provided."
 
         validated_task_name = task_name if task_name is not None and task_name.strip() else None
 
-        parsed_due_date = None
-        if due_date is not None:
-            try:
-                parsed_due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
-            except ValueError:
-                logger.warning(f"Invalid due_date format '{due_date}' for task ID {task_id} (user_id: {user_id}).")
-                return "Error: Due date must be in YYYY-MM-DD format."
-
+        parsed_due_date, validated_task_status, error = self._validate_task_fields(due_date, priority, task_status, task_name)
+        if error:
+            logger.warning("Invalid input for task ID %s (user_id: %s): %s", task_id, user_id, error)
+            return None, error
         validated_priority = priority
-        if priority is not None:
-            if not isinstance(priority, int) or not (0 <= priority <= 10): # Example range
-                logger.warning(f"Invalid priority value {priority} for task ID {task_id} (user_id: {user_id}).")
-                return "Error: Priority must be an integer between 0 and 10."
-        
-        validated_task_status = None
-        if task_status is not None:
-            if task_status.lower() in ["pending", "completed"]:
-                validated_task_status = task_status.lower()
-            else:
-                logger.warning(f"Invalid task_status '{task_status}' for task ID {task_id} (user_id: {user_id}).")
-                return "Error: Task status must be 'pending' or 'completed'."
-
 
         try:
             with self.db as conn:
@@ -197,44 +256,676 @@ class ToDoListApp:
                     task_status=validated_task_status # Pass the validated status
                 )
 
-                if updated:
-                    logger.info(f"App: Task ID {task_id} updated for user ID: {user_id}.")
-                    return f"Success: Task ID {task_id} updated."
-                else:
-                    logger.info(f"App: Task ID {task_id} not found or no changes applied for user ID: {user_id}.")
-                    return f"Info: Task ID {task_id} not found or no changes were needed."
+                # Read the row back on the same connection so the caller can patch its copy in place
+                updated_task = conn.get_task(user_id, task_id)
+
+            # Only touch the cache once the update has committed; a failed commit rolls it back
+            if updated_task:
+                self.task_cache.task_updated(user_id, updated_task)
+            else:
+                self.task_cache.invalidate(user_id) # Missing here means our cached copy may be stale
 
-        except mysql.Error as e:
-            logger.error(f"App: Database error updating task ID {task_id} for user ID {user_id}: {e}", exc_info=True)
-            return "Error: A database problem occurred while updating the task."
+            if updated:
+                logger.debug("App: Task ID %s updated for user ID: %s.", task_id, user_id)
+                return updated_task, f"Success: Task ID {task_id} updated."
+            else:
+                logger.debug("App: Task ID %s not found or no changes applied for user ID: %s.", task_id, user_id)
+                return updated_task, f"Info: Task ID {task_id} not found or no changes were needed."
+
+        except self.db.Error as e:
+            logger.error("App: Database error updating task ID %s for user ID %s: %s", task_id, user_id, e, exc_info=True)
+            return None, "Error: A database problem occurred while updating the task."
         except Exception as e:
-            logger.critical(f"App: An unexpected application error occurred while updating task ID {task_id} for user ID {user_id}: {e}", exc_info=True)
-            return "Error: An unexpected application error occurred while updating the task."
+            logger.critical("App: An unexpected application error occurred while updating task ID %s for user ID %s: %s", task_id, user_id, e, exc_info=True)
+            return None, "Error: An unexpected application error occurred while updating the task."
+
+    # --- Bulk operations: one connection and one transaction per call ---
+    @timed_command
+    def add_tasks(self, user_id: int, tasks: list[dict]) -> tuple[list[tuple[TaskRecord | None, str]], str]:
+        """
+        Adds many tasks given as dicts with 'task' and optional 'due_date' (YYYY-MM-DD), 'priority' and 'task_status'.
+        Rows are validated with the add_task rules; valid rows are inserted together.
+        Returns (per-row (record, message) in input order, summary message).
+        """
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.warning("Invalid user_id %s provided for bulk task add.", user_id)
+            return [], "Error: Invalid user ID provided."
+
+        results = [None] * len(tasks)
+        valid_rows, valid_indexes = [], []
+        for i, task in enumerate(tasks):
+            task_name = task.get('task')
+            if not task_name or not str(task_name).strip():
+                results[i] = (None, "Error: Task description cannot be empty.")
+                continue
+            parsed_due_date, task_status, error = self._validate_task_fields(
+                task.get('due_date'), task.get('priority'), task.get('task_status'), str(task_name))
+            if error:
+                results[i] = (None, error)
+                continue
+            valid_rows.append((task_name, parsed_due_date, task.get('priority'), task_status))
+            valid_indexes.append(i)
+
+        if valid_rows:
+            try:
+                with self.db as conn:
+                    inserted = conn.add_tasks(user_id, valid_rows)
+            except (ValueError, self.db.Error) as e:
+                logger.error("App: Bulk add failed for user_id %s: %s", user_id, e, exc_info=True)
+                message = "Error: A database problem occurred while adding the tasks."
+                for i in valid_indexes:
+                    results[i] = (None, message)
+                return results, message
+            except Exception as e:
+                logger.critical("App: An unexpected application error occurred in bulk add for user_id %s: %s", user_id, e, exc_info=True)
+                message = "Error: An unexpected application error occurred while adding the tasks."
+                for i in valid_indexes:
+                    results[i] = (None, message)
+                return results, message
+            self.task_cache.invalidate(user_id)
+            for i, record in zip(valid_indexes, inserted):
+                results[i] = (record, f"Success: Task '{record.task}' added with ID: {record.id}.")
+
+        failed = len(tasks) - len(valid_rows)
+        logger.debug("App: Bulk add for user_id %s: %s added, %s rejected.", user_id, len(valid_rows), failed)
+        if failed:
+            return results, f"Info: {len(valid_rows)} tasks added, {failed} rejected."
+        return results, f"Success: {len(valid_rows)} tasks added."
+
+    @timed_command
+    def update_tasks(self, user_id: int, task_ids: list[int], task_name: str = None, due_date: str = None,
+                     priority: int = None, task_status: str = None) -> tuple[dict[int, TaskRecord | None], str]:
+        """
+        Applies the same changes to many tasks in one transaction (e.g. mark all completed).
+        Returns (task id -> updated record or None if not found, summary message).
+        """
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.warning("Invalid user_id %s provided for bulk task update.", user_id)
+            return {}, "Error: Invalid user ID provided."
+        if not task_ids or not all(isinstance(task_id, int) and task_id > 0 for task_id in task_ids):
+            logger.warning("Invalid task_ids %s provided for bulk update (user_id: %s).", task_ids, user_id)
+            return {}, "Error: Invalid task ID provided."
+
+        validated_task_name = task_name if task_name is not None and task_name.strip() else None
+        parsed_due_date, validated_task_status, error = self._validate_task_fields(due_date, priority, task_status, task_name)
+        if error:
+            logger.warning("Invalid input for bulk update (user_id: %s): %s", user_id, error)
+            return {}, error
+        if validated_task_name is None and parsed_due_date is None and priority is None and validated_task_status is None:
+            return {}, "Info: No changes were requested."
+
+        try:
+            with self.db as conn:
+                results = conn.update_tasks(user_id, task_ids, task_name=validated_task_name, due_date=parsed_due_date,
+                                            priority=priority, task_status=validated_task_status)
+            self.task_cache.invalidate(user_id)
+            updated = sum(1 for record in results.values() if record)
+            logger.debug("App: Bulk-updated %s of %s tasks for user_id %s.", updated, len(task_ids), user_id)
+            if updated < len(results):
+                return results, f"Info: {updated} tasks updated, {len(results) - updated} not found."
+            return results, f"Success: {updated} tasks updated."
+        except self.db.Error as e:
+            logger.error("App: Database error in bulk update for user_id %s: %s", user_id, e, exc_info=True)
+            return {}, "Error: A database problem occurred while updating the tasks."
+        except Exception as e:
+            logger.critical("App: An unexpected application error occurred in bulk update for user_id %s: %s", user_id, e, exc_info=True)
+            return {}, "Error: An unexpected application error occurred while updating the tasks."
+
+    @timed_command
+    def delete_tasks(self, user_id: int, task_ids: list[int]) -> tuple[dict[int, bool], str]:
+        """Deletes many tasks in one transaction. Returns (task id -> whether it was deleted, summary message)."""
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.warning("Invalid user_id %s provided for bulk task deletion.", user_id)
+            return {}, "Error: Invalid user ID provided."
+        if not task_ids or not all(isinstance(task_id, int) and task_id > 0 for task_id in task_ids):
+            logger.warning("Invalid task_ids %s provided for bulk deletion (user_id: %s).", task_ids, user_id)
+            return {}, "Error: Invalid task ID provided."
+
+        try:
+            with self.db as conn:
+                results = conn.delete_tasks(user_id, task_ids)
+            self.task_cache.invalidate(user_id)
+            deleted = sum(results.values())
+            logger.debug("App: Bulk-deleted %s of %s tasks for user_id %s.", deleted, len(task_ids), user_id)
+            if deleted < len(results):
+                return results, f"Info: {deleted} tasks deleted, {len(results) - deleted} not found."
+            return results, f"Success: {deleted} tasks deleted."
+        except self.db.Error as e:
+            logger.error("App: Database error in bulk delete for user_id %s: %s", user_id, e, exc_info=True)
+            return {}, "Error: A database problem occurred while deleting the tasks."
+        except Exception as e:
+            logger.critical("App: An unexpected application error occurred in bulk delete for user_id %s: %s", user_id, e, exc_info=True)
+            return {}, "Error: An unexpected application error occurred while deleting the tasks."
 
     # FIX THIS METHOD TO RETURN A LIST OF DICTIONARIES AND A MESSAGE
-    def get_user_tasks(self, user_id: int) -> tuple[list[dict] | None, str]: # Corrected return type hint
+    @timed_command
+    def get_user_tasks(self, user_id: int, query: TaskQuery = None, after: tuple = None,
+                       before: tuple = None, columnar: bool = False) -> tuple[list[TaskRecord] | TaskBatch | None, str]:
+        """
+        Returns (tasks, message). Without a query every task is returned. With a query the
+        filtering, sorting and limit run in the database; when query.limit is set the result
+        is one keyset page, and the cursor for the next/previous page is keyset_cursor() of
+        its last/first row. A page shorter than the limit is the last one.
+        Tasks are TaskRecords; with columnar=True they come back packed into a TaskBatch,
+        which is much smaller for callers that hold a large result set.
+        """
         if not isinstance(user_id, int) or user_id <= 0:
-            logger.warning(f"Invalid user_id {user_id} provided for task retrieval.")
+            logger.warning("Invalid user_id %s provided for task retrieval.", user_id)
             return None, "Error: Invalid user ID provided." # Return tuple
 
+        if query is not None:
+            error = self._validate_query(query)
+            if error:
+                logger.warning("Invalid task query %s for user_id %s: %s", query, user_id, error)
+                return None, error
+            tasks, message = self._query_user_tasks(user_id, query, after, before)
+            return (TaskBatch(tasks) if columnar and tasks is not None else tasks), message
+
         try:
-            with self.db as conn:
-                raw_tasks = conn.get_tasks(user_id) # This call returns a list of dictionaries from database.py
+            # This returns a list of TaskRecords from the storage backend (or the cache)
+            raw_tasks = self._read_through(user_id, None, lambda conn: conn.get_tasks(user_id))
+
+            if not raw_tasks:
+                logger.debug("App: No tasks found for user_id %s.", user_id)
+                return (TaskBatch() if columnar else []), "Info: No tasks found for your account." # Return empty list and message
+
+            # The GUI takes the records directly
+            # No need to format into a single string here
 
-                if not raw_tasks:
-                    logger.info(f"App: No tasks found for user_id {user_id}.")
-                    return [], "Info: No tasks found for your account." # Return empty list and message
+            logger.debug("App: Successfully retrieved %s tasks for user_id %s.", len(raw_tasks), user_id)
 
-                # The GUI expects a list of dictionaries, so we just return raw_tasks directly
-                # No need to format into a single string here
-                
-                logger.info(f"App: Successfully retrieved {len(raw_tasks)} tasks for user_id {user_id}.")
-                
-                return raw_tasks, "Success: Tasks retrieved." # Return the list of dicts and a message
+            if columnar:
+                raw_tasks = TaskBatch(raw_tasks)
+            return raw_tasks, "Success: Tasks retrieved." # Return the records and a message
 
-        except mysql.Error as e:
-            logger.error(f"App: Database error retrieving tasks for user_id {user_id}: {e}", exc_info=True)
+        except self.db.Error as e:
+            logger.error("App: Database error retrieving tasks for user_id %s: %s", user_id, e, exc_info=True)
             return None, "Error: A database problem occurred while retrieving tasks." # Return None and message
         except Exception as e:
-            logger.critical(f"App: An unexpected application error occurred while retrieving tasks for user_id {user_id}: {e}", exc_info=True)
-            return None, "Error: An unexpected application error occurred while retrieving tasks." # Return None and message
\ No newline at end of file
+            logger.critical("App: An unexpected application error occurred while retrieving tasks for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: An unexpected application error occurred while retrieving tasks." # Return None and message
+
+    SEARCH_LIMIT = 50
+    MAX_SEARCH_LIMIT = 500
+
+    @timed_command
+    def search_tasks(self, user_id: int, text: str, limit: int = None,
+                     prefix: bool = True) -> tuple[list[TaskRecord] | None, str]:
+        """
+        Full-text search of a user's tasks. Every word in text must appear in the task (with
+        prefix, as the start of a word, so partially typed words match). Returns (tasks, message)
+        with at most limit tasks, best match first; results are cached like query pages.
+        """
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.warning("Invalid user_id %s provided for task search.", user_id)
+            return None, "Error: Invalid user ID provided."
+        limit = self.SEARCH_LIMIT if limit is None else limit
+        if not isinstance(limit, int) or not (0 < limit <= self.MAX_SEARCH_LIMIT):
+            return None, f"Error: Search limit must be an integer between 1 and {self.MAX_SEARCH_LIMIT}."
+
+        terms = search_terms(text)
+        if not terms:
+            return [], "Info: Enter a word to search for."
+
+        try:
+            tasks = self._read_through(user_id, ('search', terms, limit, prefix),
+                                       lambda conn: conn.search_tasks(user_id, terms, limit, prefix))
+            logger.debug("App: Search for %s returned %s tasks for user_id %s.", terms, len(tasks), user_id)
+            if not tasks:
+                return [], f"Info: No tasks match '{text.strip()}'."
+            return tasks, f"Success: {len(tasks)} matching tasks."
+
+        except self.db.Error as e:
+            logger.error("App: Database error searching tasks for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: A database problem occurred while searching tasks."
+        except Exception as e:
+            logger.critical("App: An unexpected application error occurred while searching tasks for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: An unexpected application error occurred while searching tasks."
+
+    CHANGE_SETTLE_SECONDS = 5.0 # Overlap between consecutive delta windows (see get_changes_since)
+    DELETION_LOG_RETENTION_DAYS = 30
+    DELETION_PRUNE_INTERVAL = 3600.0
+
+    @timed_command
+    def get_changes_since(self, user_id: int, watermark: str = None) -> tuple[TaskChanges | None, str]:
+        """
+        Returns (changes, message) for delta sync: the user's tasks inserted or updated after
+        watermark, the ids of tasks deleted after it, and the watermark for the next call.
+        Without a watermark, or with one older than the deletion log keeps, changes.full is
+        True and changes.tasks is the whole list. The next watermark trails the database clock
+        by CHANGE_SETTLE_SECONDS, so a transaction that commits late is not missed; changes in
+        that window come back again, so apply them idempotently (upsert by id).
+        """
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.warning("Invalid user_id %s provided for change sync.", user_id)
+            return None, "Error: Invalid user ID provided."
+        since = None
+        if watermark:
+            try:
+                since = datetime.fromisoformat(watermark)
+            except (TypeError, ValueError):
+                return None, "Error: Invalid change watermark."
+            if since.tzinfo is not None: # Watermarks we hand out are naive database-clock times
+                return None, "Error: Invalid change watermark."
+
+        try:
+            with self.db as conn:
+                now = conn.database_now()
+                horizon = now - timedelta(days=self.DELETION_LOG_RETENTION_DAYS)
+                full = since is None or not (horizon <= since <= now)
+                if full:
+                    tasks, deleted_ids = conn.get_tasks(user_id), []
+                else:
+                    tasks, deleted_ids = conn.get_changed_tasks(user_id, since)
+                if time.monotonic() - self._deletions_pruned_at >= self.DELETION_PRUNE_INTERVAL:
+                    self._deletions_pruned_at = time.monotonic()
+                    pruned = conn.prune_task_deletions(horizon)
+                    logger.debug("App: Pruned %s task deletion log entries.", pruned)
+
+            next_watermark = now - timedelta(seconds=self.CHANGE_SETTLE_SECONDS)
+            if not full:
+                next_watermark = max(next_watermark, since)
+            changes = TaskChanges(tasks, deleted_ids, next_watermark.isoformat(), full)
+            logger.debug("App: %s changed and %s deleted tasks since %s for user_id %s.",
+                         len(tasks), len(deleted_ids), watermark, user_id)
+            if full:
+                return changes, "Success: Tasks retrieved."
+            if not tasks and not deleted_ids:
+                return changes, "Info: No changes."
+            return changes, f"Success: {len(tasks)} changed and {len(deleted_ids)} deleted tasks."
+
+        except self.db.Error as e:
+            logger.error("App: Database error reading changes for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: A database problem occurred while reading changes."
+        except Exception as e:
+            logger.critical("App: An unexpected application error occurred while reading changes for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: An unexpected application error occurred while reading changes."
+
+    @timed_command
+    def get_task_stats(self, user_id: int) -> tuple[TaskStats | None, str]:
+        """
+        Returns (stats, message) with the user's pending, completed, overdue and due-today
+        counts, read from the incrementally maintained summary tables rather than by counting tasks.
+        """
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.warning("Invalid user_id %s provided for task stats.", user_id)
+            return None, "Error: Invalid user ID provided."
+        try:
+            with self.db as conn:
+                stats = conn.get_task_stats(user_id, date.today())
+            return stats, "Success: Task statistics retrieved."
+        except self.db.Error as e:
+            logger.error("App: Database error reading task stats for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: A database problem occurred while reading task statistics."
+        except Exception as e:
+            logger.critical("App: An unexpected application error occurred while reading task stats for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: An unexpected application error occurred while reading task statistics."
+
+    def reconcile_task_stats(self, user_ids: list[int] = None, batch_size: int = 500) -> tuple[int, str]:
+        """
+        Recounts the task statistics of user_ids (default: every user) from the tasks table and
+        rewrites any that drifted, one short transaction per user. Returns (users corrected, message).
+        """
+        corrected = checked = 0
+        try:
+            for user_id in (self._iter_user_ids(batch_size) if user_ids is None else user_ids):
+                with self.db as conn:
+                    corrected += conn.reconcile_task_stats(user_id)
+                checked += 1
+        except self.db.Error as e:
+            logger.error("App: Database error reconciling task stats: %s", e, exc_info=True)
+            return corrected, "Error: A database problem occurred while reconciling task statistics."
+        logger.info("App: Reconciled task stats for %s users; %s had drifted.", checked, corrected)
+        return corrected, f"Success: Checked {checked} users, corrected {corrected}."
+
+    def _iter_user_ids(self, batch_size: int):
+        """Yields every user id in order, reading batch_size ids per short transaction."""
+        after = 0
+        while True:
+            with self.db as conn:
+                batch = conn.get_user_ids(after, batch_size)
+            if not batch:
+                return
+            yield from batch
+            after = batch[-1]
+
+    # --- Archive: completed tasks moved out of the live tasks table ---
+    ARCHIVE_AFTER_DAYS = 30.0
+    ARCHIVE_PAGE_SIZE = 100
+
+    def archive_completed_tasks(self, older_than_days: float = None, user_ids: list[int] = None,
+                                batch_size: int = 500) -> tuple[int, str]:
+        """
+        Moves tasks completed, and unchanged since, more than older_than_days ago (default
+        ARCHIVE_AFTER_DAYS) from tasks into tasks_archive, for user_ids or every user. Each
+        batch of up to batch_size tasks is its own short transaction, so live writes only ever
+        wait for one batch. Returns (tasks archived, message).
+        """
+        if older_than_days is None:
+            older_than_days = self.ARCHIVE_AFTER_DAYS
+        if older_than_days < 0 or batch_size <= 0:
+            return 0, "Error: The archive age must not be negative and the batch size must be positive."
+
+        archived = 0
+        try:
+            with self.db as conn:
+                cutoff = conn.database_now() - timedelta(days=older_than_days)
+            for user_id in (self._iter_user_ids(batch_size) if user_ids is None else user_ids):
+                moved = batch_size
+                while moved == batch_size:
+                    with self.db as conn:
+                        moved = conn.archive_completed_tasks(user_id, cutoff, batch_size)
+                    if moved:
+                        self.task_cache.invalidate(user_id)
+                        archived += moved
+        except self.db.Error as e:
+            logger.error("App: Database error archiving completed tasks: %s", e, exc_info=True)
+            return archived, "Error: A database problem occurred while archiving tasks."
+        logger.info("App: Archived %s tasks completed before %s.", archived, cutoff)
+        if not archived:
+            return 0, "Info: No completed tasks are old enough to archive."
+        return archived, f"Success: Archived {archived} completed tasks."
+
+    @timed_command
+    def get_archived_tasks(self, user_id: int, query: TaskQuery = None, after: tuple = None,
+                           before: tuple = None) -> tuple[list[TaskRecord] | None, str]:
+        """
+        Returns (tasks, message) with one keyset page of the user's archived tasks, newest
+        first by default; pages work as in get_user_tasks. Read from tasks_archive on demand
+        and never cached.
+        """
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.warning("Invalid user_id %s provided for archived task retrieval.", user_id)
+            return None, "Error: Invalid user ID provided."
+        if query is None:
+            query = TaskQuery(descending=True, limit=self.ARCHIVE_PAGE_SIZE)
+        error = self._validate_query(query)
+        if error:
+            return None, error
+
+        try:
+            with self.db as conn:
+                tasks = conn.query_archived_tasks(user_id, query, after=after, before=before)
+            if not tasks and after is None and before is None:
+                return [], "Info: No archived tasks."
+            logger.debug("App: Retrieved %s archived tasks for user_id %s.", len(tasks), user_id)
+            return tasks, "Success: Archived tasks retrieved."
+        except self.db.Error as e:
+            logger.error("App: Database error retrieving archived tasks for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: A database problem occurred while retrieving archived tasks."
+        except Exception as e:
+            logger.critical("App: An unexpected application error occurred while retrieving archived tasks for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: An unexpected application error occurred while retrieving archived tasks."
+
+    def build_task_query(self, status: str = None, due_from: str = None, due_to: str = None,
+                         priority_min: str = None, priority_max: str = None, sort_key: str = 'id',
+                         descending: bool = False, limit: int = None) -> tuple[TaskQuery | None, str]:
+        """
+        Builds a TaskQuery from user-entered strings (e.g. GUI filter fields), using the same
+        date and priority rules as add_task. Empty strings mean "no constraint".
+        Returns (query, message); query is None if any field is invalid.
+        """
+        parsed_dates = []
+        for label, value in (("From", due_from), ("To", due_to)):
+            if value and value.strip():
+                try:
+                    parsed_dates.append(datetime.strptime(value.strip(), '%Y-%m-%d').date())
+                except ValueError:
+                    return None, f"Error: '{label}' due date must be in YYYY-MM-DD format."
+            else:
+                parsed_dates.append(None)
+
+        parsed_priorities = []
+        for label, value in (("Min", priority_min), ("Max", priority_max)):
+            if value is not None and str(value).strip():
+                try:
+                    parsed_priorities.append(int(value))
+                except ValueError:
+                    return None, f"Error: '{label}' priority must be an integer."
+            else:
+                parsed_priorities.append(None)
+
+        query = TaskQuery(
+            status=status.lower() if status else None,
+            due_from=parsed_dates[0],
+            due_to=parsed_dates[1],
+            priority_min=parsed_priorities[0],
+            priority_max=parsed_priorities[1],
+            sort_key=sort_key,
+            descending=descending,
+            limit=limit,
+        )
+        error = self._validate_query(query)
+        if error:
+            return None, error
+        return query, "Success: Query built."
+
+    def _validate_query(self, query: TaskQuery) -> str | None:
+        """Returns an error message if the query breaks the task field rules, otherwise None."""
+        if query.status is not None and query.status not in ("pending", "completed"):
+            return "Error: Task status must be 'pending' or 'completed'."
+        for priority in (query.priority_min, query.priority_max):
+            if priority is not None and (not isinstance(priority, int) or not (0 <= priority <= 10)):
+                return "Error: Priority must be an integer between 0 and 10."
+        if query.due_from and query.due_to and query.due_from > query.due_to:
+            return "Error: The due date range is empty ('From' is after 'To')."
+        if query.sort_key not in TaskStorage.SORT_KEYS:
+            return f"Error: Tasks can only be sorted by {', '.join(TaskStorage.SORT_KEYS)}."
+        if query.limit is not None and (not isinstance(query.limit, int) or query.limit <= 0):
+            return "Error: Limit must be a positive integer."
+        return None
+
+    def _query_user_tasks(self, user_id: int, query: TaskQuery, after: tuple,
+                          before: tuple) -> tuple[list[TaskRecord] | None, str]:
+        try:
+            tasks = self._read_through(user_id, (query, after, before),
+                                       lambda conn: conn.query_tasks(user_id, query, after=after, before=before))
+
+            if not tasks and after is None and before is None:
+                logger.debug("App: No tasks matched the query for user_id %s.", user_id)
+                if query.conditions()[0]:
+                    return [], "Info: No tasks match the current filters."
+                return [], "Info: No tasks found for your account."
+
+            logger.debug("App: Query returned %s tasks for user_id %s.", len(tasks), user_id)
+            return tasks, "Success: Tasks retrieved."
+
+        except self.db.Error as e:
+            logger.error("App: Database error querying tasks for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: A database problem occurred while retrieving tasks."
+        except Exception as e:
+            logger.critical("App: An unexpected application error occurred while querying tasks for user_id %s: %s", user_id, e, exc_info=True)
+            return None, "Error: An unexpected application error occurred while retrieving tasks."
+
+    # --- Task cache ---
+    def _read_through(self, user_id: int, key, load) -> list[TaskRecord]:
+        """Returns cached tasks for (user_id, key), or runs load(conn) and caches the result."""
+        if self.task_cache.enabled and self.task_cache.freshness_due(user_id):
+            with self.db as conn:
+                self.task_cache.verify(user_id, conn.get_tasks_fingerprint(user_id))
+
+        tasks = self.task_cache.get(user_id, key)
+        if tasks is not None:
+            return tasks
+
+        generation = self.task_cache.generation(user_id) # Taken first: a write landing during the load must win
+        fingerprint = None
+        with self.db as conn:
+            tasks = load(conn)
+            if self.task_cache.enabled and self.task_cache.freshness_interval is not None:
+                fingerprint = conn.get_tasks_fingerprint(user_id) # Same transaction as the load
+        self.task_cache.put(user_id, tasks, key=key, fingerprint=fingerprint, generation=generation)
+        return tasks
+
+    def get_metrics(self) -> dict:
+        """Returns a JSON-ready snapshot of the command and database histograms."""
+        return self.metrics.to_dict()
+
+    def get_task_cache_stats(self) -> dict:
+        """Returns the task cache's hit, miss, eviction and invalidation counters."""
+        return self.task_cache.stats()
+
+    # --- Streaming import/export ---
+    TRANSFER_FORMATS = ('csv', 'jsonl')
+    EXPORT_COLUMNS = ('id', 'task', 'task_status', 'due_date', 'priority')
+
+    @timed_command
+    def export_tasks(self, user_id: int, path: str, fmt: str = 'csv') -> tuple[int, str]:
+        """
+        Streams all of a user's tasks to a CSV or JSON Lines file straight from a server-side
+        cursor, so memory use does not grow with the number of tasks.
+        Returns (rows written, message).
+        """
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.warning("Invalid user_id %s provided for export.", user_id)
+            return 0, "Error: Invalid user ID provided."
+        if fmt not in self.TRANSFER_FORMATS:
+            return 0, f"Error: Export format must be one of {', '.join(self.TRANSFER_FORMATS)}."
+
+        written = 0
+        try:
+            with self.db as conn, open(path, 'w', newline='', encoding='utf-8') as out:
+                if fmt == 'csv':
+                    writer = csv.writer(out)
+                    writer.writerow(self.EXPORT_COLUMNS)
+                for task in conn.iter_tasks(user_id):
+                    due_date = task.due_date.isoformat() if task.due_date else None
+                    if fmt == 'csv':
+                        writer.writerow((task.id, task.task, task.task_status, due_date or '',
+                                         '' if task.priority is None else task.priority))
+                    else:
+                        out.write(json.dumps({**task._asdict(), 'due_date': due_date}) + "\n")
+                    written += 1
+            logger.info("App: Exported %s tasks for user_id %s to '%s' (%s).", written, user_id, path, fmt)
+            return written, f"Success: Exported {written} tasks to {path}."
+
+        except OSError as e:
+            logger.error("App: Could not write export file '%s' for user_id %s: %s", path, user_id, e, exc_info=True)
+            return written, f"Error: Could not write to {path}."
+        except self.db.Error as e:
+            logger.error("App: Database error exporting tasks for user_id %s: %s", user_id, e, exc_info=True)
+            return written, "Error: A database problem occurred while exporting tasks."
+
+    @timed_command
+    def import_tasks(self, user_id: int, path: str, fmt: str = 'csv', batch_size: int = 1000,
+                     progress=None, max_reported_errors: int = 1000) -> tuple[dict, str]:
+        """
+        Streams tasks from a CSV (with a header row) or JSON Lines file. Each row is validated
+        with the add_task rules and valid rows are inserted in executemany batches of
+        batch_size, each committed as it completes, so memory stays flat for any file size.
+        progress(rows_read, rows_imported, rows_rejected) is called after every batch.
+        Returns (report, message); report holds the counts and up to max_reported_errors
+        (line number, message) pairs.
+        """
+        report = {'read': 0, 'imported': 0, 'rejected': 0, 'errors': []}
+        if not isinstance(user_id, int) or user_id <= 0:
+            logger.warning("Invalid user_id %s provided for import.", user_id)
+            return report, "Error: Invalid user ID provided."
+        if fmt not in self.TRANSFER_FORMATS:
+            return report, f"Error: Import format must be one of {', '.join(self.TRANSFER_FORMATS)}."
+
+        def reject(line_no, message):
+            report['rejected'] += 1
+            if len(report['errors']) < max_reported_errors:
+                report['errors'].append((line_no, message))
+
+        batch, batch_lines = [], []
+        file_error = None
+        try:
+            with self.db as conn:
+                def flush():
+                    conn.add_tasks(user_id, batch, return_records=False)
+                    conn.commit() # Commit per batch so a long import never holds one huge transaction
+                    self.task_cache.invalidate(user_id)
+                    report['imported'] += len(batch)
+                    batch.clear()
+                    batch_lines.clear()
+                    if progress:
+                        progress(report['read'], report['imported'], report['rejected'])
+
+                rows = self._read_import_rows(path, fmt)
+                while True:
+                    try:
+                        line_no, row, error = next(rows)
+                    except StopIteration:
+                        break
+                    except UnicodeDecodeError as e: # A ValueError, so it must not reach the database handler below
+                        logger.error("App: Import file '%s' for user_id %s is not UTF-8: %s", path, user_id, e)
+                        file_error = f"Error: {path} is not valid UTF-8 text; the import stopped after {report['read']} rows."
+                        break
+                    except csv.Error as e:
+                        logger.error("App: Import file '%s' for user_id %s is not valid CSV: %s", path, user_id, e)
+                        file_error = f"Error: {path} is not valid CSV ({e}); the import stopped after {report['read']} rows."
+                        break
+                    report['read'] += 1
+                    if error:
+                        reject(line_no, error)
+                        continue
+                    task_name = str(row.get('task') or '').strip()
+                    if not task_name:
+                        reject(line_no, "Error: Task description cannot be empty.")
+                        continue
+                    priority, error = self._parse_import_priority(row.get('priority'))
+                    if error:
+                        reject(line_no, error)
+                        continue
+                    due_date, task_status = row.get('due_date'), row.get('task_status')
+                    parsed_due_date, task_status, error = self._validate_task_fields(
+                        str(due_date) if due_date else None, priority, str(task_status) if task_status else None, task_name)
+                    if error:
+                        reject(line_no, error)
+                        continue
+
+                    batch.append((task_name, parsed_due_date, priority, task_status))
+                    batch_lines.append(line_no)
+                    if len(batch) >= batch_size:
+                        flush()
+                if batch:
+                    flush() # Rows read before a bad stretch of the file are still valid
+
+        except OSError as e:
+            logger.error("App: Could not read import file '%s' for user_id %s: %s", path, user_id, e, exc_info=True)
+            return report, f"Error: Could not read {path}."
+        except (ValueError, self.db.Error) as e:
+            logger.error("App: Database error importing tasks for user_id %s: %s", user_id, e, exc_info=True)
+            for line_no in batch_lines: # The failed batch was rolled back; say which rows did not make it
+                reject(line_no, "Error: Not imported; a database problem stopped the import.")
+            return report, f"Error: A database problem stopped the import after {report['imported']} tasks."
+
+        if file_error:
+            return report, file_error
+
+        logger.info("App: Imported %s of %s rows for user_id %s from '%s'.", report['imported'], report['read'], user_id, path)
+        if report['rejected']:
+            return report, f"Info: Imported {report['imported']} tasks, rejected {report['rejected']} rows."
+        return report, f"Success: Imported {report['imported']} tasks."
+
+    def _read_import_rows(self, path: str, fmt: str):
+        """Yields (line number, row dict, parse error) lazily from an import file."""
+        with open(path, newline='', encoding='utf-8') as source:
+            if fmt == 'csv':
+                reader = csv.DictReader(source)
+                for row in reader:
+                    yield reader.line_num, row, None
+                return
+            for line_no, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    yield line_no, None, "Error: Line is not valid JSON."
+                    continue
+                if not isinstance(row, dict):
+                    yield line_no, None, "Error: Line must be a JSON object."
+                    continue
+                yield line_no, row, None
+
+    @staticmethod
+    def _parse_import_priority(value) -> tuple[int | None, str | None]:
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return None, None
+        try:
+            return int(value), None
+        except (TypeError, ValueError):
+            return None, "Error: Priority must be an integer between 0 and 10."
@@ -1,111 +1,407 @@
 import mysql.connector as mysql
+import contextlib
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
-from datetime import date
+from datetime import date, datetime
 import logging 
+import migrations
+from metrics import InstrumentedCursor
+from storage import TaskQuery, TaskRecord, TaskStorage, fetch_task_records, keyset_cursor, update_statement # Re-exported for callers that import them from here
 logger = logging.getLogger(__name__) 
 
-class Database:
+
+class ConnectionPool:
+    """
+    A bounded pool of live MySQL connections.
+    Connections are checked out for the duration of one transaction and returned afterwards,
+    so the TCP handshake, authentication and session setup are paid once per connection
+    instead of once per operation.
+    """
+    def __init__(self, connect_args: dict, size: int = 5, idle_timeout: float = 300.0,
+                 health_check_interval: float = 30.0, acquire_timeout: float = 10.0, on_discard=None):
+        self.connect_args = connect_args
+        self.size = size
+        self.idle_timeout = idle_timeout # Idle connections older than this are closed instead of reused
+        self.health_check_interval = health_check_interval # Only ping connections idle longer than this
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.LifoQueue() # (connection, last_used) pairs; LIFO keeps the warmest connections in use
+        self._slots = threading.BoundedSemaphore(size) # Caps open connections (idle + checked out)
+        self._closed = False
+        self.on_discard = on_discard # Called with each connection the pool closes, to drop per-connection state
+
+    def _connect(self):
+        con = mysql.connect(**self.connect_args)
+        logger.info("Pool: New database connection opened (%s max).", self.size)
+        return con
+
+    def _discard(self, con):
+        if self.on_discard is not None:
+            self.on_discard(con)
+        try:
+            con.close()
+        except mysql.Error as err:
+            logger.warning("Pool: Error while closing a discarded connection: %s", err)
+
+    def _is_healthy(self, con, idle_for: float) -> bool:
+        if idle_for < self.health_check_interval:
+            return True # Recently used; skip the round trip
+        try:
+            con.ping(reconnect=False)
+            return True
+        except mysql.Error as err:
+            logger.warning("Pool: Dropping stale connection that failed its health check: %s", err)
+            return False
+
+    def acquire(self):
+        if self._closed:
+            raise mysql.errors.PoolError("Connection pool is closed.")
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise mysql.errors.PoolError(f"No connection available within {self.acquire_timeout}s (pool size {self.size}).")
+
+        try:
+            while True:
+                try:
+                    con, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                idle_for = time.monotonic() - last_used
+                if idle_for > self.idle_timeout:
+                    logger.info("Pool: Closing connection idle for %.0fs.", idle_for)
+                    self._discard(con)
+                    continue
+                if self._is_healthy(con, idle_for):
+                    return con
+                self._discard(con)
+
+            return self._connect()
+        except BaseException:
+            self._slots.release() # Give the slot back if we could not hand out a connection
+            raise
+
+    def warm_up(self, count: int):
+        """Opens up to count connections and leaves them idle, so the first requests skip the handshake."""
+        held = []
+        try:
+            for _ in range(min(count, self.size)):
+                held.append(self.acquire())
+            logger.info("Pool: Warmed up %s connections.", len(held))
+        except mysql.Error as err:
+            logger.error("Pool: Warm-up failed after %s connections: %s", len(held), err)
+        finally:
+            for con in held:
+                self.release(con)
+
+    def warm_up_in_background(self, count: int) -> threading.Thread:
+        thread = threading.Thread(target=self.warm_up, args=(count,), name="pool-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def release(self, con, discard: bool = False):
+        try:
+            if discard or self._closed:
+                self._discard(con)
+            else:
+                self._idle.put((con, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                con, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(con)
+        logger.info("Pool: All idle connections closed.")
+
+
+class StatementCache:
+    """
+    Cursors kept for the life of one pooled connection: the dictionary and tuple cursors that
+    every transaction reuses, plus one server-side prepared (tuple) cursor per statement text,
+    LRU-bounded.
+    The driver only skips re-preparing when a cursor runs the identical string object again,
+    so callers must pass the registered SQL constants (or update_statement() results).
+    """
+    def __init__(self, con, max_statements: int = 32):
+        self.con = con
+        self.max_statements = max_statements
+        self.default_cursor = con.cursor(dictionary=True)
+        self.tuple_cursor = con.cursor() # Task rows, turned into TaskRecords
+        self._prepared = OrderedDict() # sql -> prepared cursor, least recently used first
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def prepared(self, sql: str):
+        cursor = self._prepared.get(sql)
+        if cursor is not None:
+            self._prepared.move_to_end(sql)
+            self.hits += 1
+            return cursor
+
+        self.misses += 1
+        cursor = self._prepared[sql] = self.con.cursor(prepared=True)
+        if len(self._prepared) > self.max_statements:
+            _, evicted = self._prepared.popitem(last=False)
+            self.evictions += 1
+            try:
+                evicted.close() # Deallocates the statement on the server
+            except mysql.Error as err:
+                logger.warning("Database: Error closing an evicted prepared statement: %s", err)
+        return cursor
+
+
+class Database(TaskStorage):
+    """MySQL storage backend (DB_BACKEND=mysql), with an optional connection pool."""
+    Error = mysql.Error
+    IntegrityError = mysql.IntegrityError
+    DataError = mysql.DataError # e.g. task text longer than the VARCHAR(255) column
+    ProgrammingError = mysql.ProgrammingError
+
+    # Fixed statements run as server-side prepared statements (parsed once per connection)
+    SQL_GET_USER = "SELECT id, password FROM users WHERE name = %s"
+    SQL_ADD_TASK = "INSERT INTO tasks (user_id, task, due_date, priority) VALUES (%s, %s, %s, %s)"
+    SQL_GET_TASKS = f"SELECT {TaskStorage.TASK_COLUMNS} FROM tasks WHERE user_id = %s ORDER BY id ASC"
+    SQL_DELETE_TASK = "DELETE FROM tasks WHERE user_id = %s AND id = %s"
+    SQL_SEARCH_TASKS = (
+        f"SELECT {TaskStorage.TASK_COLUMNS} FROM tasks "
+        "WHERE user_id = %s AND MATCH (task) AGAINST (%s IN BOOLEAN MODE) "
+        "ORDER BY MATCH (task) AGAINST (%s IN BOOLEAN MODE) DESC, id DESC LIMIT %s"
+    )
+
     def __init__(self):
         load_dotenv()
-        db_host = os.getenv('DB_HOST')
-        db_user = os.getenv('DB_USER')
-        db_password = os.getenv('DB_PASSWORD')
-        db_name = os.getenv('DB_NAME')
+        self.connect_args = {
+            'host': os.getenv('DB_HOST', 'localhost'),
+            'user': os.getenv('DB_USER', 'root'),
+            'password': os.getenv('DB_PASSWORD', '1234'),
+            'database': os.getenv('DB_NAME', 'todo_list'),
+        }
 
-        self.con = None
-        self.cursor = None
+        # Connection state is per thread so one Database instance can serve concurrent callers
+        self._local = threading.local()
+        self.pool = None
+
+        # Pooled connections keep their cursors and prepared statements between transactions
+        self.prepared_statements = os.getenv('DB_PREPARED_STATEMENTS', '1') != '0'
+        self.statement_cache_size = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '32'))
+        self._statement_caches = {} # id(connection) -> StatementCache, dropped when the pool discards it
+        self._statement_caches_lock = threading.Lock()
+
+        # DB_POOL_SIZE=0 keeps the legacy connect-per-operation behaviour
+        pool_size = int(os.getenv('DB_POOL_SIZE', '5'))
 
         try:
-            self.con = mysql.connect(
-                host=db_host,
-                user=db_user,
-                password=db_password,
-                database=db_name,
-            )
-            self.cursor = self.con.cursor(dictionary=True)
-            logger.info("Database connection established successfully.") # Replaced print
+            if pool_size > 0:
+                self.pool = ConnectionPool(
+                    self.connect_args,
+                    size=pool_size,
+                    idle_timeout=float(os.getenv('DB_POOL_IDLE_TIMEOUT', '300')),
+                    health_check_interval=float(os.getenv('DB_POOL_HEALTH_CHECK_INTERVAL', '30')),
+                    acquire_timeout=float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', '10')),
+                    on_discard=self._drop_statement_cache,
+                )
+                # Connections open in the background; bad credentials surface on the first operation
+                self.pool.warm_up_in_background(int(os.getenv('DB_POOL_WARMUP', '1')))
+                logger.info("Database connection pool created (size %s).", pool_size)
+            else:
+                self.con = mysql.connect(**self.connect_args)
+                self.cursor = self._instrument(self.con.cursor(dictionary=True))
+                self.tuple_cursor = self._instrument(self.con.cursor())
+                logger.info("Database connection established successfully.") # Replaced print
         except mysql.Error as err:
-            logger.error(f"Error connecting to database: {err}", exc_info=True) # Replaced print, added exc_info
+            logger.error("Error connecting to database: %s", err, exc_info=True) # Replaced print, added exc_info
             self.con = None
             self.cursor = None
+            self.tuple_cursor = None
             raise 
 
+    @property
+    def con(self):
+        return getattr(self._local, 'con', None)
+
+    @con.setter
+    def con(self, value):
+        self._local.con = value
+
+    @property
+    def cursor(self):
+        return getattr(self._local, 'cursor', None)
+
+    @cursor.setter
+    def cursor(self, value):
+        self._local.cursor = value
+
+    @property
+    def tuple_cursor(self):
+        return getattr(self._local, 'tuple_cursor', None)
+
+    @tuple_cursor.setter
+    def tuple_cursor(self, value):
+        self._local.tuple_cursor = value
+
     def __enter__(self):
+        if self.pool is not None:
+            # Pooled mode: check out a live connection for this transaction only
+            started = time.perf_counter()
+            self.con = self.pool.acquire()
+            try:
+                cache = self._statement_cache()
+                self.cursor = self._instrument(cache.default_cursor)
+                self.tuple_cursor = self._instrument(cache.tuple_cursor)
+            except mysql.Error:
+                self.pool.release(self.con, discard=True)
+                self.con = None
+                raise
+            self.metrics.observe('db_connection_acquire_seconds', time.perf_counter() - started, backend=self.BACKEND_NAME)
+            return self
+
         if self.con is None or not self.con.is_connected():
             logger.warning("Connection not active upon entering context. Attempting to reconnect.") # Replaced print
             try:
-                db_host = os.getenv('DB_HOST', 'localhost')
-                db_user = os.getenv('DB_USER', 'root')
-                db_password = os.getenv('DB_PASSWORD', '1234')
-                db_name = os.getenv('DB_NAME', 'todo_list')
-                self.con = mysql.connect(host=db_host, user=db_user, password=db_password, database=db_name)
-                self.cursor = self.con.cursor(dictionary=True)
+                started = time.perf_counter()
+                self.con = mysql.connect(**self.connect_args)
+                self.cursor = self._instrument(self.con.cursor(dictionary=True))
+                self.tuple_cursor = self._instrument(self.con.cursor())
+                self.metrics.observe('db_connection_acquire_seconds', time.perf_counter() - started, backend=self.BACKEND_NAME)
                 logger.info("Database re-connection established.") # Replaced print
             except mysql.Error as err:
-                logger.error(f"Error during re-connection in __enter__: {err}", exc_info=True) # Replaced print, added exc_info
+                logger.error("Error during re-connection in __enter__: %s", err, exc_info=True) # Replaced print, added exc_info
                 raise
 
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.pool is not None:
+            return self._exit_pooled(exc_type, exc_val)
+
         if self.con and self.con.is_connected():
+            started = time.perf_counter()
             try:
                 if exc_type:
                     self.con.rollback()
-                    logger.warning(f"Database transaction rolled back due to error: {exc_val}") # Replaced print
+                    logger.warning("Database transaction rolled back due to error: %s", exc_val) # Replaced print
                 else:
                     self.con.commit()
-                    logger.info("Database transaction committed successfully.") # Replaced print
+                    logger.debug("Database transaction committed successfully.") # Replaced print
+                self._observe_commit(exc_type, started)
             except mysql.Error as err:
-                logger.error(f"Error during commit/rollback: {err}", exc_info=True) # Replaced print, added exc_info
+                logger.error("Error during commit/rollback: %s", err, exc_info=True) # Replaced print, added exc_info
+                if not exc_type:
+                    raise # A write that never committed must not be reported as a success
             finally:
                 try:
-                    if self.cursor:
-                        self.cursor.close()
+                    for cursor in (self.cursor, self.tuple_cursor):
+                        if cursor:
+                            cursor.close()
                     if self.con:
                         self.con.close()
-                    logger.info("Database connection and cursor closed.") # Replaced print
+                    logger.debug("Database connection and cursor closed.") # Replaced print
                 except mysql.Error as err:
-                    logger.error(f"Error during connection closure: {err}", exc_info=True) # Replaced print, added exc_info
+                    logger.error("Error during connection closure: %s", err, exc_info=True) # Replaced print, added exc_info
         else:
-            logger.info("No active database connection to close upon exiting context.") # Replaced print
+            logger.debug("No active database connection to close upon exiting context.") # Replaced print
 
         return False
 
-    def create_tables(self):
-        tables = {}
-        tables['users'] = (
-            "CREATE TABLE IF NOT EXISTS users ("
-            "id INT AUTO_INCREMENT PRIMARY KEY,"
-            "name VARCHAR(255) NOT NULL UNIQUE,"
-            "password VARCHAR(255) NOT NULL"
-            ") ENGINE=InnoDB"
-        )
-        tables['tasks'] = (
-            "CREATE TABLE IF NOT EXISTS tasks ("
-            "id INT AUTO_INCREMENT PRIMARY KEY,"
-            "user_id INT NOT NULL,"
-            "task VARCHAR(255) NOT NULL,"
-            "task_status ENUM('pending', 'completed') DEFAULT 'pending'," # Added status
-            "due_date DATE,"
-            "priority INT,"
-            "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,"
-            "FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE"
-            ") ENGINE=InnoDB"
-        )
+    def _exit_pooled(self, exc_type, exc_val):
+        con, cursors = self.con, (self.cursor, self.tuple_cursor)
+        self.con = None
+        self.cursor = None
+        self.tuple_cursor = None
+        if con is None:
+            return False
+
+        healthy = True
+        started = time.perf_counter()
+        try:
+            if exc_type:
+                con.rollback()
+                logger.warning("Database transaction rolled back due to error: %s", exc_val)
+            else:
+                con.commit()
+                logger.debug("Database transaction committed successfully.")
+            self._observe_commit(exc_type, started)
+        except mysql.Error as err:
+            healthy = False # Never hand a connection in an unknown transaction state to the next caller
+            logger.error("Error during commit/rollback: %s", err, exc_info=True)
+            if not exc_type:
+                raise # Surfaces as self.db.Error once the connection is discarded below
+        finally:
+            for cursor in cursors:
+                if isinstance(cursor, InstrumentedCursor):
+                    cursor.release() # Record its last statement; the driver's cursor stays open for the next transaction
+            self.pool.release(con, discard=not healthy)
+
+        return False
+
+    def close(self):
+        """Closes the pool (or the single legacy connection) when the application shuts down."""
+        if self.pool is not None:
+            self.pool.close()
+        elif self.con and self.con.is_connected():
+            self.con.close()
+
+    def _statement_cache(self, con=None) -> StatementCache:
+        con = con if con is not None else self.con
+        cache = self._statement_caches.get(id(con))
+        if cache is None:
+            with self._statement_caches_lock:
+                cache = self._statement_caches[id(con)] = StatementCache(con, self.statement_cache_size)
+        return cache
+
+    def _drop_statement_cache(self, con):
+        # The cache holds its connection, so it must go before the id can be reused by a new one
+        with self._statement_caches_lock:
+            self._statement_caches.pop(id(con), None)
+
+    @contextlib.contextmanager
+    def _prepared(self, sql: str, params: tuple):
+        """
+        Executes sql on this connection's prepared cursor for it and yields the cursor.
+        Prepared cursors are unbuffered, so callers must fetch every row inside the block.
+        Rows are tuples either way: it falls back to the transaction's tuple cursor outside
+        pooled mode or with DB_PREPARED_STATEMENTS=0.
+        """
+        if self.pool is None or not self.prepared_statements:
+            self.tuple_cursor.execute(sql, params)
+            yield self.tuple_cursor
+            return
+
+        cursor = self._instrument(self._statement_cache().prepared(sql))
+        try:
+            cursor.execute(sql, params)
+            yield cursor
+        finally:
+            if self.con.unread_result:
+                self.con.consume_results() # The caller failed mid-fetch; free the connection
+            if isinstance(cursor, InstrumentedCursor):
+                cursor.release()
+
+    def statement_cache_stats(self) -> dict:
+        with self._statement_caches_lock:
+            caches = list(self._statement_caches.values())
+        return {
+            'connections': len(caches),
+            'hits': sum(cache.hits for cache in caches),
+            'misses': sum(cache.misses for cache in caches), # Each miss is one server-side parse
+            'evictions': sum(cache.evictions for cache in caches),
+        }
+
+    def commit(self):
+        started = time.perf_counter()
+        self.con.commit()
+        self._observe_commit(None, started)
+
+    def migrate(self) -> list[int]:
+        return migrations.apply_migrations(self)
 
-        for name, ddl in tables.items():
-            try:
-                logger.info(f"Creating table {name}: {ddl}")
-                self.cursor.execute(ddl)
-            except mysql.connector.Error as err:
-                if err.errno == mysql.connector.errorcode.ER_TABLE_EXISTS_ERROR:
-                    logger.warning(f"Table {name} already exists, skipping creation.")
-                else:
-                    logger.error(f"Error creating table {name}: {err}", exc_info=True)
-                    raise
-    
     def add_user(self, name: str, password_hash: str): 
         try:
             self.cursor.execute(
@@ -113,123 +409,363 @@ class Database:
                 (name, password_hash) 
             )
             user_id = self.cursor.lastrowid
-            logger.info(f"User '{name}' added successfully with ID: {user_id}.")
+            logger.debug("User '%s' added successfully with ID: %s.", name, user_id)
             return user_id
         except mysql.IntegrityError as err:
-            logger.error(f"Error adding user '{name}': Duplicate name. {err}", exc_info=True)
+            logger.error("Error adding user '%s': Duplicate name. %s", name, err, exc_info=True)
             raise ValueError(f"Username '{name}' already exists.")
         except mysql.Error as err:
-            logger.error(f"Error adding user '{name}': {err}", exc_info=True)
+            logger.error("Error adding user '%s': %s", name, err, exc_info=True)
             raise
     
     def get_user(self, name: str):
         try:
-            self.cursor.execute("SELECT id, password FROM users WHERE name = %s", (name,))
-            result = self.cursor.fetchone() # This will be a dictionary if dictionary=True is set
+            with self._prepared(self.SQL_GET_USER, (name,)) as cursor:
+                rows = cursor.fetchall() # Unique name, so at most one row; fetchall drains the prepared cursor
 
-            if result:
-                logger.info(f"User '{name}' found.")
-                return result # Directly return the dictionary (e.g., {'id': 1, 'password': 'hashed_value'})
+            if rows:
+                logger.debug("User '%s' found.", name)
+                user_id, password = rows[0]
+                return {'id': user_id, 'password': password}
             else:
-                logger.info(f"User '{name}' not found.")
+                logger.debug("User '%s' not found.", name)
                 return None
-        except mysql.connector.Error as err:
-            logger.error(f"Error retrieving user '{name}': {err}", exc_info=True)
+        except mysql.Error as err:
+            logger.error("Error retrieving user '%s': %s", name, err, exc_info=True)
+            raise
+
+    def update_user_password(self, user_id: int, password_hash: str) -> bool:
+        """Replaces a user's stored hash (e.g. after upgrading the bcrypt cost on login)."""
+        try:
+            self.cursor.execute("UPDATE users SET password = %s WHERE id = %s", (password_hash, user_id))
+            return self.cursor.rowcount > 0
+        except mysql.Error as err:
+            logger.error("Error updating password hash for user ID %s: %s", user_id, err, exc_info=True)
             raise
     
-    def add_task(self, user_id: int, task: str):
+    def add_task(self, user_id: int, task: str, due_date: date = None, priority: int = None):
         if not task or not task.strip():
-            logger.warning(f"Attempted to add an empty task for user_id: {user_id}")
+            logger.warning("Attempted to add an empty task for user_id: %s", user_id)
             raise ValueError("Task description cannot be empty.")
 
         try:
-            self.cursor.execute("INSERT INTO tasks (user_id, task) VALUES (%s, %s)", (user_id, task))
-
-            task_id = self.cursor.lastrowid
-            logger.info(f"Task '{task}' added successfully for user_id {user_id} with ID: {task_id}.")
+            with self._prepared(self.SQL_ADD_TASK, (user_id, task, due_date, priority)) as cursor:
+                task_id = cursor.lastrowid
+            self._adjust_stats(user_id, added=[('pending', due_date)])
+            logger.debug("Task '%s' added successfully for user_id %s with ID: %s.", task, user_id, task_id)
             return task_id
         except mysql.IntegrityError as err:
-            logger.error(f"Error adding task for user_id {user_id}: User ID does not exist or invalid data. {err}", exc_info=True)
+            logger.error("Error adding task for user_id %s: User ID does not exist or invalid data. %s", user_id, err, exc_info=True)
             raise ValueError(f"User with ID {user_id} does not exist or task data is invalid.")
         except mysql.Error as err:
-            logger.error(f"Error adding task for user_id {user_id} and task '{task}': {err}", exc_info=True)
+            logger.error("Error adding task for user_id %s and task '%s': %s", user_id, task, err, exc_info=True)
             raise
     
-    def get_tasks(self, user_id: int) -> list[tuple]:
+    def get_tasks(self, user_id: int) -> list[TaskRecord]:
         """
         Retrieves all tasks for a specific user from the database.
-        Returns a list of tuples, where each tuple is a task row.
+        Returns a list of TaskRecords ordered by id.
         """
         try:
-            self.cursor.execute(
-                "SELECT id, task, task_status, due_date, priority FROM tasks WHERE user_id = %s ORDER BY id ASC",
-                (user_id,) # <--- CRITICAL: Filter by user_id
-            )
-            tasks = self.cursor.fetchall()
+            with self._prepared(self.SQL_GET_TASKS, (user_id,)) as cursor: # <--- CRITICAL: Filter by user_id
+                tasks = fetch_task_records(cursor)
             if tasks:
-                logger.info(f"Database: Retrieved {len(tasks)} tasks for user_id: {user_id}.")
+                logger.debug("Database: Retrieved %s tasks for user_id: %s.", len(tasks), user_id)
             else:
-                logger.info(f"Database: No tasks found for user_id: {user_id}.")
+                logger.debug("Database: No tasks found for user_id: %s.", user_id)
             return tasks
-        except mysql.connector.Error as err:
-            logger.error(f"Database: Error retrieving tasks for user_id {user_id}: {err}", exc_info=True)
+        except mysql.Error as err:
+            logger.error("Database: Error retrieving tasks for user_id %s: %s", user_id, err, exc_info=True)
             raise # Re-raise the database error for the calling layer (commands.py) to handle
-    
-    def delete_task(self, user_id: int, task_id: int) -> bool:
+
+    def iter_tasks(self, user_id: int, batch_size: int = 1000):
+        """
+        Streams a user's tasks from an unbuffered (server-side) cursor, batch_size rows at a
+        time, so exports never hold the whole list in memory. The connection stays busy until
+        the iteration finishes.
+        """
+        stream = self.con.cursor(buffered=False)
+        exhausted = False
+        try:
+            stream.execute(f"SELECT {self.TASK_COLUMNS} FROM tasks WHERE user_id = %s ORDER BY id ASC", (user_id,))
+            while True:
+                rows = stream.fetchmany(batch_size)
+                if not rows:
+                    exhausted = True
+                    break
+                yield from map(TaskRecord._make, rows)
+        finally:
+            if not exhausted:
+                self.con.consume_results() # Discard unread rows so the connection can be reused
+            stream.close()
+
+    def query_tasks(self, user_id: int, query: TaskQuery, after: tuple = None, before: tuple = None) -> list[TaskRecord]:
+        """Retrieves a user's tasks matching query; see TaskStorage._compile_task_query for paging."""
+        sql, params, backwards = self._compile_task_query(user_id, query, after, before)
+        try:
+            self.tuple_cursor.execute(sql, params)
+            tasks = fetch_task_records(self.tuple_cursor)
+            if backwards:
+                tasks.reverse()
+            logger.debug("Database: Query returned %s tasks for user_id: %s.", len(tasks), user_id)
+            return tasks
+        except mysql.Error as err:
+            logger.error("Database: Error querying tasks for user_id %s: %s", user_id, err, exc_info=True)
+            raise
+
+    def search_tasks(self, user_id: int, terms: tuple[str, ...], limit: int = 50,
+                     prefix: bool = True) -> list[TaskRecord]:
+        """
+        Searches task text through the FULLTEXT index in boolean mode: each term is required
+        (+term) and, with prefix, truncated (term*). Ranked by MySQL's relevance score.
+        """
+        if not terms:
+            return []
+        against = " ".join(f"+{term}*" if prefix else f"+{term}" for term in terms)
+        try:
+            with self._prepared(self.SQL_SEARCH_TASKS, (user_id, against, against, limit)) as cursor:
+                tasks = fetch_task_records(cursor)
+            logger.debug("Database: Search %r matched %s tasks for user_id: %s.", against, len(tasks), user_id)
+            return tasks
+        except mysql.Error as err:
+            logger.error("Database: Error searching tasks for user_id %s: %s", user_id, err, exc_info=True)
+            raise
+
+    def get_tasks_fingerprint(self, user_id: int) -> tuple:
+        """
+        Cheap change probe for caches: (row count, max id, latest updated_at) for a user's
+        tasks, served from the (user_id, updated_at) index. Detects inserts, deletes and edits
+        made by other clients.
+        """
         try:
             self.cursor.execute(
-                "DELETE FROM tasks WHERE user_id = %s AND id = %s", # CRITICAL: Include user_id
+                "SELECT COUNT(*) AS row_count, MAX(id) AS max_id, MAX(updated_at) AS updated_at FROM tasks WHERE user_id = %s",
+                (user_id,)
+            )
+            row = self.cursor.fetchone()
+            return (row['row_count'], row['max_id'], row['updated_at'])
+        except mysql.Error as err:
+            logger.error("Database: Error probing tasks for user_id %s: %s", user_id, err, exc_info=True)
+            raise
+
+    def get_task(self, user_id: int, task_id: int) -> TaskRecord | None:
+        """Retrieves a single task (scoped to its owner) so callers can patch one row instead of re-reading the list."""
+        try:
+            self.tuple_cursor.execute(
+                f"SELECT {self.TASK_COLUMNS} FROM tasks WHERE user_id = %s AND id = %s",
                 (user_id, task_id)
             )
-            if self.cursor.rowcount > 0:
-                logger.info(f"Database: Task ID {task_id} deleted successfully for user_id {user_id}.")
+            row = self.tuple_cursor.fetchone()
+            return TaskRecord._make(row) if row else None
+        except mysql.Error as err:
+            logger.error("Database: Error retrieving task ID %s for user_id %s: %s", task_id, user_id, err, exc_info=True)
+            raise
+
+    def delete_task(self, user_id: int, task_id: int) -> bool:
+        try:
+            old = self._locked_task_states(user_id, [task_id])
+            with self._prepared(self.SQL_DELETE_TASK, (user_id, task_id)) as cursor: # CRITICAL: Include user_id
+                deleted = cursor.rowcount > 0
+            if deleted:
+                self._log_deletions(user_id, [task_id])
+                self._adjust_stats(user_id, removed=old.values())
+                logger.debug("Database: Task ID %s deleted successfully for user_id %s.", task_id, user_id)
                 return True
             else:
-                logger.info(f"Database: Task ID {task_id} not found or not deleted for user_id {user_id}.")
+                logger.debug("Database: Task ID %s not found or not deleted for user_id %s.", task_id, user_id)
                 return False
         except mysql.Error as err:
-            logger.error(f"Database: Error deleting task ID {task_id} for user_id {user_id}: {err}", exc_info=True)
+            logger.error("Database: Error deleting task ID %s for user_id %s: %s", task_id, user_id, err, exc_info=True)
             raise
     
     def update_task(self, user_id: int, task_id: int, task_name: str = None, due_date: date = None, priority: int = None, task_status: str = None) -> bool:
-        updates = []
-        values = []
-
-        if task_name is not None:
-            updates.append("task = %s")
-            values.append(task_name)
-        if due_date is not None:
-            updates.append("due_date = %s")
-            values.append(due_date)
-        if priority is not None:
-            updates.append("priority = %s")
-            values.append(priority)
-        if task_status is not None: # New: Handle task_status
-            updates.append("task_status = %s")
-            values.append(task_status)
+        columns, values = self._changed_columns(task_name, due_date, priority, task_status)
 
-        if not updates:
-            logger.info(f"DB: No fields to update for task ID {task_id} (user_id: {user_id}).")
+        if not columns:
+            logger.debug("DB: No fields to update for task ID %s (user_id: %s).", task_id, user_id)
             return False # Nothing to update
 
-        sql_query = f"UPDATE tasks SET {', '.join(updates)} WHERE id = %s AND user_id = %s"
+        # One cached statement per column combination, so each variant is prepared once per connection
+        sql_query = update_statement(columns, self.PLACEHOLDER)
         values.extend([task_id, user_id])
 
         try:
-            self.cursor.execute(sql_query, tuple(values))
-            return self.cursor.rowcount > 0 # Returns True if a row was updated
-        except mysql.connector.Error as e:
-            logger.error(f"DB: Error updating task {task_id} for user {user_id}: {e}", exc_info=True)
-            return False
+            # Only status and due date feed the task statistics; other edits skip the extra read
+            old = self._locked_task_states(user_id, [task_id]) if due_date or task_status else {}
+            with self._prepared(sql_query, tuple(values)) as cursor:
+                updated = cursor.rowcount > 0 # True if a row was updated
+            if updated and old:
+                status, due = old[task_id]
+                self._adjust_stats(user_id, removed=[(status, due)], added=[(task_status or status, due_date or due)])
+            return updated
+        except mysql.Error as e:
+            logger.error("DB: Error updating task %s for user %s: %s", task_id, user_id, e, exc_info=True)
+            raise # The stats adjustment may have half-run; the caller's transaction must roll back, not commit
 
-    def get_tasks(self, user_id: int) -> list[dict]:
-        """Retrieves all tasks for a specific user."""
+    # --- Bulk operations (one statement per chunk, committed together by the caller's transaction) ---
+    BULK_CHUNK_SIZE = 1000 # Keeps IN (...) lists and multi-row INSERTs well under max_allowed_packet
+
+    def add_tasks(self, user_id: int, rows: list[tuple], return_records: bool = True) -> list[TaskRecord]:
+        """
+        Inserts many (task, due_date, priority, task_status) rows; a None status means 'pending'.
+        Without return_records this uses executemany, which the driver rewrites into multi-row INSERTs.
+        Returns the inserted task records in input order (empty if return_records is False).
+        """
+        sql = "INSERT INTO tasks (user_id, task, due_date, priority, task_status) VALUES (%s, %s, %s, %s, %s)"
+        inserted = []
         try:
+            for start in range(0, len(rows), self.BULK_CHUNK_SIZE):
+                chunk = rows[start:start + self.BULK_CHUNK_SIZE]
+                params = [(user_id, task, due_date, priority, task_status or 'pending')
+                          for task, due_date, priority, task_status in chunk]
+                if not return_records:
+                    self.cursor.executemany(sql, params)
+                else:
+                    # A multi-row INSERT only reports its first id, and the rest need not be contiguous
+                    # (innodb_autoinc_lock_mode=2 interleaves concurrent inserts), so take each row's own id
+                    for values in params:
+                        self.cursor.execute(sql, values)
+                        _, task, due_date, priority, task_status = values
+                        inserted.append(TaskRecord(self.cursor.lastrowid, task, task_status, due_date, priority))
+                self._adjust_stats(user_id, added=[(task_status or 'pending', due_date)
+                                                   for _, due_date, _, task_status in chunk])
+            logger.debug("Database: Bulk-inserted %s tasks for user_id %s.", len(rows), user_id)
+            return inserted
+        except mysql.IntegrityError as err:
+            logger.error("Database: Bulk insert failed for user_id %s: %s", user_id, err, exc_info=True)
+            raise ValueError(f"User with ID {user_id} does not exist or task data is invalid.")
+        except mysql.Error as err:
+            logger.error("Database: Bulk insert failed for user_id %s: %s", user_id, err, exc_info=True)
+            raise
+
+    def archive_completed_tasks(self, user_id: int, before: datetime, limit: int) -> int:
+        try:
+            self.tuple_cursor.execute(
+                "SELECT id, due_date FROM tasks WHERE user_id = %s AND updated_at < %s AND task_status = 'completed' "
+                "ORDER BY updated_at ASC LIMIT %s FOR UPDATE",
+                (user_id, before.strftime(self.CHANGE_TIME_FORMAT), limit)
+            )
+            rows = self.tuple_cursor.fetchall()
+            if not rows:
+                return 0
+            task_ids = [row[0] for row in rows]
+            placeholders = self._in_list(len(task_ids))
             self.cursor.execute(
-                "SELECT id, task, task_status, due_date, priority FROM tasks WHERE user_id = %s",
-                (user_id,)
+                "INSERT INTO tasks_archive (id, user_id, task, task_status, due_date, priority, created_at, updated_at) "
+                "SELECT id, user_id, task, task_status, due_date, priority, created_at, updated_at FROM tasks "
+                f"WHERE user_id = %s AND id IN ({placeholders})",
+                (user_id, *task_ids)
+            )
+            self.cursor.execute(f"DELETE FROM tasks WHERE user_id = %s AND id IN ({placeholders})", (user_id, *task_ids))
+            self._log_deletions(user_id, task_ids)
+            self._adjust_stats(user_id, removed=[('completed', due_date) for _, due_date in rows])
+            logger.debug("Database: Archived %s completed tasks for user_id %s.", len(task_ids), user_id)
+            return len(task_ids)
+        except mysql.Error as err:
+            logger.error("Database: Archiving tasks failed for user_id %s: %s", user_id, err, exc_info=True)
+            raise
+
+    def _locked_task_states(self, user_id: int, task_ids: list[int]) -> dict[int, tuple]:
+        """
+        Returns task id -> (task_status, due_date) for those of task_ids that belong to user_id,
+        locking the rows for the current transaction so the state stays current until the write.
+        """
+        states = {}
+        for start in range(0, len(task_ids), self.BULK_CHUNK_SIZE):
+            chunk = task_ids[start:start + self.BULK_CHUNK_SIZE]
+            placeholders = self._in_list(len(chunk))
+            self.tuple_cursor.execute(
+                f"SELECT id, task_status, due_date FROM tasks WHERE user_id = %s AND id IN ({placeholders}) FOR UPDATE",
+                (user_id, *chunk)
+            )
+            states.update((row[0], (row[1], row[2])) for row in self.tuple_cursor.fetchall())
+        return states
+
+    def _adjust_stats(self, user_id: int, removed=(), added=()):
+        """
+        Applies the (task_status, due_date) states of removed and added tasks to task_stats and
+        task_due_counts. Done here rather than by triggers, which need SUPER while binary logging is on.
+        """
+        pending = completed = 0
+        due_counts = {}
+        for sign, states in ((-1, removed), (1, added)):
+            for task_status, due_date in states:
+                if task_status == 'completed':
+                    completed += sign
+                elif task_status == 'pending':
+                    pending += sign
+                    if due_date is not None:
+                        due_counts[due_date] = due_counts.get(due_date, 0) + sign
+        due_counts = {due_date: count for due_date, count in due_counts.items() if count}
+        if not (pending or completed or due_counts):
+            return
+        # The task_stats row is written even when only due dates moved: locking it first orders
+        # this user's writers, and reconcile_task_stats, on one row
+        self.cursor.execute(
+            "INSERT INTO task_stats (user_id, pending, completed) VALUES (%s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE pending = pending + VALUES(pending), completed = completed + VALUES(completed)",
+            (user_id, pending, completed)
+        )
+        if due_counts:
+            # Rows in key order, so concurrent writers lock them in the same order
+            self.cursor.executemany(
+                "INSERT INTO task_due_counts (user_id, due_date, pending) VALUES (%s, %s, %s) "
+                "ON DUPLICATE KEY UPDATE pending = pending + VALUES(pending)",
+                [(user_id, due_date, count) for due_date, count in sorted(due_counts.items())]
             )
-            return self.cursor.fetchall() # Returns list of dictionaries
-        except mysql.connector.Error as e:
-            logger.error(f"DB: Error retrieving tasks for user {user_id}: {e}", exc_info=True)
-            return [] # Return empty list on error
+
+    def update_tasks(self, user_id: int, task_ids: list[int], task_name: str = None, due_date: date = None,
+                     priority: int = None, task_status: str = None) -> dict[int, TaskRecord | None]:
+        """
+        Applies the same field changes to many tasks using UPDATE ... WHERE id IN (...).
+        Returns task id -> updated record, or None for ids the user does not own.
+        """
+        updates, values = self._update_assignments(task_name, due_date, priority, task_status)
+        if not updates:
+            raise ValueError("No fields to update.")
+
+        try:
+            old = self._locked_task_states(user_id, task_ids)
+            owned = sorted(old)
+            records = {}
+            for start in range(0, len(owned), self.BULK_CHUNK_SIZE):
+                chunk = owned[start:start + self.BULK_CHUNK_SIZE]
+                placeholders = self._in_list(len(chunk))
+                self.cursor.execute(
+                    f"UPDATE tasks SET {', '.join(updates)} WHERE user_id = %s AND id IN ({placeholders})",
+                    (*values, user_id, *chunk)
+                )
+                self.tuple_cursor.execute(
+                    f"SELECT {self.TASK_COLUMNS} FROM tasks WHERE user_id = %s AND id IN ({placeholders})",
+                    (user_id, *chunk)
+                )
+                records.update((row[0], TaskRecord._make(row)) for row in self.tuple_cursor.fetchall())
+            if due_date or task_status:
+                self._adjust_stats(user_id, removed=[old[task_id] for task_id in records],
+                                   added=[(record.task_status, record.due_date) for record in records.values()])
+            logger.debug("Database: Bulk-updated %s of %s tasks for user_id %s.", len(records), len(task_ids), user_id)
+            return {task_id: records.get(task_id) for task_id in task_ids}
+        except mysql.Error as err:
+            logger.error("Database: Bulk update failed for user_id %s: %s", user_id, err, exc_info=True)
+            raise
+
+    def delete_tasks(self, user_id: int, task_ids: list[int]) -> dict[int, bool]:
+        """Deletes many tasks using DELETE ... WHERE id IN (...). Returns task id -> whether it was deleted."""
+        try:
+            old = self._locked_task_states(user_id, task_ids)
+            owned = sorted(old)
+            for start in range(0, len(owned), self.BULK_CHUNK_SIZE):
+                chunk = owned[start:start + self.BULK_CHUNK_SIZE]
+                placeholders = self._in_list(len(chunk))
+                self.cursor.execute(
+                    f"DELETE FROM tasks WHERE user_id = %s AND id IN ({placeholders})",
+                    (user_id, *chunk)
+                )
+            self._log_deletions(user_id, owned)
+            self._adjust_stats(user_id, removed=old.values())
+            logger.debug("Database: Bulk-deleted %s of %s tasks for user_id %s.", len(owned), len(task_ids), user_id)
+            owned = set(owned)
+            return {task_id: task_id in owned for task_id in task_ids}
+        except mysql.Error as err:
+            logger.error("Database: Bulk delete failed for user_id %s: %s", user_id, err, exc_info=True)
+            raise
@@ -0,0 +1,246 @@
+# loadtest.py
+
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+from auth import PasswordHasher, SessionStore
+from benchmark import peak_rss_kb, summarize_latencies
+from commands import ToDoListApp
+from server import ToDoHTTPServer
+from storage import open_storage
+
+logger = logging.getLogger(__name__)
+
+# Operation -> share of requests
+MIX = {'list_all': 0.15, 'list_page': 0.35, 'search': 0.15, 'add_task': 0.20, 'update_task': 0.15}
+LOAD_PASSWORD = "loadtest-password"
+SEED_BATCH_SIZE = 500
+SEARCH_WORDS = ("report", "invoice", "call", "groceries", "review", "plan", "email", "fix")
+
+
+class Client:
+    """One simulated user on its own keep-alive connection, remembering ETags like a browser would."""
+    def __init__(self, host: str, port: int, token: str = None, use_gzip: bool = True):
+        self.connection = http.client.HTTPConnection(host, port, timeout=30)
+        self.token = token
+        self.use_gzip = use_gzip
+        self.etags = {} # path -> (ETag, decoded body) from the last 200
+        self.task_ids = []
+        self.bytes_received = 0
+
+    def request(self, method: str, path: str, payload: dict = None) -> tuple[int, dict | None]:
+        headers = {}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        if self.use_gzip:
+            headers['Accept-Encoding'] = 'gzip'
+        cached = self.etags.get(path) if method == 'GET' else None
+        if cached:
+            headers['If-None-Match'] = cached[0]
+        body = None
+        if payload is not None:
+            body = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        raw = response.read()
+        self.bytes_received += len(raw)
+        if response.status == 304:
+            return 304, cached[1]
+        if response.getheader('Content-Encoding') == 'gzip':
+            raw = gzip.decompress(raw)
+        data = json.loads(raw) if raw else None
+        if method == 'GET' and response.getheader('ETag'):
+            self.etags[path] = (response.getheader('ETag'), data)
+        return response.status, data
+
+    def close(self):
+        self.connection.close()
+
+
+def seed_users(host: str, port: int, users: int, tasks_per_user: int, seed: int) -> list[tuple[str, list[int]]]:
+    """Registers users and bulk-adds their tasks through the API; returns (token, task ids) per user."""
+    rng = random.Random(seed)
+    run_tag = f"{os.getpid()}_{int(time.time())}"
+    today = date.today()
+    sessions = []
+    client = Client(host, port, use_gzip=False)
+    try:
+        for index in range(users):
+            credentials = {'username': f"load_{run_tag}_{index}", 'password': LOAD_PASSWORD}
+            status, data = client.request('POST', '/users', credentials)
+            if status != 201:
+                raise RuntimeError(f"Registering a load-test user failed: {data}")
+            status, data = client.request('POST', '/sessions', credentials)
+            if status != 201:
+                raise RuntimeError(f"Logging in a load-test user failed: {data}")
+            token = data['token']
+            client.token = token
+
+            task_ids = []
+            for start in range(0, tasks_per_user, SEED_BATCH_SIZE):
+                rows = [{
+                    'task': f"{rng.choice(SEARCH_WORDS)} {rng.choice(SEARCH_WORDS)} item {start + i}",
+                    'due_date': (today + timedelta(days=rng.randint(-30, 335))).isoformat() if rng.random() < 0.8 else None,
+                    'priority': rng.randint(0, 10) if rng.random() < 0.8 else None,
+                } for i in range(min(SEED_BATCH_SIZE, tasks_per_user - start))]
+                status, data = client.request('POST', '/tasks', {'tasks': rows})
+                task_ids.extend(result['task']['id'] for result in data['results'] if result['task'])
+            client.token = None
+            sessions.append((token, task_ids))
+    finally:
+        client.close()
+    return sessions
+
+
+def run_client(client: Client, deadline: float, max_requests: int, rng: random.Random, results: dict, lock: threading.Lock):
+    latencies = defaultdict(list)
+    statuses = Counter()
+    operations, weights = zip(*MIX.items())
+    sent = 0
+    while time.perf_counter() < deadline and sent < max_requests:
+        name = rng.choices(operations, weights)[0]
+        if name == 'list_all':
+            method, path, payload = 'GET', '/tasks', None
+        elif name == 'list_page':
+            # A handful of distinct pages per user, so revalidation gets a chance to hit
+            method, path, payload = 'GET', f"/tasks?sort=due_date&limit=50&status={rng.choice(('pending', 'completed'))}", None
+        elif name == 'search':
+            method, path, payload = 'GET', f"/tasks/search?q={rng.choice(SEARCH_WORDS)[:rng.randint(3, 5)]}", None
+        elif name == 'add_task':
+            method, path = 'POST', '/tasks'
+            payload = {'task': f"{rng.choice(SEARCH_WORDS)} added", 'priority': rng.randint(0, 10)}
+        else:
+            if not client.task_ids:
+                continue
+            method, path = 'PATCH', f"/tasks/{rng.choice(client.task_ids)}"
+            payload = {'priority': rng.randint(0, 10), 'task_status': rng.choice(('pending', 'completed'))}
+
+        started = time.perf_counter()
+        try:
+            status, data = client.request(method, path, payload)
+        except (OSError, http.client.HTTPException) as err:
+            logger.warning("Load test: %s %s failed: %s", method, path, err)
+            client.connection.close() # http.client reconnects on the next request
+            status, data = 'failed', None
+        latencies[name].append(time.perf_counter() - started)
+        statuses[f"{name} {status}"] += 1
+        if name == 'add_task' and status == 201:
+            client.task_ids.append(data['task']['id'])
+        sent += 1
+
+    with lock:
+        for name, values in latencies.items():
+            results['latencies'][name].extend(values)
+        results['statuses'].update(statuses)
+        results['bytes_received'] += client.bytes_received
+
+
+def run_load_test(args) -> dict:
+    workdir = server = storage = hasher = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        # In-process server over a throwaway SQLite file; bcrypt cost 4 keeps seeding logins fast
+        workdir = tempfile.mkdtemp(prefix="todo-load-")
+        os.environ['SQLITE_PATH'] = os.path.join(workdir, "load.db")
+        storage = open_storage('sqlite')
+        hasher = PasswordHasher(rounds=4)
+        app = ToDoListApp(storage, hasher=hasher)
+        app.setup_database()
+        server = ToDoHTTPServer(('127.0.0.1', 0), app, sessions=SessionStore(), max_inflight=args.max_inflight)
+        threading.Thread(target=server.serve_forever, name="loadtest-server", daemon=True).start()
+        host, port = server.server_address[:2]
+
+    try:
+        started = time.perf_counter()
+        sessions = seed_users(host, port, args.users, args.tasks, args.seed)
+        logger.info("Load test: Seeded %s users with %s tasks each in %.1fs.", args.users, args.tasks, time.perf_counter() - started)
+
+        clients = []
+        for index in range(args.clients):
+            token, task_ids = sessions[index % len(sessions)]
+            client = Client(host, port, token, use_gzip=not args.no_gzip)
+            client.task_ids = list(task_ids)
+            clients.append(client)
+
+        results = {'latencies': defaultdict(list), 'statuses': Counter(), 'bytes_received': 0}
+        lock = threading.Lock()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        per_client = -(-args.requests // args.clients) if args.requests else float('inf')
+        threads = [
+            threading.Thread(target=run_client, args=(client, deadline, per_client, random.Random(args.seed + index), results, lock))
+            for index, client in enumerate(clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+        for client in clients:
+            client.close()
+
+        operations = {}
+        for name, latencies in sorted(results['latencies'].items()):
+            errors = sum(count for key, count in results['statuses'].items()
+                         if key.startswith(f"{name} ") and not key.endswith((" 200", " 201", " 304")))
+            operations[name] = summarize_latencies(latencies, errors, wall)
+        total = sum(len(latencies) for latencies in results['latencies'].values())
+        not_modified = sum(count for key, count in results['statuses'].items() if key.endswith(" 304"))
+        return {
+            'meta': {'url': args.url or f"http://{host}:{port} (in-process SQLite)", 'clients': args.clients,
+                     'users': args.users, 'tasks_per_user': args.tasks, 'duration_s': round(wall, 2),
+                     'gzip': not args.no_gzip, 'python': platform.python_version()},
+            'total': {'requests': total, 'throughput_req_s': round(total / wall, 1) if wall else 0.0,
+                      'not_modified': not_modified, 'bytes_received': results['bytes_received']},
+            'operations': operations,
+            'statuses': dict(sorted(results['statuses'].items())),
+            'peak_rss_kb': peak_rss_kb(),
+        }
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        if hasher is not None:
+            hasher.shutdown()
+        if storage is not None:
+            storage.close()
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the JSON API with concurrent keep-alive clients.")
+    parser.add_argument("--url", help="Server to test, e.g. http://127.0.0.1:8080; by default an in-process server is started.")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent connections, one thread each.")
+    parser.add_argument("--users", type=int, default=16, help="Users created for the run; clients share them round-robin.")
+    parser.add_argument("--tasks", type=int, default=500, help="Tasks seeded per user.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run.")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead of at the deadline.")
+    parser.add_argument("--max-inflight", type=int, default=8, help="Request slots of the in-process server.")
+    parser.add_argument("--no-gzip", action="store_true", help="Do not send Accept-Encoding: gzip.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger.setLevel(logging.INFO)
+    print(json.dumps(run_load_test(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
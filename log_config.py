@@ -0,0 +1,43 @@
+# log_config.py
+
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from dotenv import load_dotenv
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s"
+
+
+def configure_logging(level: str = None, log_file: str = None, console: bool = True) -> QueueListener:
+    """
+    Sends every record through an in-memory queue to handlers run by a background listener
+    thread, so stream and file I/O never happen on the GUI or worker threads.
+    LOG_LEVEL (default WARNING) and LOG_FILE in .env are used when the arguments are omitted.
+    Returns the started listener; stop() it on shutdown to flush the queue.
+    """
+    load_dotenv()
+    level = (level or os.getenv('LOG_LEVEL', 'WARNING')).upper()
+    log_file = log_file if log_file is not None else os.getenv('LOG_FILE')
+
+    # The format above uses neither field, so skip gathering them for every record
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()] if console else []
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
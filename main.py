@@ -1,25 +1,112 @@
+import argparse
+import contextlib
 import logging
-import tkinter as tk
-from database import Database
-from commands import ToDoListApp
-from GUI import ToDoListGUI 
+import sys
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+
+class StartupProfiler:
+    """Times the startup steps (imports, window, backend) for --profile-startup."""
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases = [] # (name, thread name, start, duration) in seconds since main() began
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                with self._lock:
+                    self.phases.append((name, threading.current_thread().name, begin - self.started, time.perf_counter() - begin))
+
+    def report(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[2])
+        lines = ["Startup profile (ms after main() started):"]
+        for name, thread, start, duration in phases:
+            lines.append(f"  {name:<22} at {start * 1000:8.1f}  took {duration * 1000:8.1f}  [{thread}]")
+        print("\n".join(lines), file=sys.stderr)
+
+
+def open_app(profiler: StartupProfiler) -> tuple:
+    """
+    Imports the command and storage layers, opens the backend and brings the schema up to
+    date. Runs on the GUI's worker pool, so none of it delays the login window.
+    Returns (app, message); app is None if the database could not be opened.
+    """
+    storage = None
+    try:
+        with profiler.phase("import commands"):
+            from commands import ToDoListApp
+            from storage import open_storage
+        with profiler.phase("open storage"):
+            storage = open_storage() # DB_BACKEND in .env selects MySQL or SQLite; only that driver is imported
+        app = ToDoListApp(storage)
+        with profiler.phase("setup_database"):
+            app.setup_database() # A single version lookup when the schema is already current
+        with profiler.phase("write-behind journal"):
+            from write_behind import WriteBehindApp
+            app = WriteBehindApp.from_env(app) or app # WRITE_BEHIND=1: edits are journaled and flushed in the background
+        return app, "Success: Connected."
+    except Exception as e:
+        logger.critical("Application could not open the database: %s", e, exc_info=True)
+        if storage is not None:
+            storage.close()
+        return None, "Error: Could not open the database. Check the logs for details."
+    finally:
+        profiler.report()
+
+
 def main():
-    db_conn_instance = None
+    parser = argparse.ArgumentParser(description="ToDo List desktop application.")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print how long each import and startup step took (see also python -X importtime).")
+    args = parser.parse_args()
+    profiler = StartupProfiler(args.profile_startup)
+
+    # Only what the login window needs is imported up front; the rest loads in open_app()
+    with profiler.phase("import log_config"):
+        from log_config import configure_logging
+    with profiler.phase("configure logging"):
+        log_listener = configure_logging() # Handler I/O runs on the listener thread, not the GUI thread
+    gui = None
+    exporter = None
     try:
-        db_conn_instance = Database()
-        app = ToDoListApp(db_conn_instance)
-        app.setup_database()
+        with profiler.phase("import tkinter"):
+            import tkinter as tk
+        with profiler.phase("import GUI"):
+            from GUI import ToDoListGUI
+        with profiler.phase("create window"):
+            root = tk.Tk()
+            gui = ToDoListGUI(root)
+        with profiler.phase("first paint"):
+            root.update() # Draw the login window before any backend work starts
+        gui.start_app(lambda: open_app(profiler))
 
-        root = tk.Tk()
-        gui = ToDoListGUI(root, app)
+        from metrics import MetricsExporter # Already loaded by GUI
+        exporter = MetricsExporter.from_env() # Periodic metrics dump when METRICS_EXPORT_PATH is set
+        if exporter is not None:
+            exporter.start()
         root.mainloop()
 
     except Exception as e:
-         logger.critical(f"Application encountered a critical error: {e}", exc_info=True)
+         logger.critical("Application encountered a critical error: %s", e, exc_info=True)
          print(f"FATAL ERROR: Application could not run. Check logs for details.")
+    finally:
+        if exporter is not None:
+            exporter.stop()
+        if gui is not None and gui.app is not None:
+            gui.app.close() # Drains the write-behind journal if enabled, then releases pooled connections
+        log_listener.stop() # Flushes queued records
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
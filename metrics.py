@@ -0,0 +1,322 @@
+# metrics.py
+
+import bisect
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("slow_query")
+
+# Upper bounds in seconds; roughly 2.5x apart, from 100us (an in-process SQLite read) to 10s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10_000, 100_000)
+
+_IN_LIST = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_key(sql: str) -> str:
+    """Normalizes SQL into a bounded label: whitespace collapsed and IN (...) lists of any length folded together."""
+    return _IN_LIST.sub("(...)", _WHITESPACE.sub(" ", sql).strip())
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus style); observe() is a bisect and three additions under a lock."""
+    __slots__ = ('buckets', 'counts', 'count', 'total', '_lock')
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def quantile(self, fraction: float) -> float | None:
+        """Estimates a quantile by linear interpolation inside the bucket that holds it."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        target = fraction * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= target and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (target - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'count': self.count, 'sum': self.total, 'counts': list(self.counts)}
+
+
+class MetricsRegistry:
+    """
+    In-process histograms keyed by (metric name, labels), plus the slow-query log.
+    Storage backends record per-statement timings, row counts, connection acquire and
+    commit times; ToDoListApp records per-command wall time.
+    """
+    def __init__(self, enabled: bool = True, slow_query_seconds: float | None = 0.2, explain_interval: float = 60.0):
+        self.enabled = enabled
+        self.slow_query_seconds = slow_query_seconds # None disables the slow-query log
+        self.explain_interval = explain_interval # Seconds before the same slow statement is EXPLAINed again
+        self._series = {} # (name, labels) -> Histogram
+        self._lock = threading.Lock()
+        self._last_explained = {} # statement key -> monotonic time of its last EXPLAIN
+
+    @classmethod
+    def from_env(cls):
+        load_dotenv()
+        slow_ms = os.getenv('SLOW_QUERY_MS', '200')
+        return cls(
+            enabled=os.getenv('METRICS_ENABLED', '1') != '0',
+            slow_query_seconds=float(slow_ms) / 1000 if slow_ms else None,
+        )
+
+    def histogram(self, name: str, buckets: tuple = LATENCY_BUCKETS, **labels) -> Histogram:
+        key = (name, tuple(sorted(labels.items())))
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, Histogram(buckets))
+        return series
+
+    def observe(self, name: str, value: float, buckets: tuple = LATENCY_BUCKETS, **labels):
+        if self.enabled:
+            self.histogram(name, buckets, **labels).observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+            self._last_explained.clear()
+
+    # --- Slow-query log ---
+    def record_statement(self, backend: str, sql: str, params, elapsed: float, rows: int, explain=None):
+        key = statement_key(sql)
+        self.histogram('db_statement_seconds', backend=backend, statement=key).observe(elapsed)
+        self.histogram('db_statement_rows', ROW_BUCKETS, backend=backend, statement=key).observe(rows)
+        if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+            self._log_slow_query(key, sql, params, elapsed, rows, explain)
+
+    def _log_slow_query(self, key: str, sql: str, params, elapsed: float, rows: int, explain):
+        plan = None
+        now = time.monotonic()
+        if explain is not None and key.lstrip().upper().startswith(_EXPLAINABLE):
+            with self._lock:
+                due = now - self._last_explained.get(key, float('-inf')) >= self.explain_interval
+                if due:
+                    self._last_explained[key] = now
+            if due:
+                try:
+                    plan = explain(sql, params)
+                except Exception as err: # EXPLAIN is best effort; never fail the caller's operation
+                    plan = f"EXPLAIN failed: {err}"
+        slow_query_logger.warning(
+            "Slow query (%.1f ms, %d rows): %s | params=%r%s",
+            elapsed * 1000, rows, key, params, f" | plan={plan}" if plan is not None else "",
+        )
+
+    # --- Exporters ---
+    def to_dict(self) -> dict:
+        """JSON-ready snapshot with count, sum, estimated p50/p95/p99 and raw bucket counts per series."""
+        with self._lock:
+            series = list(self._series.items())
+        metrics = []
+        for (name, labels), histogram in sorted(series, key=lambda item: item[0]):
+            snapshot = histogram.snapshot()
+            metrics.append({
+                'name': name,
+                'labels': dict(labels),
+                'count': snapshot['count'],
+                'sum': snapshot['sum'],
+                'p50': histogram.quantile(0.50),
+                'p95': histogram.quantile(0.95),
+                'p99': histogram.quantile(0.99),
+                'buckets': dict(zip([*map(str, histogram.buckets), '+Inf'], snapshot['counts'])),
+            })
+        return {'timestamp': time.time(), 'metrics': metrics}
+
+    def to_prometheus(self) -> str:
+        """Renders the histograms in the Prometheus text exposition format."""
+        with self._lock:
+            series = list(self._series.items())
+        lines = []
+        typed = set()
+        for (name, labels), histogram in sorted(series, key=lambda item: item[0]):
+            metric = f"todo_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            snapshot = histogram.snapshot()
+            label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels)
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip([*map(str, histogram.buckets), '+Inf'], snapshot['counts']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f"{metric}_sum{{{label_text}}} {snapshot['sum']}")
+            lines.append(f"{metric}_count{{{label_text}}} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry.from_env() # Shared by the storage backends and ToDoListApp unless one is injected
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that times each statement (its execute plus the fetches that follow) and
+    counts the rows fetched; the statement is recorded when the next one starts or the
+    cursor closes. Everything else is delegated to the driver's cursor.
+    """
+    def __init__(self, cursor, registry: MetricsRegistry, backend: str, explain=None):
+        self._cursor = cursor
+        self._registry = registry
+        self._backend = backend
+        self._explain = explain # callable(sql, params) -> plan rows, used by the slow-query log
+        self._sql = None
+        self._params = None
+        self._elapsed = 0.0
+        self._rows = 0
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name) # lastrowid, rowcount, description, ...
+
+    def _finish(self):
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            self._registry.record_statement(self._backend, sql, self._params, self._elapsed, self._rows, self._explain)
+
+    def _run(self, method, sql, params):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            return method(sql) if params is None else method(sql, params)
+        finally:
+            self._sql, self._params = sql, params
+            self._elapsed, self._rows = time.perf_counter() - started, 0
+
+    def execute(self, sql, params=None):
+        return self._run(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_params):
+        return self._run(self._cursor.executemany, sql, seq_params)
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def fetchone(self):
+        row = self._fetch(self._cursor.fetchone)
+        self._rows += row is not None
+        return row
+
+    def fetchmany(self, size: int = 1):
+        rows = self._fetch(self._cursor.fetchmany, size)
+        self._rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(self._cursor.fetchall)
+        self._rows += len(rows)
+        return rows
+
+    def release(self):
+        """Records the pending statement but leaves the driver's cursor open for reuse."""
+        self._finish()
+
+    def close(self):
+        self._finish()
+        return self._cursor.close()
+
+
+def timed_command(func):
+    """Records the wall time of a ToDoListApp command under command_seconds{command=<name>}."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        registry = self.metrics
+        if not registry.enabled:
+            return func(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            registry.histogram('command_seconds', command=name).observe(time.perf_counter() - started)
+    return wrapper
+
+
+class MetricsExporter:
+    """Background thread that periodically writes the registry to a file (JSON or Prometheus text)."""
+    FORMATS = ('json', 'prometheus')
+
+    def __init__(self, registry: MetricsRegistry, path: str, fmt: str = 'json', interval: float = 60.0):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported metrics format '{fmt}'; expected one of {', '.join(self.FORMATS)}.")
+        self.registry = registry
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-exporter", daemon=True)
+
+    @classmethod
+    def from_env(cls, registry: MetricsRegistry = None):
+        """Returns an exporter if METRICS_EXPORT_PATH is set, otherwise None."""
+        load_dotenv()
+        path = os.getenv('METRICS_EXPORT_PATH')
+        if not path:
+            return None
+        return cls(
+            registry or REGISTRY,
+            path,
+            fmt=os.getenv('METRICS_EXPORT_FORMAT', 'json'),
+            interval=float(os.getenv('METRICS_EXPORT_INTERVAL', '60')),
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self.write() # Final dump so short sessions still leave a file behind
+
+    def write(self):
+        text = self.registry.to_prometheus() if self.fmt == 'prometheus' else json.dumps(self.registry.to_dict(), indent=2)
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp_path, self.path) # Readers never see a half-written file
+        except OSError as err:
+            logger.error("Metrics: Could not write %s: %s", self.path, err)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
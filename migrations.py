@@ -0,0 +1,428 @@
+# migrations.py
+
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ordered schema migrations: (version, description, statements).
+# Append new steps at the end; never edit a step that has already shipped.
+MIGRATIONS = [
+    (1, "Create users and tasks tables", [
+        "CREATE TABLE IF NOT EXISTS users ("
+        "id INT AUTO_INCREMENT PRIMARY KEY,"
+        "name VARCHAR(255) NOT NULL UNIQUE,"
+        "password VARCHAR(255) NOT NULL"
+        ") ENGINE=InnoDB",
+        "CREATE TABLE IF NOT EXISTS tasks ("
+        "id INT AUTO_INCREMENT PRIMARY KEY,"
+        "user_id INT NOT NULL,"
+        "task VARCHAR(255) NOT NULL,"
+        "task_status ENUM('pending', 'completed') DEFAULT 'pending',"
+        "due_date DATE,"
+        "priority INT,"
+        "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,"
+        "FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE"
+        ") ENGINE=InnoDB",
+    ]),
+    (2, "Add composite indexes for filtering and sorting tasks", [
+        # InnoDB appends the primary key to every secondary index, so each of these
+        # also serves the (sort key, id) keyset order of the pages TaskStorage._compile_task_query builds for get_user_tasks
+        "CREATE INDEX idx_tasks_user_status_due ON tasks (user_id, task_status, due_date)",
+        "CREATE INDEX idx_tasks_user_due ON tasks (user_id, due_date)",
+        "CREATE INDEX idx_tasks_user_priority ON tasks (user_id, priority)",
+    ]),
+    (3, "Add a full-text index on task text for search", [
+        # InnoDB indexes words of innodb_ft_min_token_size (default 3) characters or more
+        "ALTER TABLE tasks ADD FULLTEXT INDEX ft_tasks_task (task)",
+    ]),
+    (4, "Add applied_writes for write-behind idempotency keys", [
+        # One row per applied journal entry, written in the same transaction as its change
+        "CREATE TABLE IF NOT EXISTS applied_writes ("
+        "idempotency_key CHAR(32) PRIMARY KEY,"
+        "user_id INT NOT NULL,"
+        "task_id INT NULL,"
+        "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,"
+        "INDEX idx_applied_writes_applied_at (applied_at)"
+        ") ENGINE=InnoDB",
+    ]),
+    (5, "Track task changes: updated_at and the task_deletions log", [
+        # Set by InnoDB on insert and whenever a column value changes; existing rows get the migration time
+        "ALTER TABLE tasks ADD COLUMN updated_at TIMESTAMP(6) NOT NULL "
+        "DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)",
+        "CREATE INDEX idx_tasks_user_updated ON tasks (user_id, updated_at)",
+        # Written by the storage layer's delete methods, in the same transaction as the delete
+        "CREATE TABLE IF NOT EXISTS task_deletions ("
+        "id BIGINT AUTO_INCREMENT PRIMARY KEY,"
+        "user_id INT NOT NULL,"
+        "task_id INT NOT NULL,"
+        "deleted_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),"
+        "INDEX idx_task_deletions_user_deleted (user_id, deleted_at),"
+        "INDEX idx_task_deletions_deleted (deleted_at)"
+        ") ENGINE=InnoDB",
+    ]),
+    (6, "Add per-user task statistics: task_stats and task_due_counts", [
+        # Kept current by the storage layer's write methods; ToDoListApp.reconcile_task_stats corrects drift
+        "CREATE TABLE IF NOT EXISTS task_stats ("
+        "user_id INT PRIMARY KEY,"
+        "pending INT NOT NULL DEFAULT 0,"
+        "completed INT NOT NULL DEFAULT 0"
+        ") ENGINE=InnoDB",
+        # Pending tasks per due date: overdue and due-today counts read a few rows, not every task
+        "CREATE TABLE IF NOT EXISTS task_due_counts ("
+        "user_id INT NOT NULL,"
+        "due_date DATE NOT NULL,"
+        "pending INT NOT NULL DEFAULT 0,"
+        "PRIMARY KEY (user_id, due_date)"
+        ") ENGINE=InnoDB",
+        "INSERT IGNORE INTO task_stats (user_id, pending, completed) "
+        "SELECT user_id, SUM(task_status = 'pending'), SUM(task_status = 'completed') FROM tasks GROUP BY user_id",
+        "INSERT IGNORE INTO task_due_counts (user_id, due_date, pending) "
+        "SELECT user_id, due_date, COUNT(*) FROM tasks WHERE task_status = 'pending' AND due_date IS NOT NULL "
+        "GROUP BY user_id, due_date",
+    ]),
+    (7, "Add tasks_archive for completed tasks moved out of tasks", [
+        # The task columns of tasks, so archived rows read back as TaskRecords; ids keep their value
+        "CREATE TABLE IF NOT EXISTS tasks_archive ("
+        "id INT PRIMARY KEY,"
+        "user_id INT NOT NULL,"
+        "task VARCHAR(255) NOT NULL,"
+        "task_status ENUM('pending', 'completed') NOT NULL DEFAULT 'completed',"
+        "due_date DATE,"
+        "priority INT,"
+        "created_at TIMESTAMP NULL,"
+        "updated_at TIMESTAMP(6) NULL," # The task's last change before it was archived
+        "archived_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),"
+        # InnoDB appends id, so this also serves the (user_id, id) keyset pages of the archive view
+        "INDEX idx_tasks_archive_user (user_id),"
+        "FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE"
+        ") ENGINE=InnoDB",
+    ]),
+]
+
+# The same schema for the embedded SQLite backend, versioned in step with MIGRATIONS.
+# SQLite DDL is transactional and every statement is idempotent, so no error filtering is needed.
+SQLITE_MIGRATIONS = [
+    (1, "Create users and tasks tables", [
+        "CREATE TABLE IF NOT EXISTS users ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "name TEXT NOT NULL UNIQUE,"
+        "password TEXT NOT NULL"
+        ")",
+        # AUTOINCREMENT never reuses ids, matching InnoDB and keeping (count, max id) fingerprints honest
+        "CREATE TABLE IF NOT EXISTS tasks ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        "user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,"
+        "task TEXT NOT NULL,"
+        "task_status TEXT NOT NULL DEFAULT 'pending' CHECK (task_status IN ('pending', 'completed')),"
+        "due_date DATE,"
+        "priority INTEGER,"
+        "created_at TEXT DEFAULT CURRENT_TIMESTAMP"
+        ")",
+    ]),
+    (2, "Add composite indexes for filtering and sorting tasks", [
+        # The rowid is the implicit tail of every SQLite index, as the primary key is in InnoDB
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_status_due ON tasks (user_id, task_status, due_date)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_due ON tasks (user_id, due_date)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_priority ON tasks (user_id, priority)",
+    ]),
+    (3, "Add a full-text index on task text for search", [
+        # External-content FTS5 table: it stores only the index and reads task text from tasks.
+        # Prefix indexes on 2 and 3 characters keep the short prefixes typed into the search box cheap.
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+        "task, content='tasks', content_rowid='id', prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN "
+        "INSERT INTO tasks_fts (rowid, task) VALUES (new.id, new.task); END",
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN "
+        "INSERT INTO tasks_fts (tasks_fts, rowid, task) VALUES ('delete', old.id, old.task); END",
+        "CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF task ON tasks BEGIN "
+        "INSERT INTO tasks_fts (tasks_fts, rowid, task) VALUES ('delete', old.id, old.task); "
+        "INSERT INTO tasks_fts (rowid, task) VALUES (new.id, new.task); END",
+        "INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')", # Index the rows that existed before this step
+    ]),
+    (4, "Add applied_writes for write-behind idempotency keys", [
+        "CREATE TABLE IF NOT EXISTS applied_writes ("
+        "idempotency_key TEXT PRIMARY KEY,"
+        "user_id INTEGER NOT NULL,"
+        "task_id INTEGER,"
+        "applied_at TEXT DEFAULT CURRENT_TIMESTAMP"
+        ")",
+        "CREATE INDEX IF NOT EXISTS idx_applied_writes_applied_at ON applied_writes (applied_at)",
+    ]),
+    (5, "Track task changes: updated_at and the task_deletions log", [
+        # ALTER TABLE cannot add a column with a non-constant default, so triggers stamp it (in ms, like 'now' below)
+        "ALTER TABLE tasks ADD COLUMN updated_at TEXT",
+        "UPDATE tasks SET updated_at = strftime('%Y-%m-%d %H:%M:%f', created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_user_updated ON tasks (user_id, updated_at)",
+        "CREATE TRIGGER IF NOT EXISTS tasks_stamp_insert AFTER INSERT ON tasks BEGIN "
+        "UPDATE tasks SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = new.id; END",
+        # The WHEN clause skips the trigger's own UPDATE (and any write that sets updated_at itself)
+        "CREATE TRIGGER IF NOT EXISTS tasks_stamp_update AFTER UPDATE ON tasks "
+        "WHEN new.updated_at IS old.updated_at BEGIN "
+        "UPDATE tasks SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now') WHERE id = new.id; END",
+        "CREATE TABLE IF NOT EXISTS task_deletions ("
+        "id INTEGER PRIMARY KEY,"
+        "user_id INTEGER NOT NULL,"
+        "task_id INTEGER NOT NULL,"
+        "deleted_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))"
+        ")",
+        "CREATE INDEX IF NOT EXISTS idx_task_deletions_user_deleted ON task_deletions (user_id, deleted_at)",
+        "CREATE INDEX IF NOT EXISTS idx_task_deletions_deleted ON task_deletions (deleted_at)",
+        "CREATE TRIGGER IF NOT EXISTS tasks_log_delete AFTER DELETE ON tasks BEGIN "
+        "INSERT INTO task_deletions (user_id, task_id) VALUES (old.user_id, old.id); END",
+    ]),
+    (6, "Add per-user task statistics: task_stats and task_due_counts", [
+        "CREATE TABLE IF NOT EXISTS task_stats ("
+        "user_id INTEGER PRIMARY KEY,"
+        "pending INTEGER NOT NULL DEFAULT 0,"
+        "completed INTEGER NOT NULL DEFAULT 0"
+        ")",
+        "CREATE TABLE IF NOT EXISTS task_due_counts ("
+        "user_id INTEGER NOT NULL,"
+        "due_date DATE NOT NULL,"
+        "pending INTEGER NOT NULL DEFAULT 0,"
+        "PRIMARY KEY (user_id, due_date)"
+        ") WITHOUT ROWID",
+        "INSERT OR IGNORE INTO task_stats (user_id, pending, completed) "
+        "SELECT user_id, SUM(task_status = 'pending'), SUM(task_status = 'completed') FROM tasks GROUP BY user_id",
+        "INSERT OR IGNORE INTO task_due_counts (user_id, due_date, pending) "
+        "SELECT user_id, due_date, COUNT(*) FROM tasks WHERE task_status = 'pending' AND due_date IS NOT NULL "
+        "GROUP BY user_id, due_date",
+        # Each trigger adds a row's contribution (new) and/or takes one away (old).
+        # An upsert from INSERT ... SELECT needs its WHERE clause, or ON CONFLICT would parse as a join constraint.
+        "CREATE TRIGGER IF NOT EXISTS tasks_stats_insert AFTER INSERT ON tasks BEGIN "
+        "INSERT INTO task_stats (user_id, pending, completed) "
+        "SELECT new.user_id, new.task_status = 'pending', new.task_status = 'completed' WHERE true "
+        "ON CONFLICT (user_id) DO UPDATE SET pending = pending + excluded.pending, completed = completed + excluded.completed; "
+        "INSERT INTO task_due_counts (user_id, due_date, pending) "
+        "SELECT new.user_id, new.due_date, 1 WHERE new.task_status = 'pending' AND new.due_date IS NOT NULL "
+        "ON CONFLICT (user_id, due_date) DO UPDATE SET pending = pending + 1; END",
+        "CREATE TRIGGER IF NOT EXISTS tasks_stats_delete AFTER DELETE ON tasks BEGIN "
+        "UPDATE task_stats SET pending = pending - (old.task_status = 'pending'), "
+        "completed = completed - (old.task_status = 'completed') WHERE user_id = old.user_id; "
+        "UPDATE task_due_counts SET pending = pending - 1 "
+        "WHERE user_id = old.user_id AND due_date = old.due_date AND old.task_status = 'pending'; END",
+        "CREATE TRIGGER IF NOT EXISTS tasks_stats_update AFTER UPDATE OF task_status, due_date ON tasks "
+        "WHEN old.task_status IS NOT new.task_status OR old.due_date IS NOT new.due_date BEGIN "
+        "UPDATE task_stats SET pending = pending - (old.task_status = 'pending') + (new.task_status = 'pending'), "
+        "completed = completed - (old.task_status = 'completed') + (new.task_status = 'completed') "
+        "WHERE user_id = new.user_id; "
+        "UPDATE task_due_counts SET pending = pending - 1 "
+        "WHERE user_id = old.user_id AND due_date = old.due_date AND old.task_status = 'pending'; "
+        "INSERT INTO task_due_counts (user_id, due_date, pending) "
+        "SELECT new.user_id, new.due_date, 1 WHERE new.task_status = 'pending' AND new.due_date IS NOT NULL "
+        "ON CONFLICT (user_id, due_date) DO UPDATE SET pending = pending + 1; END",
+    ]),
+    (7, "Add tasks_archive for completed tasks moved out of tasks", [
+        # Deleting the moved rows from tasks fires the version 5 and 6 triggers: they are logged
+        # as deletions and leave the task counts
+        "CREATE TABLE IF NOT EXISTS tasks_archive ("
+        "id INTEGER PRIMARY KEY,"
+        "user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,"
+        "task TEXT NOT NULL,"
+        "task_status TEXT NOT NULL DEFAULT 'completed',"
+        "due_date DATE,"
+        "priority INTEGER,"
+        "created_at TEXT,"
+        "updated_at TEXT,"
+        "archived_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))"
+        ")",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_archive_user ON tasks_archive (user_id)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# MySQL error numbers (mysql.connector.errorcode), spelled out so that importing this module,
+# as the SQLite backend does, never loads the MySQL driver.
+# Errors meaning a statement's effect is already present (e.g. a pre-migration install):
+_ALREADY_APPLIED_ERRORS = (
+    1050, # ER_TABLE_EXISTS_ERROR
+    1061, # ER_DUP_KEYNAME
+    1060, # ER_DUP_FIELDNAME
+)
+_ER_NO_SUCH_TABLE = 1146
+
+# The main read paths, checked by explain_queries() to confirm they use an index
+EXPLAIN_QUERIES = {
+    'get_tasks': (
+        "SELECT id, task, task_status, due_date, priority FROM tasks WHERE user_id = %s ORDER BY id ASC", ()
+    ),
+    'page_by_due_date': (
+        "SELECT id, task, task_status, due_date, priority FROM tasks WHERE user_id = %s "
+        "ORDER BY due_date ASC, id ASC LIMIT 100", ()
+    ),
+    'page_by_priority': (
+        "SELECT id, task, task_status, due_date, priority FROM tasks WHERE user_id = %s "
+        "ORDER BY priority DESC, id DESC LIMIT 100", ()
+    ),
+    'pending_by_due_date': (
+        "SELECT id, task, task_status, due_date, priority FROM tasks WHERE user_id = %s "
+        "AND task_status = %s ORDER BY due_date ASC, id ASC LIMIT 100", ('pending',)
+    ),
+    'changes_since': (
+        "SELECT id, task, task_status, due_date, priority FROM tasks WHERE user_id = %s "
+        "AND updated_at > %s ORDER BY updated_at ASC", ('2000-01-01 00:00:00',)
+    ),
+    'archive_candidates': (
+        "SELECT id, due_date FROM tasks WHERE user_id = %s AND updated_at < %s AND task_status = %s "
+        "ORDER BY updated_at ASC LIMIT 500", ('2000-01-01 00:00:00', 'completed')
+    ),
+    'archived_page': (
+        "SELECT id, task, task_status, due_date, priority FROM tasks_archive WHERE user_id = %s "
+        "ORDER BY id DESC LIMIT 100", ()
+    ),
+}
+
+
+def get_schema_version(conn) -> int:
+    """
+    Returns the highest applied migration version (0 for a fresh database).
+    On every start after the first this is a single SELECT: schema_version is only created
+    (DDL, which commits implicitly and takes a metadata lock) when it does not exist yet.
+    """
+    try:
+        conn.cursor.execute("SELECT MAX(version) AS version FROM schema_version")
+    except conn.Error as err:
+        if err.errno != _ER_NO_SUCH_TABLE:
+            raise
+        conn.cursor.execute(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INT PRIMARY KEY,"
+            "description VARCHAR(255) NOT NULL,"
+            "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+            ") ENGINE=InnoDB"
+        )
+        return 0
+    row = conn.cursor.fetchone()
+    return row['version'] or 0
+
+
+def apply_migrations(conn) -> list[int]:
+    """
+    Applies every migration newer than the recorded schema version, in order.
+    Each step is committed together with its schema_version row, so an interrupted
+    run resumes from the first unapplied step. Returns the versions applied.
+    """
+    current = get_schema_version(conn)
+    applied = []
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+
+        logger.info("Migrations: Applying version %s: %s", version, description)
+        for statement in statements:
+            try:
+                conn.cursor.execute(statement)
+            except conn.Error as err:
+                if err.errno in _ALREADY_APPLIED_ERRORS:
+                    logger.warning("Migrations: Skipping already-applied statement in version %s: %s", version, err)
+                else:
+                    logger.error("Migrations: Version %s failed: %s", version, err, exc_info=True)
+                    raise
+
+        conn.cursor.execute(
+            "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+            (version, description)
+        )
+        conn.con.commit() # DDL commits implicitly anyway; this also records the version row
+        applied.append(version)
+
+    if applied:
+        logger.info("Migrations: Schema upgraded from version %s to %s.", current, applied[-1])
+    else:
+        logger.info("Migrations: Schema is current (version %s).", current)
+    return applied
+
+
+def get_sqlite_schema_version(conn) -> int:
+    """Returns the SQLite schema version, kept in PRAGMA user_version (0 for a fresh file)."""
+    conn.cursor.execute("PRAGMA user_version")
+    return conn.cursor.fetchone()['user_version']
+
+
+def apply_sqlite_migrations(conn) -> list[int]:
+    """SQLite counterpart of apply_migrations: each step commits together with its version bump."""
+    current = get_sqlite_schema_version(conn)
+    applied = []
+
+    for version, description, statements in SQLITE_MIGRATIONS:
+        if version <= current:
+            continue
+
+        logger.info("Migrations: Applying SQLite version %s: %s", version, description)
+        for statement in statements:
+            conn.cursor.execute(statement)
+        conn.cursor.execute(f"PRAGMA user_version = {int(version)}")
+        conn.commit()
+        applied.append(version)
+
+    if applied:
+        logger.info("Migrations: SQLite schema upgraded from version %s to %s.", current, applied[-1])
+    else:
+        logger.info("Migrations: SQLite schema is current (version %s).", current)
+    return applied
+
+
+def explain_queries(conn, user_id: int = 1) -> dict[str, list[dict]]:
+    """Runs EXPLAIN on the main task queries and returns the plan rows for each."""
+    plans = {}
+    for name, (sql, extra_params) in EXPLAIN_QUERIES.items():
+        conn.cursor.execute(f"EXPLAIN {sql}", (user_id, *extra_params))
+        plans[name] = conn.cursor.fetchall()
+    return plans
+
+
+def find_unindexed_queries(plans: dict[str, list[dict]]) -> list[str]:
+    """Returns the names of queries whose plan scans the tasks table without an index or sorts with a filesort."""
+    problems = []
+    for name, rows in plans.items():
+        for row in rows:
+            if row.get('table') != 'tasks':
+                continue
+            extra = row.get('Extra') or ''
+            if row.get('type') == 'ALL' or not row.get('key') or 'filesort' in extra:
+                problems.append(name)
+                break
+    return problems
+
+
+def main():
+    from database import Database
+    from storage import open_storage
+
+    parser = argparse.ArgumentParser(description="Manage the ToDo List database schema.")
+    parser.add_argument("command", choices=["migrate", "status", "explain"])
+    parser.add_argument("--user-id", type=int, default=1, help="User ID to plug into EXPLAIN queries.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = open_storage()
+    try:
+        with db as conn:
+            if args.command == "migrate":
+                applied = conn.migrate()
+                print(f"Applied versions: {applied or 'none'}")
+            elif not isinstance(conn, Database):
+                if args.command == "explain":
+                    raise SystemExit("The explain command is only available for the MySQL backend.")
+                print(f"Schema version {get_sqlite_schema_version(conn)} (latest {SQLITE_MIGRATIONS[-1][0]}).")
+            elif args.command == "status":
+                print(f"Schema version {get_schema_version(conn)} (latest {LATEST_VERSION}).")
+            else:
+                plans = explain_queries(conn, args.user_id)
+                for name, rows in plans.items():
+                    for row in rows:
+                        print(f"{name}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}")
+                problems = find_unindexed_queries(plans)
+                if problems:
+                    print(f"Queries not using an index: {', '.join(problems)}")
+                    raise SystemExit(1)
+                print("All checked queries use an index.")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# periodic.py
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """
+    Background thread that runs an application command every interval seconds.
+    command() returns the (count, message) pair the ToDoListApp maintenance commands do;
+    a failed pass is logged and the next one tries again.
+    """
+
+    def __init__(self, name: str, command, interval: float):
+        self.name = name
+        self.command = command
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def run_once(self) -> int:
+        """Runs the command now; returns its count."""
+        count, message = self.command()
+        logger.debug("%s: %s", self.name, message)
+        return count
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e: # Keep the thread alive; the next pass tries again
+                logger.error("%s: Pass failed: %s", self.name, e, exc_info=True)
+
+
+def run_command_once(command):
+    """Opens the configured storage, runs command(app) once and prints its message; for the command-line entry points."""
+    from commands import ToDoListApp
+    from log_config import configure_logging
+    from storage import open_storage
+
+    log_listener = configure_logging()
+    storage = None
+    try:
+        storage = open_storage()
+        app = ToDoListApp(storage)
+        app.setup_database()
+        _, message = command(app)
+        print(message)
+    finally:
+        if storage is not None:
+            storage.close()
+        log_listener.stop()
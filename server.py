@@ -0,0 +1,550 @@
+# server.py
+
+import argparse
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import date
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from dotenv import load_dotenv
+from archive import TaskArchiver
+from auth import SessionStore
+from commands import ToDoListApp
+from log_config import configure_logging
+from metrics import MetricsExporter
+from storage import keyset_cursor, open_storage
+from task_stats import TaskStatsReconciler
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+GZIP_MIN_BYTES = 1024 # Smaller bodies fit in a packet or two anyway; gzip would only add CPU time
+GZIP_LEVEL = 5 # Within a few percent of level 9's ratio on task JSON at a fraction of the CPU
+BUSY_MESSAGE = "Error: The server is busy; please retry."
+
+_TASK_PATH = re.compile(r"/tasks/(\d+)")
+
+
+class RequestError(Exception):
+    """A request the handler refuses before reaching ToDoListApp; carries the HTTP status and message."""
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def status_for(message: str, success: HTTPStatus = HTTPStatus.OK) -> HTTPStatus:
+    """Maps a ToDoListApp "Success:/Info:/Error:" message onto an HTTP status."""
+    if not message.startswith("Error"):
+        return success
+    if "busy" in message:
+        return HTTPStatus.SERVICE_UNAVAILABLE
+    if "Too many failed login attempts" in message:
+        return HTTPStatus.TOO_MANY_REQUESTS
+    if "Invalid username or password" in message:
+        return HTTPStatus.UNAUTHORIZED
+    if "already exists" in message:
+        return HTTPStatus.CONFLICT
+    if "database problem" in message or "unexpected" in message:
+        return HTTPStatus.INTERNAL_SERVER_ERROR
+    return HTTPStatus.BAD_REQUEST
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_json(payload) -> bytes:
+    return json.dumps(payload, default=_json_default, separators=(',', ':')).encode('utf-8')
+
+
+def encode_cursor(task, sort_key: str) -> str:
+    """Packs a keyset_cursor() into an opaque URL-safe token for the next/prev page links."""
+    return base64.urlsafe_b64encode(encode_json(keyset_cursor(task, sort_key))).decode('ascii')
+
+
+def decode_cursor(token: str, sort_key: str) -> tuple:
+    try:
+        value, task_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        if sort_key == 'due_date' and value is not None:
+            value = date.fromisoformat(value)
+    except (ValueError, TypeError, binascii.Error):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Error: Invalid page cursor.")
+    if not isinstance(task_id, int):
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Error: Invalid page cursor.")
+    return value, task_id
+
+
+class ToDoHTTPServer(ThreadingHTTPServer):
+    """
+    Serves ToDoListApp as a JSON API to many clients over one shared storage backend and
+    connection pool. Each connection gets a thread (connections are kept alive between
+    requests), at most max_connections are open at once, and at most max_inflight requests
+    run commands at a time; a request that cannot get a slot within queue_timeout is
+    answered 503 rather than queueing behind the pool.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, app: ToDoListApp, sessions: SessionStore = None, max_inflight: int = 16,
+                 max_connections: int = 256, queue_timeout: float = 5.0, idle_timeout: float = 15.0):
+        self.app = app
+        self.sessions = sessions if sessions is not None else SessionStore.from_env()
+        self.max_inflight = max_inflight
+        self.max_connections = max_connections
+        self.queue_timeout = queue_timeout
+        self.idle_timeout = idle_timeout # Seconds a kept-alive connection may sit idle before it is closed
+        self.request_slots = threading.BoundedSemaphore(max_inflight)
+        self._connection_slots = threading.BoundedSemaphore(max_connections)
+        super().__init__(address, ToDoRequestHandler)
+
+    @classmethod
+    def from_env(cls, app: ToDoListApp, host: str = None, port: int = None):
+        load_dotenv()
+        return cls(
+            (host or os.getenv('SERVER_HOST', '127.0.0.1'), port if port is not None else int(os.getenv('SERVER_PORT', '8080'))),
+            app,
+            # Requests beyond the pool size would only wait inside it, holding a thread each
+            max_inflight=int(os.getenv('SERVER_MAX_INFLIGHT') or os.getenv('DB_POOL_SIZE') or '5'),
+            max_connections=int(os.getenv('SERVER_MAX_CONNECTIONS', '256')),
+            queue_timeout=float(os.getenv('SERVER_QUEUE_TIMEOUT', '5')),
+            idle_timeout=float(os.getenv('SERVER_IDLE_TIMEOUT', '15')),
+        )
+
+    def process_request(self, request, client_address):
+        if not self._connection_slots.acquire(blocking=False):
+            logger.warning("Server: Refusing connection from %s; %s connections open.", client_address[0], self.max_connections)
+            try:
+                request.sendall(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nRetry-After: 1\r\nConnection: close\r\n\r\n")
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        super().process_request(request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._connection_slots.release()
+
+
+class ToDoRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes JSON requests to ToDoListApp. Command messages are passed through unchanged in
+    the "message" field and mapped onto HTTP statuses by status_for().
+    """
+    protocol_version = "HTTP/1.1" # Keep-alive; every response carries a Content-Length
+    server_version = "ToDoList/1.0"
+    # Headers and body go out in separate writes; with Nagle on, the body waits ~40ms for the delayed ACK
+    disable_nagle_algorithm = True
+
+    # (method, route) -> (handler name, requires a session)
+    ROUTES = {
+        ('GET', '/health'): ('_health', False),
+        ('GET', '/metrics'): ('_metrics', False),
+        ('POST', '/users'): ('_register', False),
+        ('POST', '/sessions'): ('_login', False),
+        ('DELETE', '/sessions'): ('_logout', True),
+        ('GET', '/tasks'): ('_list_tasks', True),
+        ('POST', '/tasks'): ('_add_tasks', True),
+        ('PATCH', '/tasks'): ('_update_tasks', True),
+        ('DELETE', '/tasks'): ('_delete_tasks', True),
+        ('GET', '/tasks/search'): ('_search_tasks', True),
+        ('GET', '/tasks/changes'): ('_task_changes', True),
+        ('GET', '/tasks/stats'): ('_task_stats', True),
+        ('GET', '/tasks/archived'): ('_archived_tasks', True),
+        ('PATCH', '/tasks/{id}'): ('_update_task', True),
+        ('DELETE', '/tasks/{id}'): ('_delete_task', True),
+    }
+    KNOWN_ROUTES = {route for _, route in ROUTES}
+
+    def setup(self):
+        self.timeout = self.server.idle_timeout
+        super().setup()
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def do_PUT(self):
+        self._dispatch('PUT') # No PUT routes; answered with a JSON 405 rather than the stock HTML 501
+
+    def log_message(self, format, *args):
+        logger.debug("HTTP: %s " + format, self.address_string(), *args)
+
+    # --- Plumbing ---
+    def _dispatch(self, method: str):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        match = _TASK_PATH.fullmatch(url.path)
+        route = '/tasks/{id}' if match else url.path.rstrip('/') or '/'
+        status = HTTPStatus.INTERNAL_SERVER_ERROR
+        try:
+            body = self._read_body() # Always drained, so the next request on this connection parses cleanly
+            handler_name, needs_session = self._resolve(method, route)
+            user_id = self._session_user() if needs_session else None
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+
+            if not self.server.request_slots.acquire(timeout=self.server.queue_timeout):
+                logger.warning("Server: No request slot free for %s %s within %.1fs.", method, route, self.server.queue_timeout)
+                raise RequestError(HTTPStatus.SERVICE_UNAVAILABLE, BUSY_MESSAGE)
+            try:
+                handler = getattr(self, handler_name)
+                status = handler(user_id=user_id, params=params, body=body,
+                                 task_id=int(match.group(1)) if match else None)
+            finally:
+                self.server.request_slots.release()
+        except RequestError as err:
+            status = err.status
+            headers = {'Retry-After': '1'} if status == HTTPStatus.SERVICE_UNAVAILABLE else {}
+            if status == HTTPStatus.UNAUTHORIZED:
+                headers['WWW-Authenticate'] = 'Bearer'
+            self._send_json(status, {'message': err.message}, headers=headers)
+        except (BrokenPipeError, ConnectionResetError) as err:
+            logger.debug("Server: Client went away during %s %s: %s", method, route, err)
+            self.close_connection = True
+        except Exception as err:
+            logger.critical("Server: Unhandled error for %s %s: %s", method, route, err, exc_info=True)
+            self._send_json(status, {'message': "Error: An unexpected server error occurred."})
+        finally:
+            self.server.app.metrics.observe('http_request_seconds', time.perf_counter() - started,
+                                            method=method, route=route if route in self.KNOWN_ROUTES else 'other',
+                                            status=int(status))
+
+    def _resolve(self, method: str, route: str) -> tuple[str, bool]:
+        entry = self.ROUTES.get((method, route))
+        if entry is None:
+            if route in self.KNOWN_ROUTES:
+                raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"Error: {method} is not supported on {route}.")
+            raise RequestError(HTTPStatus.NOT_FOUND, "Error: No such endpoint.")
+        return entry
+
+    def _read_body(self):
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            self.close_connection = True # The unread chunks would be parsed as the next request
+            raise RequestError(HTTPStatus.LENGTH_REQUIRED, "Error: Send request bodies with a Content-Length.")
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self.close_connection = True
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Error: Invalid Content-Length.")
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Error: Request bodies are limited to {MAX_BODY_BYTES} bytes.")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Error: The request body is not valid JSON.")
+        if not isinstance(body, dict):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Error: The request body must be a JSON object.")
+        return body
+
+    def _bearer_token(self) -> str | None:
+        scheme, _, token = self.headers.get('Authorization', '').partition(' ')
+        return token.strip() if scheme.lower() == 'bearer' and token.strip() else None
+
+    def _session_user(self) -> int:
+        token = self._bearer_token()
+        user_id = self.server.sessions.user_for(token) if token else None
+        if user_id is None:
+            raise RequestError(HTTPStatus.UNAUTHORIZED, "Error: Log in to get a session token.")
+        return user_id
+
+    def _send(self, status: HTTPStatus, body: bytes, content_type: str = 'application/json', etag: str = None,
+              headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if etag is not None:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'private, no-cache') # Clients revalidate with If-None-Match
+        if len(body) >= GZIP_MIN_BYTES:
+            self.send_header('Vary', 'Accept-Encoding')
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+                self.send_header('Content-Encoding', 'gzip')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_json(self, status: HTTPStatus, payload: dict, headers: dict = None) -> HTTPStatus:
+        self._send(status, encode_json(payload), headers=headers)
+        return status
+
+    def _send_list(self, status: HTTPStatus, payload: dict) -> HTTPStatus:
+        """Sends a list response with an ETag, or a bodiless 304 if the client's copy is still current."""
+        body = encode_json(payload)
+        # Weak, since the gzipped and plain forms of the body share it
+        etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        if status == HTTPStatus.OK and etag in self._if_none_match():
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'private, no-cache')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return HTTPStatus.NOT_MODIFIED
+        self._send(status, body, etag=etag if status == HTTPStatus.OK else None)
+        return status
+
+    def _if_none_match(self) -> set[str]:
+        header = self.headers.get('If-None-Match', '')
+        return {tag if tag.startswith('W/') else f"W/{tag}" for tag in map(str.strip, header.split(',')) if tag}
+
+    # --- Parameter helpers ---
+    @staticmethod
+    def _int(value, name: str, required: bool = False) -> int | None:
+        if value is None or value == '':
+            if required:
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Error: '{name}' is required.")
+            return None
+        if isinstance(value, bool):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Error: '{name}' must be an integer.")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Error: '{name}' must be an integer.")
+
+    @staticmethod
+    def _str(body: dict, name: str) -> str | None:
+        value = body.get(name)
+        if value is not None and not isinstance(value, str):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Error: '{name}' must be a string.")
+        return value
+
+    @classmethod
+    def _ids(cls, values, name: str = 'ids') -> list[int]:
+        if not isinstance(values, list) or not values:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Error: '{name}' must be a non-empty list of task IDs.")
+        return [cls._int(value, name, required=True) for value in values]
+
+    @staticmethod
+    def _task_json(task) -> dict | None:
+        return task._asdict() if task is not None else None
+
+    # --- Endpoints ---
+    def _health(self, **_):
+        return self._send_json(HTTPStatus.OK, {'status': 'ok', 'sessions': len(self.server.sessions)})
+
+    def _metrics(self, params, **_):
+        if params.get('format') == 'prometheus':
+            self._send(HTTPStatus.OK, self.server.app.metrics.to_prometheus().encode('utf-8'),
+                       content_type='text/plain; version=0.0.4')
+            return HTTPStatus.OK
+        return self._send_json(HTTPStatus.OK, self.server.app.get_metrics())
+
+    def _register(self, body, **_):
+        message = self.server.app.add_user(self._str(body, 'username'), self._str(body, 'password'))
+        return self._send_json(status_for(message, HTTPStatus.CREATED), {'message': message})
+
+    def _login(self, body, **_):
+        user_id, message = self.server.app.authenticate_user(self._str(body, 'username'), self._str(body, 'password'))
+        if user_id is None:
+            return self._send_json(status_for(message), {'message': message})
+        token = self.server.sessions.create(user_id)
+        return self._send_json(HTTPStatus.CREATED, {'token': token, 'user_id': user_id, 'message': message})
+
+    def _logout(self, **_):
+        self.server.sessions.revoke(self._bearer_token())
+        return self._send_json(HTTPStatus.OK, {'message': "Success: Logged out."})
+
+    def _list_tasks(self, user_id, params, **_):
+        """
+        Without parameters returns every task. Filters (status, due_from, due_to, priority_min,
+        priority_max), sort, desc and limit are those of build_task_query; with a limit the
+        response is one keyset page, and next_cursor/prev_cursor go in the after/before parameters.
+        """
+        filter_names = ('status', 'due_from', 'due_to', 'priority_min', 'priority_max', 'sort', 'desc', 'limit')
+        if not any(name in params for name in filter_names):
+            tasks, message = self.server.app.get_user_tasks(user_id)
+            return self._send_list(status_for(message), {'tasks': [task._asdict() for task in tasks or ()], 'message': message})
+
+        query, message = self.server.app.build_task_query(
+            status=params.get('status'), due_from=params.get('due_from'), due_to=params.get('due_to'),
+            priority_min=params.get('priority_min'), priority_max=params.get('priority_max'),
+            sort_key=params.get('sort', 'id'), descending=params.get('desc', '').lower() in ('1', 'true', 'yes'),
+            limit=self._int(params.get('limit'), 'limit'),
+        )
+        if query is None:
+            return self._send_json(status_for(message), {'message': message})
+        after = decode_cursor(params['after'], query.sort_key) if params.get('after') else None
+        before = decode_cursor(params['before'], query.sort_key) if params.get('before') else None
+        tasks, message = self.server.app.get_user_tasks(user_id, query, after=after, before=before)
+        if tasks is None:
+            return self._send_json(status_for(message), {'message': message})
+
+        payload = {'tasks': [task._asdict() for task in tasks], 'message': message}
+        if query.limit is not None and tasks:
+            if len(tasks) == query.limit or before is not None:
+                payload['next_cursor'] = encode_cursor(tasks[-1], query.sort_key)
+            if after is not None or (before is not None and len(tasks) == query.limit):
+                payload['prev_cursor'] = encode_cursor(tasks[0], query.sort_key)
+        return self._send_list(HTTPStatus.OK, payload)
+
+    def _archived_tasks(self, user_id, params, **_):
+        """Archived tasks, newest first, limit per page; pass next_cursor as after for the next page."""
+        limit = self._int(params.get('limit'), 'limit') or self.server.app.ARCHIVE_PAGE_SIZE
+        query, message = self.server.app.build_task_query(descending=True, limit=limit)
+        if query is None:
+            return self._send_json(status_for(message), {'message': message})
+        after = decode_cursor(params['after'], query.sort_key) if params.get('after') else None
+        tasks, message = self.server.app.get_archived_tasks(user_id, query, after=after)
+        if tasks is None:
+            return self._send_json(status_for(message), {'message': message})
+
+        payload = {'tasks': [task._asdict() for task in tasks], 'message': message}
+        if len(tasks) == query.limit:
+            payload['next_cursor'] = encode_cursor(tasks[-1], query.sort_key)
+        return self._send_list(HTTPStatus.OK, payload)
+
+    def _search_tasks(self, user_id, params, **_):
+        tasks, message = self.server.app.search_tasks(
+            user_id, params.get('q', ''), limit=self._int(params.get('limit'), 'limit'),
+            prefix=params.get('prefix', '1').lower() not in ('0', 'false', 'no'),
+        )
+        if tasks is None:
+            return self._send_json(status_for(message), {'message': message})
+        return self._send_list(HTTPStatus.OK, {'tasks': [task._asdict() for task in tasks], 'message': message})
+
+    def _task_changes(self, user_id, params, **_):
+        """Delta sync: pass the returned watermark as since on the next call (omit it the first time)."""
+        changes, message = self.server.app.get_changes_since(user_id, params.get('since'))
+        if changes is None:
+            return self._send_json(status_for(message), {'message': message})
+        return self._send_json(HTTPStatus.OK, {
+            'tasks': [task._asdict() for task in changes.tasks], 'deleted_ids': changes.deleted_ids,
+            'watermark': changes.watermark, 'full': changes.full, 'message': message,
+        })
+
+    def _task_stats(self, user_id, **_):
+        stats, message = self.server.app.get_task_stats(user_id)
+        if stats is None:
+            return self._send_json(status_for(message), {'message': message})
+        return self._send_json(HTTPStatus.OK, {'stats': stats._asdict(), 'message': message})
+
+    def _add_tasks(self, user_id, body, **_):
+        """Adds one task given as the body, or many given as {"tasks": [...]} in one transaction."""
+        if 'tasks' not in body:
+            task, message = self.server.app.add_task(user_id, self._str(body, 'task'), self._str(body, 'due_date'),
+                                                     self._int(body.get('priority'), 'priority'))
+            return self._send_json(status_for(message, HTTPStatus.CREATED), {'task': self._task_json(task), 'message': message})
+
+        rows = body['tasks']
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Error: 'tasks' must be a list of task objects.")
+        for row in rows:
+            for name in ('task', 'due_date', 'task_status'):
+                self._str(row, name)
+            row['priority'] = self._int(row.get('priority'), 'priority')
+        results, message = self.server.app.add_tasks(user_id, rows)
+        return self._send_json(status_for(message, HTTPStatus.CREATED), {
+            'results': [{'task': self._task_json(task), 'message': row_message} for task, row_message in results],
+            'message': message,
+        })
+
+    def _update_fields(self, body: dict) -> dict:
+        return {
+            'task_name': self._str(body, 'task'),
+            'due_date': self._str(body, 'due_date'),
+            'priority': self._int(body.get('priority'), 'priority'),
+            'task_status': self._str(body, 'task_status'),
+        }
+
+    def _update_task(self, user_id, body, task_id, **_):
+        task, message = self.server.app.update_task(user_id, task_id, **self._update_fields(body))
+        status = HTTPStatus.NOT_FOUND if task is None and message.startswith("Info") else status_for(message)
+        return self._send_json(status, {'task': self._task_json(task), 'message': message})
+
+    def _delete_task(self, user_id, task_id, **_):
+        message = self.server.app.delete_task(user_id, task_id)
+        status = HTTPStatus.NOT_FOUND if message.startswith("Info") else status_for(message)
+        return self._send_json(status, {'message': message})
+
+    def _update_tasks(self, user_id, body, **_):
+        results, message = self.server.app.update_tasks(user_id, self._ids(body.get('ids')), **self._update_fields(body))
+        return self._send_json(status_for(message), {
+            'tasks': {str(task_id): self._task_json(task) for task_id, task in results.items()},
+            'message': message,
+        })
+
+    def _delete_tasks(self, user_id, params, **_):
+        ids = [value for value in params.get('ids', '').split(',') if value]
+        results, message = self.server.app.delete_tasks(user_id, self._ids(ids))
+        return self._send_json(status_for(message), {
+            'deleted': {str(task_id): deleted for task_id, deleted in results.items()},
+            'message': message,
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the to-do list as a JSON API.")
+    parser.add_argument("--host", help="Bind address (default SERVER_HOST or 127.0.0.1).")
+    parser.add_argument("--port", type=int, help="Port (default SERVER_PORT or 8080).")
+    args = parser.parse_args()
+
+    log_listener = configure_logging()
+    storage = None
+    exporter = None
+    reconciler = None
+    archiver = None
+    try:
+        exporter = MetricsExporter.from_env()
+        if exporter is not None:
+            exporter.start()
+        storage = open_storage() # One backend, and one connection pool, for every client
+        app = ToDoListApp(storage)
+        app.setup_database()
+        reconciler = TaskStatsReconciler.from_env(app) # Hourly drift check unless TASK_STATS_RECONCILE_SECONDS=0
+        if reconciler is not None:
+            reconciler.start()
+        archiver = TaskArchiver.from_env(app) # Moves old completed tasks to tasks_archive when ARCHIVE_AFTER_DAYS is set
+        if archiver is not None:
+            archiver.start()
+        server = ToDoHTTPServer.from_env(app, args.host, args.port)
+        host, port = server.server_address[:2]
+        print(f"Serving on http://{host}:{port} ({server.max_inflight} requests in flight at most). Press Ctrl+C to stop.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    finally:
+        if archiver is not None:
+            archiver.stop()
+        if reconciler is not None:
+            reconciler.stop()
+        if exporter is not None:
+            exporter.stop()
+        if storage is not None:
+            storage.close()
+        log_listener.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# snapshot.py
+
+import logging
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from dotenv import load_dotenv
+from storage import TaskBatch
+
+logger = logging.getLogger(__name__)
+
+
+class TaskSnapshotStore:
+    """
+    Per-user binary snapshots of the first page of the task list, so the GUI can paint it
+    right after login instead of waiting for the database. A snapshot is a small header
+    followed by TaskBatch's columns as raw little-endian arrays and the task texts as one
+    UTF-8 blob, so loading one is a single read and a few array copies, with no parsing per row.
+    Snapshots are a cache: a missing, unreadable or outdated file is simply ignored.
+    """
+    MAGIC = b'TDS1'
+    _HEADER = struct.Struct('<4sdI') # magic, saved_at (epoch seconds), row count
+
+    def __init__(self, directory: str, max_rows: int = 100):
+        self.directory = directory
+        self.max_rows = max_rows
+
+    @classmethod
+    def from_env(cls):
+        """Returns a store under TASK_SNAPSHOT_DIR, or None when it is not set."""
+        load_dotenv()
+        directory = os.getenv('TASK_SNAPSHOT_DIR')
+        if not directory:
+            return None
+        return cls(os.path.expanduser(directory), max_rows=int(os.getenv('TASK_SNAPSHOT_MAX_ROWS', '100')))
+
+    def path_for(self, user_id: int) -> str:
+        return os.path.join(self.directory, f"tasks-{user_id}.snap")
+
+    def save(self, user_id: int, tasks) -> int:
+        """Writes up to max_rows of tasks atomically; returns the number of rows saved (0 on failure)."""
+        batch = TaskBatch(task for _, task in zip(range(self.max_rows), tasks))
+        texts = [task.encode('utf-8') for task in batch.tasks]
+        columns = [batch.ids, batch.due_dates, batch.priorities, array('I', map(len, texts))]
+        if sys.byteorder != 'little':
+            for column in columns:
+                column.byteswap()
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            # Write to a private temporary file, then rename: a reader never sees a half-written snapshot
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".snap-")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(self._HEADER.pack(self.MAGIC, time.time(), len(batch)))
+                    f.write(batch.statuses)
+                    for column in columns:
+                        f.write(column.tobytes())
+                    f.write(b"".join(texts))
+                os.replace(tmp_path, self.path_for(user_id))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning("Snapshot: Could not save the task snapshot for user_id %s: %s", user_id, e)
+            return 0
+        logger.debug("Snapshot: Saved %s tasks for user_id %s.", len(batch), user_id)
+        return len(batch)
+
+    def load(self, user_id: int) -> TaskBatch | None:
+        """Returns the saved tasks, or None if there is no usable snapshot."""
+        path = self.path_for(user_id)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning("Snapshot: Could not read %s: %s", path, e)
+            return None
+
+        try:
+            magic, saved_at, count = self._HEADER.unpack_from(data)
+            if magic != self.MAGIC:
+                raise ValueError("not a task snapshot")
+            offset = self._HEADER.size
+            batch = TaskBatch()
+            batch.statuses = bytearray(data[offset:offset + count])
+            offset += count
+            columns = []
+            for typecode in ('q', 'i', 'i', 'I'):
+                column = array(typecode)
+                size = column.itemsize * count
+                column.frombytes(data[offset:offset + size])
+                if len(column) != count:
+                    raise ValueError("truncated")
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                columns.append(column)
+                offset += size
+            batch.ids, batch.due_dates, batch.priorities, lengths = columns
+            blob = memoryview(data)
+            for length in lengths:
+                batch.tasks.append(str(blob[offset:offset + length], 'utf-8'))
+                offset += length
+            if offset != len(data) or max(batch.statuses, default=0) >= len(TaskBatch.STATUSES):
+                raise ValueError("corrupt")
+        except (struct.error, ValueError) as e: # UnicodeDecodeError is a ValueError
+            logger.warning("Snapshot: Ignoring unreadable snapshot %s: %s", path, e)
+            return None
+        logger.debug("Snapshot: Loaded %s tasks for user_id %s, saved %.0fs ago.", count, user_id, time.time() - saved_at)
+        return batch
+
@@ -0,0 +1,353 @@
+# sqlite_database.py
+
+import logging
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+import migrations
+from storage import TaskQuery, TaskRecord, TaskStorage, fetch_task_records, update_statement
+logger = logging.getLogger(__name__)
+
+# DATE columns round-trip as datetime.date, as they do with the MySQL driver
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+
+
+def _dict_row(cursor, row) -> dict:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+_READ_STATEMENTS = ('SELECT', 'PRAGMA', 'EXPLAIN')
+
+
+class _TransactionCursor:
+    """
+    Cursor proxy that opens the connection's transaction on its first statement: BEGIN
+    IMMEDIATE when that statement writes, plain (deferred) BEGIN when it reads.
+    A deferred transaction that later writes must upgrade from its read snapshot, and under
+    concurrent writers that upgrade fails at once with "database is locked" instead of
+    waiting out the busy timeout; taking the write lock up front makes writers queue.
+    """
+    __slots__ = ('_cursor', '_con')
+
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cursor = cursor
+        self._con = cursor.connection
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _begin(self, writes: bool):
+        if not self._con.in_transaction:
+            self._con.execute("BEGIN IMMEDIATE" if writes else "BEGIN")
+
+    def execute(self, sql, params=()):
+        self._begin(not sql.lstrip()[:7].upper().startswith(_READ_STATEMENTS))
+        return self._cursor.execute(sql, params)
+
+    def executemany(self, sql, seq_params):
+        self._begin(True)
+        return self._cursor.executemany(sql, seq_params)
+
+
+class SQLiteDatabase(TaskStorage):
+    """
+    Embedded storage backend (DB_BACKEND=sqlite): a single database file, no server.
+    Each thread keeps one open connection for its lifetime, so there is no connect cost
+    per operation; the file runs in WAL mode so readers never block the writer.
+    """
+    PLACEHOLDER = '?'
+    BACKEND_NAME = 'sqlite'
+    EXPLAIN_PREFIX = "EXPLAIN QUERY PLAN"
+    SQL_NOW = "SELECT strftime('%Y-%m-%d %H:%M:%f', 'now') AS now" # UTC, in ms, as the migration's triggers stamp rows
+    DERIVED_BY_TRIGGERS = True # See the version 5 and 6 migrations
+    BULK_CHUNK_SIZE = 500 # Stays under SQLITE_MAX_VARIABLE_NUMBER on older builds (999)
+    Error = sqlite3.Error
+    IntegrityError = sqlite3.IntegrityError
+    DataError = sqlite3.DataError
+    ProgrammingError = sqlite3.ProgrammingError
+
+    SQL_SEARCH_TASKS = (
+        "SELECT t.id, t.task, t.task_status, t.due_date, t.priority " # TASK_COLUMNS; task alone would be ambiguous
+        "FROM tasks_fts JOIN tasks AS t ON t.id = tasks_fts.rowid "
+        "WHERE tasks_fts MATCH ? AND t.user_id = ? ORDER BY tasks_fts.rank, t.id DESC LIMIT ?"
+    )
+
+    def __init__(self, path: str = 'todo.db', busy_timeout: float = 5.0, statement_cache_size: int = 256):
+        self.path = path
+        self.busy_timeout = busy_timeout # Seconds a writer waits for another writer's lock
+        self.statement_cache_size = statement_cache_size # Compiled statements kept per connection
+        self._local = threading.local()
+        self._connections = [] # Every per-thread connection, so close() can reach them all
+        self._connections_lock = threading.Lock()
+        # Open the first connection now so a bad path fails at startup
+        self._connection()
+        logger.info("SQLite database opened at '%s'.", path)
+
+    def _connection(self) -> sqlite3.Connection:
+        con = getattr(self._local, 'con', None)
+        if con is None:
+            con = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                isolation_level=None, # Transactions are opened explicitly by _TransactionCursor
+                check_same_thread=False, # Only this thread uses it, but close() may run elsewhere
+                cached_statements=self.statement_cache_size,
+            )
+            con.row_factory = _dict_row
+            con.execute("PRAGMA journal_mode = WAL")
+            con.execute("PRAGMA synchronous = NORMAL") # Durable across app crashes; WAL makes this safe
+            con.execute("PRAGMA foreign_keys = ON")
+            self._local.con = con
+            with self._connections_lock:
+                self._connections.append(con)
+        return con
+
+    @property
+    def con(self):
+        return getattr(self._local, 'con', None)
+
+    @property
+    def cursor(self):
+        return getattr(self._local, 'cursor', None)
+
+    @property
+    def tuple_cursor(self):
+        return getattr(self._local, 'tuple_cursor', None)
+
+    def __enter__(self):
+        started = time.perf_counter()
+        con = self._connection() # The transaction itself begins with the first statement
+        self._local.cursor = self._instrument(_TransactionCursor(con.cursor()))
+        tuple_cursor = con.cursor()
+        tuple_cursor.row_factory = None # Plain tuples for task rows, turned into TaskRecords
+        self._local.tuple_cursor = self._instrument(_TransactionCursor(tuple_cursor))
+        self.metrics.observe('db_connection_acquire_seconds', time.perf_counter() - started, backend=self.BACKEND_NAME)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        con, cursor, tuple_cursor = self.con, self.cursor, self.tuple_cursor
+        self._local.cursor = self._local.tuple_cursor = None
+        started = time.perf_counter()
+        try:
+            if exc_type:
+                con.rollback()
+                logger.warning("Database transaction rolled back due to error: %s", exc_val)
+            else:
+                con.commit()
+                logger.debug("Database transaction committed successfully.")
+            self._observe_commit(exc_type, started)
+        except sqlite3.Error as err:
+            logger.error("Error during commit/rollback: %s", err, exc_info=True)
+            if con.in_transaction:
+                con.rollback()
+            if not exc_type:
+                raise # A write that never committed must not be reported as a success
+        finally:
+            for open_cursor in (cursor, tuple_cursor):
+                if open_cursor:
+                    open_cursor.close()
+        return False
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for con in connections:
+            con.close()
+        self._local.con = None
+        logger.info("SQLite connections closed.")
+
+    def commit(self):
+        started = time.perf_counter()
+        self.con.commit()
+        self._observe_commit(None, started) # The next statement opens the next transaction
+
+    def migrate(self) -> list[int]:
+        return migrations.apply_sqlite_migrations(self)
+
+    def add_user(self, name: str, password_hash: str) -> int:
+        try:
+            self.cursor.execute("INSERT INTO users (name, password) VALUES (?, ?)", (name, password_hash))
+            user_id = self.cursor.lastrowid
+            logger.debug("User '%s' added successfully with ID: %s.", name, user_id)
+            return user_id
+        except sqlite3.IntegrityError as err:
+            logger.error("Error adding user '%s': Duplicate name. %s", name, err, exc_info=True)
+            raise ValueError(f"Username '{name}' already exists.")
+
+    def get_user(self, name: str) -> dict | None:
+        self.cursor.execute("SELECT id, password FROM users WHERE name = ?", (name,))
+        result = self.cursor.fetchone()
+        logger.debug("User '%s' %s.", name, 'found' if result else 'not found')
+        return result
+
+    def update_user_password(self, user_id: int, password_hash: str) -> bool:
+        self.cursor.execute("UPDATE users SET password = ? WHERE id = ?", (password_hash, user_id))
+        return self.cursor.rowcount > 0
+
+    def add_task(self, user_id: int, task: str, due_date: date = None, priority: int = None) -> int:
+        if not task or not task.strip():
+            logger.warning("Attempted to add an empty task for user_id: %s", user_id)
+            raise ValueError("Task description cannot be empty.")
+
+        try:
+            self.cursor.execute(
+                "INSERT INTO tasks (user_id, task, due_date, priority) VALUES (?, ?, ?, ?)",
+                (user_id, task, due_date, priority)
+            )
+        except sqlite3.IntegrityError as err:
+            logger.error("Error adding task for user_id %s: User ID does not exist or invalid data. %s", user_id, err, exc_info=True)
+            raise ValueError(f"User with ID {user_id} does not exist or task data is invalid.")
+        task_id = self.cursor.lastrowid
+        logger.debug("Task '%s' added successfully for user_id %s with ID: %s.", task, user_id, task_id)
+        return task_id
+
+    def get_task(self, user_id: int, task_id: int) -> TaskRecord | None:
+        self.tuple_cursor.execute(f"SELECT {self.TASK_COLUMNS} FROM tasks WHERE user_id = ? AND id = ?", (user_id, task_id))
+        row = self.tuple_cursor.fetchone()
+        return TaskRecord._make(row) if row else None
+
+    def get_tasks(self, user_id: int) -> list[TaskRecord]:
+        self.tuple_cursor.execute(f"SELECT {self.TASK_COLUMNS} FROM tasks WHERE user_id = ? ORDER BY id ASC", (user_id,))
+        tasks = fetch_task_records(self.tuple_cursor)
+        logger.debug("Database: Retrieved %s tasks for user_id: %s.", len(tasks), user_id)
+        return tasks
+
+    def iter_tasks(self, user_id: int, batch_size: int = 1000):
+        """Streams a user's tasks batch_size rows at a time; SQLite steps the statement lazily."""
+        cursor = self.con.cursor()
+        cursor.row_factory = None
+        stream = _TransactionCursor(cursor)
+        try:
+            stream.execute(f"SELECT {self.TASK_COLUMNS} FROM tasks WHERE user_id = ? ORDER BY id ASC", (user_id,))
+            while True:
+                rows = stream.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from map(TaskRecord._make, rows)
+        finally:
+            stream.close()
+
+    def query_tasks(self, user_id: int, query: TaskQuery, after: tuple = None, before: tuple = None) -> list[TaskRecord]:
+        """Retrieves a user's tasks matching query; see TaskStorage._compile_task_query for paging."""
+        sql, params, backwards = self._compile_task_query(user_id, query, after, before)
+        self.tuple_cursor.execute(sql, params)
+        tasks = fetch_task_records(self.tuple_cursor)
+        if backwards:
+            tasks.reverse()
+        logger.debug("Database: Query returned %s tasks for user_id: %s.", len(tasks), user_id)
+        return tasks
+
+    def search_tasks(self, user_id: int, terms: tuple[str, ...], limit: int = 50,
+                     prefix: bool = True) -> list[TaskRecord]:
+        """Searches task text through the FTS5 index; every term is required, ranked by bm25."""
+        if not terms:
+            return []
+        # Quoted terms are plain strings to FTS5, so no term can be read as an operator
+        match = " ".join(f'"{term}"*' if prefix else f'"{term}"' for term in terms)
+        self.tuple_cursor.execute(self.SQL_SEARCH_TASKS, (match, user_id, limit))
+        tasks = fetch_task_records(self.tuple_cursor)
+        logger.debug("Database: Search %r matched %s tasks for user_id: %s.", match, len(tasks), user_id)
+        return tasks
+
+    def get_tasks_fingerprint(self, user_id: int) -> tuple:
+        self.cursor.execute(
+            "SELECT COUNT(*) AS row_count, MAX(id) AS max_id, MAX(updated_at) AS updated_at FROM tasks WHERE user_id = ?",
+            (user_id,)
+        )
+        row = self.cursor.fetchone()
+        return (row['row_count'], row['max_id'], row['updated_at'])
+
+    def update_task(self, user_id: int, task_id: int, task_name: str = None, due_date: date = None,
+                    priority: int = None, task_status: str = None) -> bool:
+        columns, values = self._changed_columns(task_name, due_date, priority, task_status)
+        if not columns:
+            logger.debug("DB: No fields to update for task ID %s (user_id: %s).", task_id, user_id)
+            return False
+
+        try:
+            # Stable text per column combination, so sqlite3's statement cache reuses the compiled UPDATE
+            self.cursor.execute(update_statement(columns, self.PLACEHOLDER), (*values, task_id, user_id))
+        except sqlite3.IntegrityError as err:
+            logger.error("DB: Error updating task %s for user %s: %s", task_id, user_id, err, exc_info=True)
+            raise
+        return self.cursor.rowcount > 0
+
+    def delete_task(self, user_id: int, task_id: int) -> bool:
+        self.cursor.execute("DELETE FROM tasks WHERE user_id = ? AND id = ?", (user_id, task_id))
+        deleted = self.cursor.rowcount > 0
+        logger.debug("Database: Task ID %s %s for user_id %s.", task_id, 'deleted' if deleted else 'not found', user_id)
+        return deleted
+
+    # --- Bulk operations ---
+    # SQLite serializes writers, so the rows are not locked up front as in the MySQL backend;
+    # UPDATE/DELETE ... RETURNING reports which ids the user actually owned in the same statement.
+    def add_tasks(self, user_id: int, rows: list[tuple], return_records: bool = True) -> list[TaskRecord]:
+        """Inserts many (task, due_date, priority, task_status) rows; a None status means 'pending'."""
+        sql = "INSERT INTO tasks (user_id, task, due_date, priority, task_status) VALUES (?, ?, ?, ?, ?)"
+        params = [(user_id, task, due_date, priority, task_status or 'pending')
+                  for task, due_date, priority, task_status in rows]
+        inserted = []
+        try:
+            if not return_records:
+                self.cursor.executemany(sql, params)
+            else:
+                # executemany does not report generated ids; in-process inserts are cheap enough one by one
+                for values in params:
+                    self.cursor.execute(sql, values)
+                    _, task, due_date, priority, task_status = values
+                    inserted.append(TaskRecord(self.cursor.lastrowid, task, task_status, due_date, priority))
+        except sqlite3.IntegrityError as err:
+            logger.error("Database: Bulk insert failed for user_id %s: %s", user_id, err, exc_info=True)
+            raise ValueError(f"User with ID {user_id} does not exist or task data is invalid.")
+        logger.debug("Database: Bulk-inserted %s tasks for user_id %s.", len(rows), user_id)
+        return inserted
+
+    def update_tasks(self, user_id: int, task_ids: list[int], task_name: str = None, due_date: date = None,
+                     priority: int = None, task_status: str = None) -> dict[int, TaskRecord | None]:
+        updates, values = self._update_assignments(task_name, due_date, priority, task_status)
+        if not updates:
+            raise ValueError("No fields to update.")
+
+        records = {}
+        for start in range(0, len(task_ids), self.BULK_CHUNK_SIZE):
+            chunk = task_ids[start:start + self.BULK_CHUNK_SIZE]
+            self.tuple_cursor.execute(
+                f"UPDATE tasks SET {', '.join(updates)} WHERE user_id = ? AND id IN ({self._in_list(len(chunk))}) "
+                f"RETURNING {self.TASK_COLUMNS}",
+                (*values, user_id, *chunk)
+            )
+            records.update((row[0], TaskRecord._make(row)) for row in self.tuple_cursor.fetchall())
+        logger.debug("Database: Bulk-updated %s of %s tasks for user_id %s.", len(records), len(task_ids), user_id)
+        return {task_id: records.get(task_id) for task_id in task_ids}
+
+    def delete_tasks(self, user_id: int, task_ids: list[int]) -> dict[int, bool]:
+        deleted = set()
+        for start in range(0, len(task_ids), self.BULK_CHUNK_SIZE):
+            chunk = task_ids[start:start + self.BULK_CHUNK_SIZE]
+            self.cursor.execute(
+                f"DELETE FROM tasks WHERE user_id = ? AND id IN ({self._in_list(len(chunk))}) RETURNING id",
+                (user_id, *chunk)
+            )
+            deleted.update(row['id'] for row in self.cursor.fetchall())
+        logger.debug("Database: Bulk-deleted %s of %s tasks for user_id %s.", len(deleted), len(task_ids), user_id)
+        return {task_id: task_id in deleted for task_id in task_ids}
+
+    def archive_completed_tasks(self, user_id: int, before: datetime, limit: int) -> int:
+        # Copying first takes the write lock, so the rows cannot change before they are deleted;
+        # the delete triggers log the deletions and take the rows out of the task counts
+        self.cursor.execute(
+            "INSERT INTO tasks_archive (id, user_id, task, task_status, due_date, priority, created_at, updated_at) "
+            "SELECT id, user_id, task, task_status, due_date, priority, created_at, updated_at FROM tasks "
+            "WHERE user_id = ? AND updated_at < ? AND task_status = 'completed' ORDER BY updated_at ASC LIMIT ? "
+            "RETURNING id",
+            (user_id, before.strftime(self.CHANGE_TIME_FORMAT), limit)
+        )
+        task_ids = [row['id'] for row in self.cursor.fetchall()]
+        if task_ids:
+            self.cursor.execute(f"DELETE FROM tasks WHERE user_id = ? AND id IN ({self._in_list(len(task_ids))})",
+                                (user_id, *task_ids))
+        logger.debug("Database: Archived %s completed tasks for user_id %s.", len(task_ids), user_id)
+        return len(task_ids)
@@ -0,0 +1,570 @@
+# storage.py
+
+import abc
+import contextlib
+import functools
+import logging
+import os
+import re
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import NamedTuple
+from dotenv import load_dotenv
+from metrics import REGISTRY, InstrumentedCursor
+logger = logging.getLogger(__name__)
+
+
+class TaskRecord(NamedTuple):
+    """
+    One task row, in TASK_COLUMNS order. Backends build it straight from tuple-cursor rows;
+    as a tuple subclass it has no per-instance dict (80 bytes against 184 for the dict a
+    dictionary cursor builds), and it is immutable, so cached rows can be shared safely.
+    """
+    id: int
+    task: str
+    task_status: str | None
+    due_date: date | None
+    priority: int | None
+
+
+def fetch_task_records(cursor, batch_size: int = 1000) -> list[TaskRecord]:
+    """
+    Reads the rest of a tuple cursor's TASK_COLUMNS rows as TaskRecords, batch_size rows at
+    a time, so only one batch of raw driver tuples is alive next to the records.
+    """
+    records = []
+    while rows := cursor.fetchmany(batch_size):
+        records.extend(map(TaskRecord._make, rows))
+    return records
+
+
+class TaskBatch:
+    """
+    Columnar, array-backed form of a task list for big result sets: ids, due dates and
+    priorities are packed into typed arrays and statuses into a bytearray, so each row costs
+    its text plus 13 bytes. Indexing or iterating rebuilds TaskRecords on demand.
+    """
+    __slots__ = ('ids', 'tasks', 'statuses', 'due_dates', 'priorities')
+    STATUSES = ('pending', 'completed', None)
+    _STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+    NO_DATE = 0 # date.toordinal() is never below 1
+    NO_PRIORITY = -2**31
+
+    def __init__(self, records=()):
+        self.ids = array('q')
+        self.tasks = []
+        self.statuses = bytearray()
+        self.due_dates = array('i') # Proleptic Gregorian ordinals
+        self.priorities = array('i')
+        self.extend(records)
+
+    def append(self, record: TaskRecord):
+        task_id, task, task_status, due_date, priority = record
+        self.ids.append(task_id)
+        self.tasks.append(task)
+        self.statuses.append(self._STATUS_CODES[task_status])
+        self.due_dates.append(due_date.toordinal() if due_date is not None else self.NO_DATE)
+        self.priorities.append(priority if priority is not None else self.NO_PRIORITY)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> TaskRecord:
+        due_date, priority = self.due_dates[index], self.priorities[index]
+        return TaskRecord(
+            self.ids[index],
+            self.tasks[index],
+            self.STATUSES[self.statuses[index]],
+            date.fromordinal(due_date) if due_date != self.NO_DATE else None,
+            priority if priority != self.NO_PRIORITY else None,
+        )
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self.ids)))
+
+
+@dataclass(frozen=True)
+class TaskQuery:
+    """
+    Server-side filter and sort spec for a user's tasks.
+    Storage backends compile it into one parameterized SELECT that the
+    (user_id, ...) composite indexes can serve. None means "no constraint".
+    """
+    status: str | None = None # 'pending' or 'completed'
+    due_from: date | None = None # Inclusive; tasks without a due date are excluded by either bound
+    due_to: date | None = None
+    priority_min: int | None = None # Inclusive; tasks without a priority are excluded by either bound
+    priority_max: int | None = None
+    sort_key: str = 'id'
+    descending: bool = False
+    limit: int | None = None
+
+    def conditions(self, placeholder: str = '%s') -> tuple[list[str], list]:
+        """Returns the WHERE fragments and their parameters for the filters."""
+        p = placeholder
+        conditions, params = [], []
+        if self.status is not None:
+            conditions.append(f"task_status = {p}")
+            params.append(self.status)
+        if self.due_from is not None:
+            conditions.append(f"due_date >= {p}")
+            params.append(self.due_from)
+        if self.due_to is not None:
+            conditions.append(f"due_date <= {p}")
+            params.append(self.due_to)
+        if self.priority_min is not None:
+            conditions.append(f"priority >= {p}")
+            params.append(self.priority_min)
+        if self.priority_max is not None:
+            conditions.append(f"priority <= {p}")
+            params.append(self.priority_max)
+        return conditions, params
+
+    def matches(self, task: TaskRecord) -> bool:
+        """Applies the same filters in Python, so a client can tell whether a patched row still belongs in its view."""
+        due_date, priority = task.due_date, task.priority
+        if self.status is not None and task.task_status != self.status:
+            return False
+        if (self.due_from is not None or self.due_to is not None) and due_date is None:
+            return False
+        if self.due_from is not None and due_date < self.due_from:
+            return False
+        if self.due_to is not None and due_date > self.due_to:
+            return False
+        if (self.priority_min is not None or self.priority_max is not None) and priority is None:
+            return False
+        if self.priority_min is not None and priority < self.priority_min:
+            return False
+        if self.priority_max is not None and priority > self.priority_max:
+            return False
+        return True
+
+
+class TaskChanges(NamedTuple):
+    """What changed in a user's tasks since a watermark (see ToDoListApp.get_changes_since)."""
+    tasks: list[TaskRecord] # Inserted or updated since the watermark; with full, every task
+    deleted_ids: list[int]
+    watermark: str # Pass to the next call
+    full: bool # tasks is the whole list: replace the local copy instead of patching it
+
+
+class TaskStats(NamedTuple):
+    """A user's task counts, read from the task_stats summary tables."""
+    pending: int
+    completed: int
+    overdue: int # Pending with a due date before today
+    due_today: int # Pending and due today
+
+
+def keyset_cursor(task: TaskRecord, sort_key: str = 'id') -> tuple:
+    """Returns the (sort value, id) pagination cursor for a task row."""
+    return (getattr(task, sort_key), task.id)
+
+
+_SEARCH_TERM = re.compile(r"\w+")
+MAX_SEARCH_TERMS = 8
+
+
+def search_terms(text: str) -> tuple[str, ...]:
+    """
+    Splits free text into lower-cased word terms for search_tasks, dropping punctuation
+    (which both full-text query syntaxes would read as operators) and repeated words.
+    """
+    terms = dict.fromkeys(_SEARCH_TERM.findall((text or "").lower()))
+    return tuple(terms)[:MAX_SEARCH_TERMS]
+
+
+@functools.lru_cache(maxsize=64)
+def update_statement(columns: tuple, placeholder: str) -> str:
+    """
+    UPDATE text for one combination of changed columns. Cached so each variant is built once
+    and always returns the same string object, which the drivers' statement caches key on.
+    """
+    assignments = ", ".join(f"{column} = {placeholder}" for column in columns)
+    return f"UPDATE tasks SET {assignments} WHERE id = {placeholder} AND user_id = {placeholder}"
+
+
+class TaskStorage(abc.ABC):
+    """
+    The storage interface ToDoListApp talks to. A backend is used as a context manager:
+    `with storage as conn:` opens one transaction (committed on success, rolled back on an
+    exception) and the methods below run inside it.
+    Backends raise ValueError for bad input or constraint violations and their own
+    Error type (exposed as `Error`/`IntegrityError`) for everything else.
+    Task rows come back as TaskRecords, read through the transaction's `tuple_cursor`.
+    """
+    TASK_COLUMNS = "id, task, task_status, due_date, priority"
+    SORT_KEYS = ('id', 'due_date', 'priority') # Columns usable as a keyset sort key (always paired with id)
+    PLACEHOLDER = '%s' # Parameter marker of the backend's DB-API driver
+    BACKEND_NAME = 'mysql' # Label on the backend's metrics
+    EXPLAIN_PREFIX = "EXPLAIN"
+    SQL_NOW = "SELECT CURRENT_TIMESTAMP(6) AS now" # The clock that stamps updated_at and deleted_at
+    DERIVED_BY_TRIGGERS = False # True where triggers keep task_deletions, task_stats and task_due_counts current
+    metrics = REGISTRY
+    BULK_CHUNK_SIZE = 1000
+    Error = Exception
+    IntegrityError = Exception
+    DataError = Exception
+    ProgrammingError = Exception
+
+    # --- Connection and transaction ---
+    @abc.abstractmethod
+    def __enter__(self): ...
+
+    @abc.abstractmethod
+    def __exit__(self, exc_type, exc_val, exc_tb): ...
+
+    @abc.abstractmethod
+    def close(self):
+        """Releases every connection when the application shuts down."""
+
+    @abc.abstractmethod
+    def commit(self):
+        """Commits the current transaction early and starts a new one (e.g. per import batch)."""
+
+    @abc.abstractmethod
+    def migrate(self) -> list[int]:
+        """Brings the schema up to date and returns the versions applied."""
+
+    # --- Users ---
+    @abc.abstractmethod
+    def add_user(self, name: str, password_hash: str) -> int: ...
+
+    @abc.abstractmethod
+    def get_user(self, name: str) -> dict | None: ...
+
+    @abc.abstractmethod
+    def update_user_password(self, user_id: int, password_hash: str) -> bool: ...
+
+    # --- Tasks ---
+    @abc.abstractmethod
+    def add_task(self, user_id: int, task: str, due_date: date = None, priority: int = None) -> int: ...
+
+    @abc.abstractmethod
+    def get_task(self, user_id: int, task_id: int) -> TaskRecord | None: ...
+
+    @abc.abstractmethod
+    def get_tasks(self, user_id: int) -> list[TaskRecord]: ...
+
+    @abc.abstractmethod
+    def iter_tasks(self, user_id: int, batch_size: int = 1000): ...
+
+    @abc.abstractmethod
+    def query_tasks(self, user_id: int, query: TaskQuery, after: tuple = None, before: tuple = None) -> list[TaskRecord]: ...
+
+    @abc.abstractmethod
+    def search_tasks(self, user_id: int, terms: tuple[str, ...], limit: int = 50,
+                     prefix: bool = True) -> list[TaskRecord]:
+        """
+        Full-text search over a user's task text: every term must match (as a word prefix
+        when prefix is True). Returns at most limit tasks, best match first.
+        """
+
+    @abc.abstractmethod
+    def get_tasks_fingerprint(self, user_id: int) -> tuple: ...
+
+    @abc.abstractmethod
+    def update_task(self, user_id: int, task_id: int, task_name: str = None, due_date: date = None,
+                    priority: int = None, task_status: str = None) -> bool:
+        """
+        Returns whether a row changed (False if the task is missing or nothing was given);
+        a rejected update raises the backend's Error, so the caller's transaction rolls back.
+        """
+
+    @abc.abstractmethod
+    def delete_task(self, user_id: int, task_id: int) -> bool: ...
+
+    @abc.abstractmethod
+    def add_tasks(self, user_id: int, rows: list[tuple], return_records: bool = True) -> list[TaskRecord]: ...
+
+    @abc.abstractmethod
+    def update_tasks(self, user_id: int, task_ids: list[int], task_name: str = None, due_date: date = None,
+                     priority: int = None, task_status: str = None) -> dict[int, TaskRecord | None]: ...
+
+    @abc.abstractmethod
+    def delete_tasks(self, user_id: int, task_ids: list[int]) -> dict[int, bool]: ...
+
+    # --- Archive ---
+    @abc.abstractmethod
+    def archive_completed_tasks(self, user_id: int, before: datetime, limit: int) -> int:
+        """
+        Moves up to limit of the user's completed tasks last changed before `before` (a
+        database_now()-based time) from tasks to tasks_archive; returns how many moved.
+        """
+
+    @contextlib.contextmanager
+    def savepoint(self, name: str = 'entry'):
+        """Runs the block under a savepoint: an exception undoes only the block's statements, not the transaction."""
+        self.cursor.execute(f"SAVEPOINT {name}")
+        try:
+            yield self
+        except Exception:
+            try:
+                self.cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            except self.Error as err: # The whole transaction is already gone (e.g. a deadlock); the caller's exit handles it
+                logger.debug("Storage: Could not roll back to savepoint %s: %s", name, err)
+            raise
+        self.cursor.execute(f"RELEASE SAVEPOINT {name}")
+
+    # --- Instrumentation ---
+    def _instrument(self, cursor):
+        """Wraps a transaction's cursor so every statement is timed (a no-op when metrics are disabled)."""
+        if not self.metrics.enabled:
+            return cursor
+        return InstrumentedCursor(cursor, self.metrics, self.BACKEND_NAME, self._explain)
+
+    def _observe_commit(self, exc_type, started: float):
+        outcome = 'rollback' if exc_type else 'commit'
+        self.metrics.observe('db_commit_seconds', time.perf_counter() - started, backend=self.BACKEND_NAME, outcome=outcome)
+
+    def _explain(self, sql: str, params) -> list:
+        """Returns the backend's plan for a statement, for the slow-query log."""
+        cursor = self.con.cursor()
+        try:
+            cursor.execute(f"{self.EXPLAIN_PREFIX} {sql}", params or ())
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    # --- SQL shared by the backends ---
+    def _compile_task_query(self, user_id: int, query: TaskQuery, after: tuple = None,
+                            before: tuple = None, table: str = 'tasks') -> tuple[str, tuple, bool]:
+        """
+        Compiles query into one parameterized SELECT on table (tasks, or tasks_archive) and
+        returns (sql, params, backwards). With query.limit this is keyset pagination on (sort_key, id): `after`/`before` are
+        (sort value, id) cursors taken from the last/first row of the neighbouring page
+        (see keyset_cursor). When backwards is True the caller must reverse the rows to get
+        display order.
+        """
+        if query.sort_key not in self.SORT_KEYS:
+            raise ValueError(f"Unsupported sort key '{query.sort_key}'.")
+        if after is not None and before is not None:
+            raise ValueError("Only one of 'after' and 'before' may be given.")
+
+        # Paging backwards is a forward scan in the opposite direction, reversed afterwards
+        backwards = before is not None
+        scan_descending = query.descending != backwards
+        cursor = before if backwards else after
+
+        p = self.PLACEHOLDER
+        filter_conditions, filter_params = query.conditions(p)
+        conditions = [f"user_id = {p}", *filter_conditions]
+        params = [user_id, *filter_params]
+        if cursor is not None:
+            condition, condition_params = self._keyset_condition(query.sort_key, scan_descending, cursor)
+            conditions.append(condition)
+            params.extend(condition_params)
+
+        direction = "DESC" if scan_descending else "ASC"
+        sort_key = query.sort_key
+        order_by = f"id {direction}" if sort_key == 'id' else f"{sort_key} {direction}, id {direction}"
+        sql = f"SELECT {self.TASK_COLUMNS} FROM {table} WHERE {' AND '.join(conditions)} ORDER BY {order_by}"
+        if query.limit is not None:
+            sql += f" LIMIT {p}"
+            params.append(query.limit)
+        return sql, tuple(params), backwards
+
+    def _keyset_condition(self, sort_key: str, descending: bool, cursor: tuple) -> tuple[str, list]:
+        """Builds the WHERE fragment selecting rows strictly after cursor in (sort_key, id) order."""
+        p = self.PLACEHOLDER
+        value, last_id = cursor
+        op = "<" if descending else ">"
+        if sort_key == 'id':
+            return f"id {op} {p}", [last_id]
+
+        # MySQL and SQLite both sort NULLs first in ascending order and last in descending order
+        if value is None:
+            if descending:
+                return f"({sort_key} IS NULL AND id < {p})", [last_id]
+            return f"(({sort_key} IS NULL AND id > {p}) OR {sort_key} IS NOT NULL)", [last_id]
+
+        condition = f"({sort_key} {op} {p} OR ({sort_key} = {p} AND id {op} {p})"
+        if descending:
+            condition += f" OR {sort_key} IS NULL"
+        return condition + ")", [value, value, last_id]
+
+    @staticmethod
+    def _changed_columns(task_name: str = None, due_date: date = None, priority: int = None,
+                         task_status: str = None) -> tuple[tuple, list]:
+        """Returns the columns to change (in a fixed order) and their new values, skipping None fields."""
+        fields = (('task', task_name), ('due_date', due_date), ('priority', priority), ('task_status', task_status))
+        changed = [(column, value) for column, value in fields if value is not None]
+        return tuple(column for column, _ in changed), [value for _, value in changed]
+
+    def _update_assignments(self, task_name: str = None, due_date: date = None, priority: int = None,
+                            task_status: str = None) -> tuple[list[str], list]:
+        """Builds the SET clause fragments for the fields that are not None."""
+        columns, values = self._changed_columns(task_name, due_date, priority, task_status)
+        return [f"{column} = {self.PLACEHOLDER}" for column in columns], values
+
+    # --- Idempotency keys of write-behind journal entries ---
+    def get_applied_writes(self, keys: list[str]) -> dict[str, int | None]:
+        """Returns key -> task_id for the keys already applied (the new task's id for an add, else None)."""
+        applied = {}
+        for start in range(0, len(keys), self.BULK_CHUNK_SIZE):
+            chunk = keys[start:start + self.BULK_CHUNK_SIZE]
+            self.cursor.execute(
+                f"SELECT idempotency_key, task_id FROM applied_writes WHERE idempotency_key IN ({self._in_list(len(chunk))})",
+                tuple(chunk)
+            )
+            applied.update((row['idempotency_key'], row['task_id']) for row in self.cursor.fetchall())
+        return applied
+
+    def record_applied_writes(self, rows: list[tuple]):
+        """Records (key, user_id, task_id) rows in the current transaction, so a retried entry is never applied twice."""
+        if rows:
+            p = self.PLACEHOLDER
+            self.cursor.executemany(f"INSERT INTO applied_writes (idempotency_key, user_id, task_id) VALUES ({p}, {p}, {p})", rows)
+
+    def prune_applied_writes(self, max_age_days: float) -> int:
+        """Deletes keys older than max_age_days, long after any retry of their entry could happen."""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+        self.cursor.execute(f"DELETE FROM applied_writes WHERE applied_at < {self.PLACEHOLDER}",
+                            (cutoff.strftime('%Y-%m-%d %H:%M:%S'),))
+        return self.cursor.rowcount
+
+    # --- Change tracking (tasks.updated_at and the task_deletions log) ---
+    CHANGE_TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+    def database_now(self) -> datetime:
+        """The database clock, in the form updated_at and deleted_at are stored in."""
+        self.cursor.execute(self.SQL_NOW)
+        now = self.cursor.fetchone()['now']
+        return now if isinstance(now, datetime) else datetime.strptime(now, self.CHANGE_TIME_FORMAT)
+
+    def get_changed_tasks(self, user_id: int, since: datetime) -> tuple[list[TaskRecord], list[int]]:
+        """Returns (tasks inserted or updated after since, ids of tasks deleted after since), from the (user_id, time) indexes."""
+        p = self.PLACEHOLDER
+        stamp = since.strftime(self.CHANGE_TIME_FORMAT)
+        self.tuple_cursor.execute(
+            f"SELECT {self.TASK_COLUMNS} FROM tasks WHERE user_id = {p} AND updated_at > {p} ORDER BY updated_at ASC",
+            (user_id, stamp)
+        )
+        tasks = fetch_task_records(self.tuple_cursor)
+        self.tuple_cursor.execute(
+            f"SELECT DISTINCT task_id FROM task_deletions WHERE user_id = {p} AND deleted_at > {p}", (user_id, stamp)
+        )
+        return tasks, [row[0] for row in self.tuple_cursor.fetchall()]
+
+    def _log_deletions(self, user_id: int, task_ids: list[int]):
+        """Records deleted task ids in the current transaction, for backends without a delete trigger."""
+        if not self.DERIVED_BY_TRIGGERS and task_ids:
+            p = self.PLACEHOLDER
+            self.cursor.executemany(f"INSERT INTO task_deletions (user_id, task_id) VALUES ({p}, {p})",
+                                    [(user_id, task_id) for task_id in task_ids])
+
+    def prune_task_deletions(self, before: datetime) -> int:
+        """Deletes deletion log entries older than before (a database_now()-based time); returns how many."""
+        self.cursor.execute(f"DELETE FROM task_deletions WHERE deleted_at < {self.PLACEHOLDER}",
+                            (before.strftime(self.CHANGE_TIME_FORMAT),))
+        return self.cursor.rowcount
+
+    def query_archived_tasks(self, user_id: int, query: TaskQuery, after: tuple = None,
+                             before: tuple = None) -> list[TaskRecord]:
+        """Retrieves a user's archived tasks matching query, paged like query_tasks."""
+        sql, params, backwards = self._compile_task_query(user_id, query, after, before, table='tasks_archive')
+        self.tuple_cursor.execute(sql, params)
+        tasks = fetch_task_records(self.tuple_cursor)
+        if backwards:
+            tasks.reverse()
+        return tasks
+
+    # --- Task statistics (task_stats and task_due_counts) ---
+    def get_task_stats(self, user_id: int, today: date) -> TaskStats:
+        """
+        Reads the user's counts from the summary tables: one primary-key row, plus the
+        task_due_counts rows up to today (one per distinct due date, however many tasks).
+        """
+        p = self.PLACEHOLDER
+        self.tuple_cursor.execute(f"SELECT pending, completed FROM task_stats WHERE user_id = {p}", (user_id,))
+        rows = self.tuple_cursor.fetchall()
+        pending, completed = rows[0] if rows else (0, 0)
+        self.tuple_cursor.execute(
+            f"SELECT COALESCE(SUM(CASE WHEN due_date < {p} THEN pending ELSE 0 END), 0), "
+            f"COALESCE(SUM(CASE WHEN due_date = {p} THEN pending ELSE 0 END), 0) "
+            f"FROM task_due_counts WHERE user_id = {p} AND due_date <= {p}",
+            (today, today, user_id, today)
+        )
+        overdue, due_today = self.tuple_cursor.fetchall()[0]
+        return TaskStats(int(pending), int(completed), int(overdue), int(due_today))
+
+    def reconcile_task_stats(self, user_id: int) -> bool:
+        """Recomputes the user's summary rows from tasks; returns True if they had drifted."""
+        p = self.PLACEHOLDER
+        # A write comes first: it takes the task_stats row lock every task write takes (in SQLite, the
+        # write lock) before anything is read, so no write can land between the recount and the rewrite
+        self.cursor.execute(f"UPDATE task_stats SET pending = pending WHERE user_id = {p}", (user_id,))
+        self.tuple_cursor.execute(
+            f"SELECT task_status, due_date, COUNT(*) FROM tasks WHERE user_id = {p} GROUP BY task_status, due_date",
+            (user_id,)
+        )
+        pending = completed = 0
+        due_counts = {}
+        for task_status, due_date, count in self.tuple_cursor.fetchall():
+            if task_status == 'completed':
+                completed += count
+            elif task_status == 'pending':
+                pending += count
+                if due_date is not None:
+                    due_counts[due_date] = due_counts.get(due_date, 0) + count
+
+        self.tuple_cursor.execute(f"SELECT pending, completed FROM task_stats WHERE user_id = {p}", (user_id,))
+        stored = [tuple(row) for row in self.tuple_cursor.fetchall()]
+        self.tuple_cursor.execute(f"SELECT due_date, pending FROM task_due_counts WHERE user_id = {p}", (user_id,))
+        stored_due_counts = dict(self.tuple_cursor.fetchall())
+        # Decrements leave rows at zero behind (e.g. after deletes); they are not drift
+        emptied = [due_date for due_date, count in stored_due_counts.items() if not count]
+        if stored == [(pending, completed)] and {d: c for d, c in stored_due_counts.items() if c} == due_counts:
+            if emptied: # Cleared once, so a clean pass writes nothing
+                self.cursor.execute(f"DELETE FROM task_due_counts WHERE user_id = {p} AND pending = 0", (user_id,))
+            return False
+
+        self.cursor.execute(f"DELETE FROM task_stats WHERE user_id = {p}", (user_id,))
+        self.cursor.execute(f"INSERT INTO task_stats (user_id, pending, completed) VALUES ({p}, {p}, {p})",
+                            (user_id, pending, completed))
+        self.cursor.execute(f"DELETE FROM task_due_counts WHERE user_id = {p}", (user_id,))
+        if due_counts:
+            self.cursor.executemany(f"INSERT INTO task_due_counts (user_id, due_date, pending) VALUES ({p}, {p}, {p})",
+                                    [(user_id, due_date, count) for due_date, count in sorted(due_counts.items())])
+        logger.warning("Storage: Corrected drifted task stats for user_id %s.", user_id)
+        return True
+
+    def get_user_ids(self, after: int = 0, limit: int = 1000) -> list[int]:
+        """Returns up to limit user ids greater than after, in order (for batch jobs walking every user)."""
+        p = self.PLACEHOLDER
+        self.tuple_cursor.execute(f"SELECT id FROM users WHERE id > {p} ORDER BY id ASC LIMIT {p}", (after, limit))
+        return [row[0] for row in self.tuple_cursor.fetchall()]
+
+    def statement_cache_stats(self) -> dict:
+        """Hit/miss counters of the backend's prepared-statement cache, if it keeps its own."""
+        return {}
+
+    def _in_list(self, count: int) -> str:
+        """Returns the placeholder list for an IN (...) clause with count values."""
+        return ", ".join([self.PLACEHOLDER] * count)
+
+
+BACKENDS = ('mysql', 'sqlite')
+
+
+def open_storage(backend: str = None) -> TaskStorage:
+    """
+    Opens the storage backend named by DB_BACKEND in .env ('mysql' by default, or 'sqlite'
+    for the embedded single-file database at SQLITE_PATH). Backends are imported lazily so
+    only the selected backend is initialised.
+    """
+    load_dotenv()
+    backend = (backend or os.getenv('DB_BACKEND', 'mysql')).lower()
+    if backend == 'mysql':
+        from database import Database
+        return Database()
+    if backend == 'sqlite':
+        from sqlite_database import SQLiteDatabase
+        return SQLiteDatabase(os.getenv('SQLITE_PATH', 'todo.db'))
+    raise ValueError(f"Unknown DB_BACKEND '{backend}'; expected one of {', '.join(BACKENDS)}.")
@@ -0,0 +1,219 @@
+# task_cache.py
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from storage import TaskRecord
+
+logger = logging.getLogger(__name__)
+
+
+class _UserEntry:
+    """Everything cached for one user: the full task list and any query pages."""
+    __slots__ = ('all_tasks', 'pages', 'fingerprint', 'checked_at')
+
+    def __init__(self):
+        self.all_tasks = None # Full list ordered by id, or None if not cached
+        self.pages = {} # (query, after, before) or ('search', terms, limit, prefix) -> list of tasks
+        # (row count, max id, latest updated_at) expected in the database, or None if unknown;
+        # updated_at is None after a write of ours, whose database timestamp we do not know
+        self.fingerprint = None
+        self.checked_at = time.monotonic()
+
+    def row_count(self) -> int:
+        return len(self.all_tasks or ()) + sum(len(page) for page in self.pages.values())
+
+
+class TaskCache:
+    """
+    Read-through cache of task records per user, bounded by total cached rows with LRU
+    eviction across users. ToDoListApp patches or invalidates entries on every write it
+    makes; the freshness probe catches writes made by other clients and processes.
+    A per-user write generation keeps a read that raced a write from caching its stale result.
+    """
+    def __init__(self, max_rows: int = 100_000, freshness_interval: float | None = None):
+        self.max_rows = max_rows # 0 disables caching
+        self.freshness_interval = freshness_interval # Seconds between probes on a hit; None disables probing
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict() # user_id -> _UserEntry, least recently used first
+        self._generations = {} # user_id -> count of writes seen, bumped even when nothing is cached
+        self._epoch = 0 # Bumped by clear(), which is a write for every user
+        self._rows = 0
+        self._lock = threading.Lock() # ToDoListApp is called from several worker threads
+
+    @classmethod
+    def from_env(cls):
+        freshness = os.getenv('TASK_CACHE_FRESHNESS_SECONDS', '30') # Empty: never probe (only this process writes)
+        return cls(
+            max_rows=int(os.getenv('TASK_CACHE_MAX_ROWS', '100000')),
+            freshness_interval=float(freshness) if freshness else None,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_rows > 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'users': len(self._entries),
+                'rows': self._rows,
+            }
+
+    # --- Reads ---
+    def get(self, user_id: int, key=None) -> list[TaskRecord] | None:
+        """Returns a copy of the cached list (key=None) or query page, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            tasks = None
+            if entry is not None:
+                tasks = entry.all_tasks if key is None else entry.pages.get(key)
+            if tasks is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return list(tasks)
+
+    def generation(self, user_id: int) -> tuple:
+        """Token to take before loading from the database and hand to put()."""
+        with self._lock:
+            return (self._epoch, self._generations.get(user_id, 0))
+
+    def put(self, user_id: int, tasks: list[TaskRecord], key=None, fingerprint: tuple = None, generation: tuple = None):
+        """Caches tasks; skipped when the user had a write since generation was taken, as tasks may predate it."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(user_id, 0)):
+                logger.debug("TaskCache: Not caching a read for user_id %s that raced a write.", user_id)
+                return
+            entry = self._entries.get(user_id)
+            if entry is None:
+                entry = self._entries[user_id] = _UserEntry()
+            self._rows -= entry.row_count()
+            if key is None:
+                entry.all_tasks = list(tasks)
+            else:
+                entry.pages[key] = list(tasks)
+            if fingerprint is not None:
+                entry.fingerprint = fingerprint
+                entry.checked_at = time.monotonic()
+            self._rows += entry.row_count()
+            self._entries.move_to_end(user_id)
+            self._evict()
+
+    def _evict(self):
+        while self._rows > self.max_rows and self._entries:
+            user_id, entry = self._entries.popitem(last=False)
+            self._rows -= entry.row_count()
+            self.evictions += 1
+            logger.debug("TaskCache: Evicted tasks of user_id %s.", user_id)
+
+    # --- Freshness probe ---
+    def freshness_due(self, user_id: int) -> bool:
+        """True if the user's entry is old enough that a hit should be verified against the database first."""
+        if self.freshness_interval is None:
+            return False
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return entry is not None and time.monotonic() - entry.checked_at >= self.freshness_interval
+
+    def verify(self, user_id: int, fingerprint: tuple):
+        """Drops the user's entry if the database fingerprint differs from what this cache expects."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            if entry.fingerprint is not None and not self._fingerprint_matches(entry.fingerprint, fingerprint):
+                logger.info("TaskCache: External change detected for user_id %s; dropping cached tasks.", user_id)
+                self._drop(user_id)
+                return
+            entry.fingerprint = fingerprint
+            entry.checked_at = time.monotonic()
+
+    @staticmethod
+    def _fingerprint_matches(expected: tuple, actual: tuple) -> bool:
+        count, max_id, updated_at = expected
+        return (count, max_id) == actual[:2] and (updated_at is None or updated_at == actual[2])
+
+    # --- Write-through maintenance ---
+    def task_added(self, user_id: int, task: TaskRecord):
+        with self._lock:
+            self._bump(user_id)
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            self._rows -= entry.row_count()
+            entry.pages.clear() # Query pages cannot be patched reliably; drop them
+            # New ids are the largest, so appending keeps id order; a concurrent reload may already hold the row
+            if entry.all_tasks is not None and (not entry.all_tasks or entry.all_tasks[-1].id < task.id):
+                entry.all_tasks.append(task)
+            if entry.fingerprint is not None:
+                count, max_id, _ = entry.fingerprint
+                entry.fingerprint = (count + 1, max(max_id or 0, task.id), None)
+            self._rows += entry.row_count()
+            self._evict()
+
+    def task_updated(self, user_id: int, task: TaskRecord):
+        with self._lock:
+            self._bump(user_id)
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            self._rows -= entry.row_count()
+            entry.pages.clear()
+            if entry.all_tasks is not None:
+                for i, cached in enumerate(entry.all_tasks):
+                    if cached.id == task.id:
+                        entry.all_tasks[i] = task
+                        break
+            if entry.fingerprint is not None:
+                entry.fingerprint = (*entry.fingerprint[:2], None)
+            self._rows += entry.row_count()
+
+    def task_deleted(self, user_id: int, task_id: int):
+        with self._lock:
+            self._bump(user_id)
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            self._rows -= entry.row_count()
+            entry.pages.clear()
+            if entry.all_tasks is not None:
+                entry.all_tasks = [task for task in entry.all_tasks if task.id != task_id]
+            if entry.fingerprint is not None:
+                count, max_id, _ = entry.fingerprint
+                # Deleting the newest task changes MAX(id) to a value we do not know; re-learn it on the next probe
+                entry.fingerprint = None if task_id == max_id else (count - 1, max_id, None)
+            self._rows += entry.row_count()
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._bump(user_id)
+            self._drop(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self._entries.clear()
+            self._rows = 0
+
+    def _bump(self, user_id: int):
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def _drop(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._rows -= entry.row_count()
+            self.invalidations += 1
@@ -0,0 +1,39 @@
+# task_stats.py
+
+import argparse
+import os
+from dotenv import load_dotenv
+
+from periodic import PeriodicJob, run_command_once
+
+
+class TaskStatsReconciler(PeriodicJob):
+    """
+    Periodically recounts every user's task statistics and corrects any drift in the
+    summary tables (e.g. after rows were edited by hand, outside the app).
+    """
+
+    def __init__(self, app, interval: float = 3600.0, batch_size: int = 500):
+        super().__init__("task-stats-reconciler", lambda: app.reconcile_task_stats(batch_size=batch_size), interval)
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_env(cls, app):
+        """Returns a reconciler running every TASK_STATS_RECONCILE_SECONDS (default 3600), or None if that is 0."""
+        load_dotenv()
+        interval = float(os.getenv('TASK_STATS_RECONCILE_SECONDS', '3600'))
+        if interval <= 0:
+            return None
+        return cls(app, interval=interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recount task statistics and correct any drift.")
+    parser.add_argument("user_ids", nargs="*", type=int, help="Users to check (default: all users).")
+    args = parser.parse_args()
+
+    run_command_once(lambda app: app.reconcile_task_stats(args.user_ids or None))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+# write_behind.py
+
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date
+from typing import NamedTuple
+from dotenv import load_dotenv
+from commands import ToDoListApp
+from storage import TaskBatch, TaskQuery, TaskRecord
+
+logger = logging.getLogger(__name__)
+
+
+class WriteJournal:
+    """
+    Append-only JSON Lines file of queued writes. Each entry is one line, and a {"done": key}
+    line is appended once it has been committed to the database, so replaying the file
+    yields exactly the writes still outstanding after a crash or restart. The file is
+    truncated whenever nothing is outstanding. Not thread-safe; WriteBehindApp serializes calls.
+    """
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync # Without fsync a power loss can drop the newest entries (a crash cannot)
+        self._file = None
+
+    def open(self) -> tuple[list[dict], dict[int, int]]:
+        """Replays the file; returns (outstanding entries in order, local id -> database id of flushed adds)."""
+        entries = OrderedDict()
+        id_map = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line_no, line in enumerate(f, start=1):
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn last line is an append cut short by a crash; it was never acknowledged
+                        logger.warning("Journal: Skipping unreadable line %s of %s.", line_no, self.path)
+                        continue
+                    if 'done' in record:
+                        entries.pop(record['done'], None)
+                        if record.get('local_id') is not None and record.get('task_id') is not None:
+                            id_map[record['local_id']] = record['task_id']
+                    else:
+                        entries[record['key']] = record
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if not entries:
+            self.truncate()
+        return list(entries.values()), id_map
+
+    def append(self, entry: dict):
+        self._write([entry])
+
+    def mark_done(self, records: list[dict]):
+        self._write(records)
+
+    def truncate(self):
+        self._file.truncate(0)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, records: list[dict]):
+        self._file.write("".join(json.dumps(record, separators=(',', ':')) + "\n" for record in records))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+
+class FlushEvent(NamedTuple):
+    """Sent to listeners (on the flush thread) as each queued write is applied or dropped."""
+    user_id: int
+    op: str
+    task_id: int # As the caller knows it: a negative local id for a queued add
+    record: TaskRecord | None # For an add, the task with its database id
+    message: str
+
+
+class WriteBehindApp:
+    """
+    Write-behind front end for ToDoListApp. add_task, update_task and delete_task (and the
+    bulk update/delete) are validated with ToDoListApp's rules, appended to a durable local
+    journal and answered at once; a background thread applies them to the database in
+    batches, one transaction per batch, and retries with exponential backoff while the
+    database is unreachable. Each entry carries an idempotency key recorded in the same
+    transaction (applied_writes), so an entry retried after a lost commit acknowledgement
+    or a crash is skipped rather than applied twice.
+
+    A queued add gets a negative local id until it is flushed; listeners then receive the
+    task with its database id. Reads go to ToDoListApp with the queued changes laid over
+    them. Updates of tasks this client has not read yet, and everything else, are passed
+    straight through.
+    """
+    def __init__(self, app: ToDoListApp, journal: WriteJournal, batch_size: int = 100, base_backoff: float = 0.5,
+                 max_backoff: float = 60.0, key_retention_days: float = 7.0, max_known: int = 50_000):
+        self.app = app
+        self.journal = journal
+        self.batch_size = batch_size
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.key_retention_days = key_retention_days # applied_writes rows older than this are pruned
+        self.max_known = max_known
+        self.failed_attempts = 0 # Consecutive failed flushes of the current batch
+        self._pending = OrderedDict() # key -> journal entry, oldest first
+        self._known = OrderedDict() # (user_id, task_id) -> TaskRecord last handed to the caller, LRU
+        self._id_map = {} # local id of a flushed add -> database id
+        self._next_local_id = -1
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._last_prune = float('-inf')
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+
+    @classmethod
+    def from_env(cls, app: ToDoListApp):
+        """Returns a started write-behind front end if WRITE_BEHIND=1, otherwise None."""
+        load_dotenv()
+        if os.getenv('WRITE_BEHIND', '0') != '1':
+            return None
+        journal = WriteJournal(os.getenv('WRITE_BEHIND_JOURNAL', 'todo-journal.jsonl'),
+                               fsync=os.getenv('WRITE_BEHIND_FSYNC', '1') != '0')
+        return cls(
+            app,
+            journal,
+            batch_size=int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '100')),
+            max_backoff=float(os.getenv('WRITE_BEHIND_MAX_BACKOFF', '60')),
+        ).start()
+
+    def __getattr__(self, name):
+        return getattr(self.app, name) # Everything not overridden here goes straight to ToDoListApp
+
+    def start(self):
+        """Replays the journal, then starts the flush thread."""
+        entries, id_map = self.journal.open()
+        with self._lock:
+            self._id_map.update(id_map)
+            for entry in entries:
+                self._pending[entry['key']] = entry
+            local_ids = [entry['task_id'] for entry in entries if entry['op'] == 'add']
+            self._next_local_id = min([*local_ids, *id_map, 0]) - 1
+        if entries:
+            logger.warning("Write-behind: %s journaled writes from a previous session will be applied.", len(entries))
+        self._thread.start()
+        return self
+
+    def close(self, timeout: float = 10.0):
+        """Gives the flush thread up to timeout seconds to drain; whatever remains stays journaled for next time."""
+        with self._lock:
+            self._stopping = True
+            self._wakeup.notify()
+        self._thread.join(timeout)
+        with self._lock:
+            if self._pending:
+                logger.warning("Write-behind: %s writes remain in %s for the next start.", len(self._pending), self.journal.path)
+            self.journal.close()
+        self.app.close()
+
+    def add_listener(self, callback):
+        """callback(FlushEvent) runs on the flush thread; GUI callers must hand it to their own thread."""
+        self._listeners.append(callback)
+
+    @property
+    def pending_writes(self) -> int:
+        return len(self._pending)
+
+    # --- Queued writes ---
+    def _enqueue(self, entry: dict) -> str | None:
+        """Journals entry and queues it for the flush thread; returns an error message if it could not be saved."""
+        entry['key'] = uuid.uuid4().hex
+        try:
+            self.journal.append(entry)
+        except OSError as e:
+            logger.error("Write-behind: Could not append to %s: %s", self.journal.path, e, exc_info=True)
+            return "Error: The change could not be saved locally."
+        self._pending[entry['key']] = entry
+        self._wakeup.notify()
+        return None
+
+    def _remember(self, user_id: int, record: TaskRecord):
+        self._known[(user_id, record.id)] = record
+        self._known.move_to_end((user_id, record.id))
+        while len(self._known) > self.max_known:
+            self._known.popitem(last=False)
+
+    @staticmethod
+    def _fields(task_name: str = None, due_date: date = None, priority: int = None, task_status: str = None) -> dict:
+        return {'task': task_name, 'due_date': due_date.isoformat() if due_date else None,
+                'priority': priority, 'task_status': task_status}
+
+    @staticmethod
+    def _patched(record: TaskRecord, fields: dict) -> TaskRecord:
+        return record._replace(
+            task=fields['task'] if fields.get('task') is not None else record.task,
+            task_status=fields['task_status'] if fields.get('task_status') is not None else record.task_status,
+            due_date=date.fromisoformat(fields['due_date']) if fields.get('due_date') else record.due_date,
+            priority=fields['priority'] if fields.get('priority') is not None else record.priority,
+        )
+
+    def add_task(self, user_id: int, task_name: str, due_date: str = None, priority: int = None) -> tuple[TaskRecord | None, str]:
+        if not isinstance(user_id, int) or user_id <= 0:
+            return None, "Error: Invalid user ID provided."
+        if not task_name or not task_name.strip():
+            return None, "Error: Task description cannot be empty."
+        parsed_due_date, _, error = ToDoListApp._validate_task_fields(due_date, priority, task_name=task_name)
+        if error:
+            return None, error
+
+        with self._lock:
+            task_id = self._next_local_id
+            record = TaskRecord(task_id, task_name, 'pending', parsed_due_date, priority)
+            error = self._enqueue({'op': 'add', 'user_id': user_id, 'task_id': task_id,
+                                   'fields': self._fields(task_name, parsed_due_date, priority)})
+            if error:
+                return None, error
+            self._next_local_id -= 1
+            self._remember(user_id, record)
+        logger.debug("Write-behind: Queued add of local task %s for user_id %s.", task_id, user_id)
+        return record, f"Success: Task '{task_name}' added. It will be saved to the database in the background."
+
+    def update_task(self, user_id: int, task_id: int, task_name: str = None, due_date: str = None,
+                    priority: int = None, task_status: str = None) -> tuple[TaskRecord | None, str]:
+        if not isinstance(user_id, int) or user_id <= 0:
+            return None, "Error: Invalid user ID provided."
+        if not isinstance(task_id, int) or task_id == 0:
+            return None, "Error: Invalid task ID provided."
+        parsed_due_date, validated_task_status, error = ToDoListApp._validate_task_fields(due_date, priority, task_status, task_name)
+        if error:
+            return None, error
+
+        validated_task_name = task_name if task_name is not None and task_name.strip() else None
+        with self._lock:
+            current = self._known.get((user_id, task_id))
+            if current is not None:
+                fields = self._fields(validated_task_name, parsed_due_date, priority, validated_task_status)
+                error = self._enqueue({'op': 'update', 'user_id': user_id, 'task_id': task_id, 'fields': fields})
+                if error:
+                    return None, error
+                record = self._patched(current, fields)
+                self._remember(user_id, record)
+                return record, f"Success: Task ID {task_id} updated."
+        # Never read by this client, so there is no record to patch locally: write through
+        return self.app.update_task(user_id, task_id, task_name=task_name, due_date=due_date,
+                                    priority=priority, task_status=task_status)
+
+    def delete_task(self, user_id: int, task_id: int) -> str:
+        if not isinstance(user_id, int) or user_id <= 0:
+            return "Error: Invalid user ID provided."
+        if not isinstance(task_id, int) or task_id == 0:
+            return "Error: Invalid task ID provided."
+        with self._lock:
+            error = self._enqueue({'op': 'delete', 'user_id': user_id, 'task_id': task_id})
+            if error:
+                return error
+            self._known.pop((user_id, task_id), None)
+        return f"Success: Task ID {task_id} deleted."
+
+    def update_tasks(self, user_id: int, task_ids: list[int], task_name: str = None, due_date: str = None,
+                     priority: int = None, task_status: str = None) -> tuple[dict[int, TaskRecord | None], str]:
+        parsed_due_date, validated_task_status, error = ToDoListApp._validate_task_fields(due_date, priority, task_status, task_name)
+        validated_task_name = task_name if task_name is not None and task_name.strip() else None
+        valid_ids = bool(task_ids) and all(isinstance(task_id, int) and task_id != 0 for task_id in task_ids)
+        if error or not valid_ids or not isinstance(user_id, int) or user_id <= 0 or (
+                validated_task_name is None and parsed_due_date is None and priority is None and validated_task_status is None):
+            return self.app.update_tasks(user_id, task_ids, task_name=task_name, due_date=due_date,
+                                         priority=priority, task_status=task_status) # Same messages as the direct call
+
+        with self._lock:
+            current = [self._known.get((user_id, task_id)) for task_id in task_ids]
+            if all(current):
+                fields = self._fields(validated_task_name, parsed_due_date, priority, validated_task_status)
+                error = self._enqueue({'op': 'update_many', 'user_id': user_id, 'task_ids': list(task_ids), 'fields': fields})
+                if error:
+                    return {}, error
+                results = {}
+                for record in current:
+                    results[record.id] = self._patched(record, fields)
+                    self._remember(user_id, results[record.id])
+                return results, f"Success: {len(results)} tasks updated."
+        return self.app.update_tasks(user_id, task_ids, task_name=task_name, due_date=due_date,
+                                     priority=priority, task_status=task_status)
+
+    def delete_tasks(self, user_id: int, task_ids: list[int]) -> tuple[dict[int, bool], str]:
+        if not isinstance(user_id, int) or user_id <= 0:
+            return {}, "Error: Invalid user ID provided."
+        if not task_ids or not all(isinstance(task_id, int) and task_id != 0 for task_id in task_ids):
+            return {}, "Error: Invalid task ID provided."
+        with self._lock:
+            error = self._enqueue({'op': 'delete_many', 'user_id': user_id, 'task_ids': list(task_ids)})
+            if error:
+                return {}, error
+            for task_id in task_ids:
+                self._known.pop((user_id, task_id), None)
+        return {task_id: True for task_id in task_ids}, f"Success: {len(task_ids)} tasks deleted."
+
+    # --- Reads, with queued changes laid over them ---
+    def get_user_tasks(self, user_id: int, query: TaskQuery = None, after: tuple = None,
+                       before: tuple = None, columnar: bool = False) -> tuple[list[TaskRecord] | TaskBatch | None, str]:
+        with self._lock:
+            queued = [entry for entry in self._pending.values() if entry['user_id'] == user_id] # Taken before the read
+        tasks, message = self.app.get_user_tasks(user_id, query, after=after, before=before)
+        if tasks is None:
+            return tasks, message
+        # Queued adds have no place in a keyset page yet; they are listed in full, unpaged reads only
+        unpaged = (query is None or query.limit is None) and after is None and before is None
+        tasks = self._overlay(user_id, tasks, queued, query, include_adds=unpaged)
+        if tasks and message.startswith("Info:"):
+            message = "Success: Tasks retrieved." # Only queued adds so far
+        return (TaskBatch(tasks) if columnar else tasks), message
+
+    def search_tasks(self, user_id: int, text: str, limit: int = None, prefix: bool = True) -> tuple[list[TaskRecord] | None, str]:
+        with self._lock:
+            queued = [entry for entry in self._pending.values() if entry['user_id'] == user_id]
+        tasks, message = self.app.search_tasks(user_id, text, limit=limit, prefix=prefix)
+        if tasks is None:
+            return tasks, message
+        return self._overlay(user_id, tasks, queued, None, include_adds=False), message
+
+    def _overlay(self, user_id: int, tasks: list[TaskRecord], queued: list[dict], query: TaskQuery | None,
+                 include_adds: bool) -> list[TaskRecord]:
+        with self._lock:
+            resolve = lambda task_id: self._id_map.get(task_id, task_id)
+            patches, deleted, added = {}, set(), []
+            for entry in queued:
+                op = entry['op']
+                ids = [resolve(task_id) for task_id in entry.get('task_ids') or [entry['task_id']]]
+                if op == 'add':
+                    added.append(TaskRecord(ids[0], entry['fields']['task'], 'pending',
+                                            date.fromisoformat(entry['fields']['due_date']) if entry['fields']['due_date'] else None,
+                                            entry['fields']['priority']))
+                elif op in ('update', 'update_many'):
+                    for task_id in ids:
+                        patches.setdefault(task_id, []).append(entry['fields'])
+                else:
+                    deleted.update(ids)
+
+            result = []
+            read_ids = set()
+            for task in itertools.chain(tasks, added if include_adds else ()):
+                if task.id in deleted or task.id in read_ids:
+                    continue # A flushed add can also be in the rows just read
+                read_ids.add(task.id)
+                for fields in patches.get(task.id, ()):
+                    task = self._patched(task, fields)
+                if query is None or query.matches(task):
+                    result.append(task)
+                    self._remember(user_id, task)
+            return result
+
+    # --- Flush thread ---
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._stopping:
+                    self._wakeup.wait()
+                if not self._pending:
+                    return
+                batch = list(itertools.islice(self._pending.values(), self.batch_size))
+            try:
+                events = self._flush(batch)
+            except Exception as e: # The database is unreachable, or a bug: keep the writes and retry
+                self.failed_attempts += 1
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (self.failed_attempts - 1)) * random.uniform(0.5, 1.0)
+                log = logger.warning if isinstance(e, self.app.db.Error) else logger.critical
+                log("Write-behind: Flushing %s writes failed (attempt %s); retrying in %.1fs: %s",
+                    len(batch), self.failed_attempts, delay, e, exc_info=not isinstance(e, self.app.db.Error))
+                retry_at = time.monotonic() + delay
+                with self._lock:
+                    # New writes notify the condition too; they must not cut the backoff short
+                    while not self._stopping and time.monotonic() < retry_at:
+                        self._wakeup.wait(retry_at - time.monotonic())
+                    if self._stopping:
+                        return # Left in the journal for the next start
+                continue
+            self.failed_attempts = 0
+            for event in events:
+                for callback in self._listeners:
+                    try:
+                        callback(event)
+                    except Exception as e:
+                        logger.error("Write-behind: Listener failed: %s", e, exc_info=True)
+
+    def _flush(self, batch: list[dict]) -> list[FlushEvent]:
+        """Applies batch in one transaction, then marks it done in the journal."""
+        outcomes = [] # (entry, database task id or None, error message or None)
+        batch_ids = {} # local id -> database id of adds in this batch, for later entries that edit them
+        with self.app.db as conn:
+            applied = conn.get_applied_writes([entry['key'] for entry in batch])
+            new_keys = []
+            for entry in batch:
+                if entry['key'] in applied: # Committed before a crash or a lost acknowledgement
+                    if entry['op'] == 'add' and applied[entry['key']] is not None:
+                        batch_ids[entry['task_id']] = applied[entry['key']]
+                    outcomes.append((entry, applied[entry['key']], None))
+                    continue
+                try:
+                    with conn.savepoint(): # A rejected entry leaves no partial change behind
+                        task_id = self._apply(conn, entry, batch_ids)
+                    if entry['op'] == 'add':
+                        batch_ids[entry['task_id']] = task_id
+                    outcomes.append((entry, task_id, None))
+                except (ValueError, conn.IntegrityError, conn.DataError, conn.ProgrammingError) as e:
+                    # Rejected by the database (e.g. the user is gone, the text is too long): retrying cannot help,
+                    # and keeping it would hold back every write queued after it
+                    logger.error("Write-behind: Dropping %s for user_id %s: %s", entry['op'], entry['user_id'], e)
+                    task_id = None
+                    outcomes.append((entry, None, f"Error: A change saved while offline could not be applied: {e}"))
+                new_keys.append((entry['key'], entry['user_id'], task_id))
+            conn.record_applied_writes(new_keys)
+            if time.monotonic() - self._last_prune > 3600:
+                conn.prune_applied_writes(self.key_retention_days)
+                self._last_prune = time.monotonic()
+
+        for user_id in {entry['user_id'] for entry in batch}:
+            self.app.task_cache.invalidate(user_id) # Cached lists predate the batch
+
+        events = []
+        with self._lock:
+            done = []
+            for entry, task_id, error in outcomes:
+                self._pending.pop(entry['key'], None)
+                record = None
+                if entry['op'] == 'add':
+                    done.append({'done': entry['key'], 'local_id': entry['task_id'], 'task_id': task_id})
+                    if task_id is not None:
+                        self._id_map[entry['task_id']] = task_id
+                        local = self._known.pop((entry['user_id'], entry['task_id']), None)
+                        record = (local or self._overlay_record(entry))._replace(id=task_id)
+                        self._remember(entry['user_id'], record)
+                else:
+                    done.append({'done': entry['key']})
+                message = error or (f"Success: Task '{record.task}' saved with ID: {task_id}." if record else "Success: Change saved.")
+                events.append(FlushEvent(entry['user_id'], entry['op'], entry.get('task_id'), record, message))
+            try:
+                self.journal.mark_done(done)
+                if not self._pending:
+                    self.journal.truncate()
+            except (OSError, ValueError) as e: # ValueError: closed by close() after its timeout
+                # The writes are committed; replaying them next start is harmless (their keys are recorded)
+                logger.error("Write-behind: Could not mark %s writes done in %s: %s", len(done), self.journal.path, e)
+        logger.debug("Write-behind: Flushed %s writes.", len(batch))
+        return events
+
+    @staticmethod
+    def _overlay_record(entry: dict) -> TaskRecord:
+        fields = entry['fields']
+        return TaskRecord(entry['task_id'], fields['task'], 'pending',
+                          date.fromisoformat(fields['due_date']) if fields['due_date'] else None, fields['priority'])
+
+    def _apply(self, conn, entry: dict, batch_ids: dict[int, int]) -> int | None:
+        """Runs one journal entry against the open transaction; returns the new task id for an add."""
+        fields = entry.get('fields') or {}
+        due_date = date.fromisoformat(fields['due_date']) if fields.get('due_date') else None
+        user_id = entry['user_id']
+        if entry['op'] == 'add':
+            return conn.add_task(user_id, fields['task'], due_date, fields['priority'])
+
+        with self._lock:
+            ids = [batch_ids.get(task_id) or self._id_map.get(task_id, task_id)
+                   for task_id in entry.get('task_ids') or [entry['task_id']]]
+        ids = [task_id for task_id in ids if task_id > 0] # A local id still unmapped here belongs to a dropped add
+        if not ids:
+            return None
+        changes = dict(task_name=fields.get('task'), due_date=due_date, priority=fields.get('priority'),
+                       task_status=fields.get('task_status'))
+        if entry['op'] == 'update':
+            conn.update_task(user_id=user_id, task_id=ids[0], **changes)
+        elif entry['op'] == 'update_many':
+            conn.update_tasks(user_id, ids, **changes)
+        elif entry['op'] == 'delete':
+            conn.delete_task(user_id, ids[0])
+        else:
+            conn.delete_tasks(user_id, ids)
+        return None